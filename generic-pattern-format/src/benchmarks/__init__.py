@@ -0,0 +1,5 @@
+"""
+Benchmarks for the rule tooling. Run them from src with python -m, e.g.:
+
+    python -m benchmarks.entropy
+"""
@@ -0,0 +1,69 @@
+"""
+Compare compiling synthetic rule sets for scanning with loading the same
+rules from a bundle written by the compile command.
+"""
+
+import logging
+import sys
+import tempfile
+import time
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from benchmarks.suite import synthetic_rule
+from sssig_rules import scanner
+from sssig_rules.bundle import load_bundle
+from sssig_rules.bundle import write_bundle
+from sssig_rules.database import compile_rules
+from sssig_rules.schema import validate_rules
+
+DEFAULT_SIZES = [100, 1_000, 10_000]
+
+
+def main(args: list[str]) -> int:
+    parser = ArgumentParser(prog="benchmarks.bundle", description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma separated rule set sizes",
+    )
+    opts = parser.parse_args(args)
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in opts.sizes:
+            rules = validate_rules([synthetic_rule(i) for i in range(size)])
+            path = Path(tmpdir) / f"rules-{size}.hsdb"
+
+            start = time.perf_counter()
+            compile_rules(
+                rules,
+                flags=scanner.SCAN_FLAGS,
+                mode=scanner.SCAN_MODE,
+                fallback_flags=scanner.SCAN_FALLBACK_FLAGS,
+            )
+            compiled = time.perf_counter() - start
+
+            write_bundle(
+                path,
+                rules,
+                flags=scanner.SCAN_FLAGS,
+                mode=scanner.SCAN_MODE,
+                fallback_flags=scanner.SCAN_FALLBACK_FLAGS,
+            )
+            start = time.perf_counter()
+            load_bundle(path)
+            loaded = time.perf_counter() - start
+
+            print(
+                f"{size:>7} rules: compile {compiled * 1e3:10.3f}ms, "
+                f"load {loaded * 1e3:8.3f}ms ({path.stat().st_size} bytes)"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
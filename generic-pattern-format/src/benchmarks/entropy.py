@@ -0,0 +1,97 @@
+"""
+Compare the batched entropy functions against computing the entropy of one
+candidate at a time in Python.
+"""
+
+import math
+import random
+import string
+import sys
+import time
+
+from argparse import ArgumentParser
+from collections import Counter
+from typing import Callable
+
+from sssig_rules import entropy  # type: ignore
+
+ALPHABET = (string.ascii_letters + string.digits + "+/=_-").encode()
+
+
+def python_entropy(data: bytes) -> float:
+    """
+    The per-candidate implementation the batched functions replace
+    """
+    if not data:
+        return 0.0
+
+    total = len(data)
+    return -sum(
+        count / total * math.log2(count / total) for count in Counter(data).values()
+    )
+
+
+def candidates(count: int, length: int, seed: int = 0) -> list[bytes]:
+    rng = random.Random(seed)
+    return [bytes(rng.choices(ALPHABET, k=length)) for _ in range(count)]
+
+
+def _best_of(repeat: int, fn: Callable[[], object]) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main(args: list[str]) -> int:
+    parser = ArgumentParser(prog="benchmarks.entropy", description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--length", type=int, default=40)
+    parser.add_argument("--min-entropy", type=float, default=3.5)
+    parser.add_argument("--repeat", type=int, default=5)
+    opts = parser.parse_args(args)
+
+    data = candidates(opts.count, opts.length)
+
+    expected = [python_entropy(c) for c in data]
+    for value, want in zip(entropy.shannon_entropy(data), expected):
+        if not math.isclose(value, want, abs_tol=1e-9):
+            raise AssertionError(f"entropy mismatch: {value} != {want}")
+
+    timings = {
+        "python loop": _best_of(
+            opts.repeat,
+            lambda: [
+                i for i, c in enumerate(data) if python_entropy(c) >= opts.min_entropy
+            ],
+        ),
+        "shannon_entropy": _best_of(
+            opts.repeat,
+            lambda: [
+                i
+                for i, e in enumerate(entropy.shannon_entropy(data))
+                if e >= opts.min_entropy
+            ],
+        ),
+        "at_least": _best_of(
+            opts.repeat,
+            lambda: entropy.at_least(data, opts.min_entropy),
+        ),
+    }
+
+    baseline = timings["python loop"]
+    print(f"{opts.count} candidates of {opts.length} bytes")
+    for name, seconds in timings.items():
+        print(
+            f"{name:>16}: {seconds * 1e3:9.3f}ms "
+            f"{opts.count / seconds / 1e6:8.2f}M/s {baseline / seconds:7.1f}x"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""
+Compare the peak memory of translating synthetic rule sets of several sizes
+all at once (loading every rule, then dumping the whole config) and streamed
+(loading, validating and writing the rules a few at a time). Streaming should
+stay flat as the rule set grows.
+"""
+
+import io
+import logging
+import sys
+import tempfile
+import tracemalloc
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from benchmarks.suite import synthetic_rules_yaml
+from sssig_rules import targets
+from sssig_rules.loader import iter_rules_data
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import iter_validated_rules
+from sssig_rules.schema import validate_rules
+from sssig_rules.targets import TargetKind
+
+DEFAULT_SIZES = [1_000, 4_000, 16_000]
+
+
+class _NullWriter:
+    # Discards the output like a file would, without buffering it
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def _all_at_once(kind: TargetKind, rulespath: Path) -> None:
+    with rulespath.open("r") as rulesfile:
+        rules = validate_rules(load_rules_data(rulesfile))
+
+    io.StringIO().write(targets.translate(kind, rules) + "\n")
+
+
+def _streamed(kind: TargetKind, rulespath: Path) -> None:
+    with rulespath.open("r") as rulesfile:
+        rules = iter_validated_rules(iter_rules_data(rulesfile))
+        targets.write(kind, rules, _NullWriter())
+
+
+def _peak(fn, *args) -> int:
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(args: list[str]) -> int:
+    parser = ArgumentParser(prog="benchmarks.memory", description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma separated rule set sizes",
+    )
+    parser.add_argument(
+        "--target",
+        type=TargetKind,
+        default=TargetKind.NOSEYPARKER,
+    )
+    opts = parser.parse_args(args)
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in opts.sizes:
+            rulespath = Path(tmpdir) / f"rules-{size}.yaml"
+            rulespath.write_text(synthetic_rules_yaml(size))
+            whole = _peak(_all_at_once, opts.target, rulespath)
+            streamed = _peak(_streamed, opts.target, rulespath)
+            print(
+                f"{size:>7} rules: all at once {whole / 2**20:8.1f}MiB, "
+                f"streamed {streamed / 2**20:8.1f}MiB"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
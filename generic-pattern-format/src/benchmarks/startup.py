@@ -0,0 +1,66 @@
+"""
+Measure the cold start latency of the CLI for each target. Every sample runs
+a fresh interpreter: printing the help, importing main and just one target's
+module, and translating a rules file to the target.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from sssig_rules.targets import TargetKind
+
+SRC_DIR = Path(__file__).parent.parent
+DEFAULT_RULES = SRC_DIR / "test-rules.yaml"
+
+
+def _run(args: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args],
+        cwd=SRC_DIR,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def _median(runs: int, args: list[str]) -> float:
+    return statistics.median(_run(args) for _ in range(runs))
+
+
+def main(args: list[str]) -> int:
+    parser = ArgumentParser(prog="benchmarks.startup", description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--rules", type=Path, default=DEFAULT_RULES)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    opts = parser.parse_args(args)
+
+    results = {"help": _median(opts.runs, ["main.py", "--help"])}
+    for kind in TargetKind:
+        results[f"{kind}_import"] = _median(
+            opts.runs,
+            ["-c", f"import main; main.targets.module({kind.value!r})"],
+        )
+        results[f"{kind}_translate"] = _median(
+            opts.runs,
+            ["main.py", "-t", kind, str(opts.rules.resolve())],
+        )
+
+    if opts.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, seconds in results.items():
+            print(f"{name:>22}: {seconds * 1e3:9.3f}ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,266 @@
+"""
+Time each stage of translating synthetic rule sets of several sizes: parsing
+the YAML, validating the models, validating the patterns with hyperscan,
+checking and ordering the rule dependencies, and translating each rule and
+dumping them for each target.
+
+Results can be saved as a JSON baseline and later runs compared against it,
+failing if any stage got slower than the threshold allows.
+"""
+
+import base64
+import json
+import logging
+import math
+import platform
+import sys
+import time
+
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Any
+
+import pydantic
+import yaml
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules import profiling
+from sssig_rules import targets
+from sssig_rules.dependencies import dependency_order
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import validate_rules
+from sssig_rules.targets import TargetKind
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+DEFAULT_THRESHOLD = 0.2
+
+# Stages faster than this are too noisy to compare
+MIN_COMPARE_SECONDS = 0.005
+
+
+def _rule_id(i: int) -> str:
+    # Rule ids are 16 base32 characters after the prefix
+    return "S3IG" + base64.b32encode(i.to_bytes(10)).decode()
+
+
+def synthetic_rule(i: int) -> dict[str, Any]:
+    """
+    A rule using most of the schema. Every tenth rule depends on the rule
+    before it and has an analyzer.
+    """
+    rule: dict[str, Any] = {
+        "id": _rule_id(i),
+        "meta": {
+            "kind": "unknown",
+            "name": f"Synthetic token {i}",
+            "description": f"A generated rule for benchmarking ({i})",
+            "confidence": ["low", "medium", "high"][i % 3],
+            "tags": ["synthetic", f"group{i % 10}"],
+            "references": [f"https://example.com/tokens/{i}"],
+            "examples": {
+                "positive": [f"tok{i}_{'a1' * 16}"],
+                "negative": [f"tok{i}_short"],
+            },
+        },
+        "target": {
+            "prefix_pattern": r"\A|\W",
+            "pattern": f"tok{i}_[a-z0-9]{{32}}",
+            "suffix_pattern": r"\W|\z",
+        },
+        "filters": [
+            {
+                "kind": "require",
+                "context_strings": [f"service{i}", "token"],
+                "target_min_entropy": 3.0,
+            },
+            {
+                "kind": "exclude",
+                "target_strings": ["example", "test"],
+                "path_patterns": [rf"(?:^|/)fixtures{i}/"],
+                "match_patterns": [rf"(?i)sample.{{0,16}}tok{i}_"],
+            },
+        ],
+    }
+
+    if i % 10 == 9:
+        rule["dependencies"] = [
+            {
+                "rule_id": _rule_id(i - 1),
+                "varname": "account",
+                "within_lines": 10,
+            },
+        ]
+        rule["analyzers"] = [
+            {
+                "meta": {"kind": "http"},
+                "action": {
+                    "url": f"https://api.example.com/{i}/{{{{ account }}}}",
+                    "method": "post",
+                    "headers": {"authorization": "Bearer {{ target }}"},
+                },
+                "condition": [
+                    {
+                        "statuses": [200, [202, 204]],
+                        "body_syntax": "json",
+                        "body_strings": ['"id"'],
+                        "body_patterns": [rf"\"account\":\s*{i}"],
+                    },
+                    {"headers": {"content-type": ["application/json"]}},
+                ],
+            },
+        ]
+
+    return rule
+
+
+def synthetic_rules_yaml(count: int) -> str:
+    return yaml.safe_dump({"rules": [synthetic_rule(i) for i in range(count)]})
+
+
+def run_stages(text: str) -> dict[str, float]:
+    """
+    Time each stage once, in the order main runs them. Validation and
+    translation run through the same functions main calls, with their stages
+    timed by the profiler.
+    """
+    timings = {}
+
+    def timed(stage: str, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    data = timed("yaml_parse", load_rules_data, text)
+
+    profile = profiling.enable()
+    try:
+        rules = validate_rules(data)
+        stages = _stage_seconds(profile)
+        timings["model_validate"] = stages["validate.models"]
+        timings["hyperscan_validate"] = stages["validate.hyperscan"]
+
+        timed("dependency_order", dependency_order, rules)
+
+        for kind in TargetKind:
+            targets.translate(kind, rules)
+            stages = _stage_seconds(profile)
+            timings[f"{kind}_translate"] = stages[f"{kind}.translate"]
+            timings[f"{kind}_dump"] = stages[f"{kind}.dump"]
+    finally:
+        profiling.disable()
+
+    return timings
+
+
+def _stage_seconds(profile: profiling.Profile) -> dict[str, float]:
+    return {stats.name: stats.wall_seconds for stats in profile.stages()}
+
+
+def run_suite(sizes: list[int], repeat: int) -> dict[str, Any]:
+    results = {}
+    for size in sizes:
+        text = synthetic_rules_yaml(size)
+        best: dict[str, float] = {}
+        for _ in range(repeat):
+            for stage, seconds in run_stages(text).items():
+                best[stage] = min(seconds, best.get(stage, math.inf))
+
+        results[str(size)] = best
+        print(f"{size} rules", file=sys.stderr)
+        for stage, seconds in best.items():
+            print(f"  {stage:>20}: {seconds * 1e3:10.3f}ms", file=sys.stderr)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "pydantic": pydantic.VERSION,
+            "hyperscan": hscheck.version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    threshold: float,
+) -> list[str]:
+    """
+    The stages that are slower than the baseline by more than the threshold
+    """
+    regressions = []
+    for size, stages in current["results"].items():
+        for stage, seconds in stages.items():
+            before = baseline["results"].get(size, {}).get(stage)
+            if before is None or max(before, seconds) < MIN_COMPARE_SECONDS:
+                continue
+
+            change = seconds / before - 1 if before else math.inf
+            line = (
+                f"{size:>7} {stage:>20}: {before * 1e3:10.3f}ms -> "
+                f"{seconds * 1e3:10.3f}ms ({change:+.1%})"
+            )
+            print(line, file=sys.stderr)
+            if change > threshold:
+                regressions.append(line)
+
+    return regressions
+
+
+def main(args: list[str]) -> int:
+    parser = ArgumentParser(prog="benchmarks.suite", description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma separated rule set sizes",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="run each size this many times, keeping the best time per stage",
+    )
+    parser.add_argument(
+        "--save",
+        type=Path,
+        help="write the results to this JSON baseline",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        help="compare the results to this JSON baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="the slowdown allowed before a stage counts as a regression",
+    )
+    opts = parser.parse_args(args)
+
+    # The translators warn about every feature a target doesn't support,
+    # which would be timed along with them
+    logging.disable(logging.WARNING)
+
+    current = run_suite(opts.sizes, opts.repeat)
+
+    if opts.save:
+        opts.save.write_text(json.dumps(current, indent=2) + "\n")
+
+    if opts.compare:
+        baseline = json.loads(opts.compare.read_text())
+        regressions = compare(baseline, current, opts.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s):", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
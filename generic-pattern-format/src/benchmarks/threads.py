@@ -0,0 +1,91 @@
+"""
+Time validating the patterns of the rules file replicated to a large rule set
+on 1, 2, 4, 8 and 16 threads, reporting the speedup over one thread
+(hscheck releases the GIL while it compiles, so the speedup is bounded by the
+cores available). Nothing is cached.
+
+Validation never compiles a pattern twice, and hyperscan shares the work of
+identical patterns compiled together, so each copy's patterns get a distinct
+optional literal to make them unique like a real rule set's patterns.
+"""
+
+import logging
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import PatternBatch
+from sssig_rules.schema import Rule
+from sssig_rules.schema import validate_patterns_threaded
+
+DEFAULT_RULES_PATH = Path(__file__).parents[2] / "data" / "rules" / "sssig.yaml"
+DEFAULT_RULES = 10_000
+DEFAULT_THREADS = [1, 2, 4, 8, 16]
+
+
+def rule_patterns(rulespath: Path) -> tuple[int, list[str]]:
+    """
+    The number of rules in the rules file and every pattern in them
+    """
+    with rulespath.open("r") as rulesfile:
+        data = load_rules_data(rulesfile)
+
+    batch = PatternBatch()
+    for rule in data:
+        Rule.model_validate(rule, context={"pattern_batch": batch})
+
+    return len(data), list(batch.patterns)
+
+
+def main(args: list[str]) -> int:
+    parser = ArgumentParser(prog="benchmarks.threads", description=__doc__)
+    parser.add_argument(
+        "rulespath",
+        type=Path,
+        nargs="?",
+        default=DEFAULT_RULES_PATH,
+    )
+    parser.add_argument(
+        "--rules",
+        type=int,
+        default=DEFAULT_RULES,
+        help="the number of rules to replicate the rules file's rules to",
+    )
+    parser.add_argument(
+        "--threads",
+        type=lambda value: [int(threads) for threads in value.split(",")],
+        default=DEFAULT_THREADS,
+        help="comma separated numbers of threads",
+    )
+    opts = parser.parse_args(args)
+    logging.disable(logging.WARNING)
+
+    count, patterns = rule_patterns(opts.rulespath)
+    copies = max(opts.rules // count, 1)
+    patterns = [f"{p}(?:copy{i})?" for i in range(copies) for p in patterns]
+    print(f"{count * copies} rules, {len(patterns)} patterns, {os.cpu_count()} cpus")
+
+    baseline = None
+    for threads in opts.threads:
+        start = time.perf_counter()
+        validate_patterns_threaded(patterns, threads)
+        seconds = time.perf_counter() - start
+        if threads == 1:
+            baseline = seconds
+
+        line = f"  {threads:>3} threads: {seconds * 1e3:10.3f}ms"
+        if baseline is not None:
+            speedup = baseline / seconds
+            line += f" {speedup:6.2f}x ({speedup / threads:4.0%} efficiency)"
+
+        print(line)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,69 @@
+"""
+Compare the ways of validating synthetic rule sets: from parsed YAML, straight
+from JSON, and split across worker processes. The validation cache isn't used
+so every pattern is compiled.
+"""
+
+import json
+import logging
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from benchmarks.suite import synthetic_rule
+from sssig_rules.schema import validate_rules
+from sssig_rules.schema import validate_rules_json
+from sssig_rules.schema import validate_rules_parallel
+
+DEFAULT_SIZES = [1_000, 10_000]
+DEFAULT_JOBS = [2, 4]
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(args: list[str]) -> int:
+    parser = ArgumentParser(prog="benchmarks.validation", description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma separated rule set sizes",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=lambda value: [int(jobs) for jobs in value.split(",")],
+        default=DEFAULT_JOBS,
+        help="comma separated numbers of worker processes",
+    )
+    opts = parser.parse_args(args)
+    logging.disable(logging.WARNING)
+
+    for size in opts.sizes:
+        data = [synthetic_rule(i) for i in range(size)]
+        text = json.dumps({"rules": data}).encode()
+        results = {
+            "python": _timed(validate_rules, data),
+            "json": _timed(validate_rules_json, text),
+        }
+        for jobs in opts.jobs:
+            results[f"{jobs}_jobs"] = _timed(
+                validate_rules_parallel,
+                data,
+                jobs,
+                False,
+            )
+
+        print(f"{size} rules")
+        for name, seconds in results.items():
+            print(f"  {name:>10}: {seconds * 1e3:10.3f}ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
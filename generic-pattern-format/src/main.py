@@ -1,16 +1,25 @@
 #!.venv/bin/python3
 import logging
 import sys
-import yaml
 
 from argparse import ArgumentParser
+from argparse import ArgumentTypeError
 from argparse import Namespace
 from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import TextIO
 
-from sssig_rules.schema import Rule
+# Only the light modules are imported up front. The schema (and the hyperscan
+# extension), the target modules and everything else are imported by the
+# commands that need them so startup stays fast.
+from sssig_rules import profiling
 from sssig_rules import targets
 from sssig_rules.targets import TargetKind
 
+if TYPE_CHECKING:
+    from sssig_rules.cache import ValidationCache
+    from sssig_rules.schema import Rule
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
@@ -18,47 +27,801 @@ logging.basicConfig(
 
 
 def main(args: list[str]) -> int:
-    print(_translate(_parse_args(args)))
+    opts = _parse_args(args)
+    if opts.profile is None:
+        return opts.run(opts)
+
+    profile = profiling.enable()
+    try:
+        return opts.run(opts)
+    finally:
+        profiling.disable()
+        with opts.profile.open("w") as out:
+            profile.write_json(out)
+
+        profile.write_summary(sys.stderr, opts.profile_top)
+
+
+def _translate_command(opts) -> int:
+    _set_translate_options(opts.factor_strings)
+
+    if opts.stream and opts.output_dir is None:
+        (fmt,) = opts.targets
+        _stream_translate(fmt, opts.rulespath, opts.no_cache, opts.threads, sys.stdout)
+    elif opts.stream:
+        _stream_outputs(opts)
+    elif opts.output_dir is None:
+        print(_translate(opts))
+    else:
+        _write_outputs(opts)
+
     return 0
 
 
+def _test_command(opts) -> int:
+    """
+    Check every rule against its examples and report the rules that fail
+    """
+    from sssig_rules import examples
+
+    report = examples.run_examples(_load(opts))
+
+    for result in report.results:
+        if not result.examples:
+            status = "SKIP"
+        elif result.passed:
+            status = "PASS"
+        else:
+            status = "FAIL"
+
+        print(
+            f"{status} {result.id} {result.name} "
+            f"({result.examples} examples, {result.seconds * 1000:.3f}ms)"
+        )
+        for example in result.missed_positives:
+            print(f"  positive example not matched: {example!r}")
+        for example in result.matched_negatives:
+            print(f"  negative example matched: {example!r}")
+
+    failed = sum(not result.passed for result in report.results)
+    print(
+        f"{len(report.results)} rules, {failed} failed "
+        f"(compiled in {report.compile_seconds * 1000:.3f}ms)"
+    )
+
+    return 0 if report.passed else 1
+
+
+def _analyze_command(opts) -> int:
+    """
+    Report the cost score of every rule's match pattern, most expensive first
+    """
+    from sssig_rules import analysis
+
+    report = analysis.analyze_rules(_load(opts))
+
+    if opts.json:
+        print(report.model_dump_json(indent=2))
+    else:
+        for result in report.results:
+            print(f"{result.score:7.2f} {result.id} {result.name}")
+            for issue in result.issues:
+                print(f"  {issue}")
+
+    if opts.max_score is None:
+        return 0
+
+    expensive = report.above(opts.max_score)
+    for result in expensive:
+        logging.error(
+            "pattern cost above %.2f: rule_id=%r score=%.2f",
+            opts.max_score,
+            result.id,
+            result.score,
+        )
+
+    return 1 if expensive else 0
+
+
+def _overlaps_command(opts) -> int:
+    """
+    Report the rules whose positive examples other rules also match
+    """
+    from sssig_rules import overlaps
+
+    report = overlaps.find_overlaps(_load(opts))
+
+    if opts.json:
+        print(report.model_dump_json(indent=2))
+    else:
+        for result in report.results:
+            print(f"{result.id} {result.name} (rule {result.index})")
+            for overlap in result.examples:
+                matched_by = ", ".join(
+                    f"{other.id} (rule {other.index})" for other in overlap.matched_by
+                )
+                print(f"  {overlap.example!r} matched by {matched_by}")
+
+        print(
+            f"{len(report.results)} of {report.rules} rules overlap "
+            f"({report.examples} examples scanned in "
+            f"{report.scan_seconds * 1000:.3f}ms, compiled in "
+            f"{report.compile_seconds * 1000:.3f}ms)"
+        )
+
+    if opts.baseline is None:
+        return 0
+
+    baseline = overlaps.OverlapReport.model_validate_json(opts.baseline.read_bytes())
+    new = report.new_since(baseline)
+    for rule_id, other in new:
+        logging.error(
+            "new overlap: rule_id=%r examples matched by rule_id=%r", rule_id, other
+        )
+
+    return 1 if new else 0
+
+
+def _scan_command(opts) -> int:
+    """
+    Scan files with the reference scanner, printing findings as JSON lines
+    """
+    from sssig_rules import scanner
+    from sssig_rules.bundle import BundleError
+    from sssig_rules.bundle import load_bundle
+
+    bundle = None
+    if opts.bundle is not None:
+        try:
+            bundle = load_bundle(opts.bundle)
+        except (BundleError, OSError) as e:
+            logging.error("unable to load the bundle %s: %s", opts.bundle, e)
+            return 1
+
+    rules = _load(opts)
+    try:
+        scan = scanner.Scanner(
+            rules,
+            chunk_size=opts.chunk_size or scanner.DEFAULT_CHUNK_SIZE,
+            bundle=bundle,
+        )
+    except BundleError as e:
+        # The bundle was compiled from other rules or not for scanning
+        logging.error("unable to scan with the bundle %s: %s", opts.bundle, e)
+        return 1
+
+    findings = scan.scan_paths(opts.paths)
+    if opts.verify:
+        _print_verified(rules, findings, opts)
+    else:
+        for finding in findings:
+            print(finding.model_dump_json())
+
+    logging.info(
+        "scanned %d bytes in %.3fs (%.2f MB/s)",
+        scan.bytes_scanned,
+        scan.seconds,
+        scan.throughput / 1e6,
+    )
+    return 0
+
+
+def _print_verified(rules: list["Rule"], findings, opts) -> None:
+    """
+    Print the findings with whether their rules' analyzers verified them
+    """
+    import asyncio
+
+    from sssig_rules.analyzers import AnalyzerRunner
+    from sssig_rules.analyzers import VerdictCache
+    from sssig_rules.analyzers import verify_findings
+
+    async def run() -> None:
+        async with AnalyzerRunner(
+            rules,
+            host_limit=opts.host_limit,
+            timeout=opts.verify_timeout,
+            cache=VerdictCache(ttl=opts.verify_ttl),
+        ) as runner:
+            async for finding in verify_findings(runner, findings):
+                print(finding.model_dump_json(exclude_none=True))
+
+            logging.info(
+                "verified findings with %d requests (%d verdicts cached)",
+                runner.requests,
+                len(runner.cache),
+            )
+
+    asyncio.run(run())
+
+
+def _compile_command(opts) -> int:
+    """
+    Compile the rules into a bundle that scanners can load without compiling
+    """
+    from sssig_rules import hscheck  # type: ignore
+    from sssig_rules import scanner
+    from sssig_rules.bundle import write_bundle
+
+    # Stream mode bundles are what the scanner uses
+    mode = scanner.SCAN_MODE if opts.mode == "stream" else hscheck.MODE_BLOCK
+    write_bundle(
+        opts.output,
+        _load(opts),
+        flags=scanner.SCAN_FLAGS,
+        mode=mode,
+        fallback_flags=scanner.SCAN_FALLBACK_FLAGS,
+    )
+    return 0
+
+
+def _daemon_command(opts) -> int:
+    """
+    Keep the rules validated and translated in memory, serving them to the
+    client command until interrupted
+    """
+    import asyncio
+
+    from sssig_rules.cache import open_validation_cache
+    from sssig_rules.daemon import RuleSet
+    from sssig_rules.daemon import serve
+
+    cache = None if opts.no_cache else open_validation_cache()
+    try:
+        ruleset = RuleSet(opts.rulespath, cache, opts.threads)
+        asyncio.run(serve(ruleset, opts.output_dir))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        if cache is not None:
+            cache.close()
+
+    return 0
+
+
+def _client_command(opts) -> int:
+    """
+    Translate (or just validate) with the daemon for the rules file, or in
+    process if there isn't one
+    """
+    from sssig_rules import client
+
+    message = {"command": "validate"}
+    if opts.target is not None:
+        message = {"command": "translate", "target": opts.target}
+
+    try:
+        response = client.request(opts.rulespath, message)
+    except client.DaemonError as e:
+        logging.error("%s", e)
+        return 1
+
+    if response is None:
+        logging.info("no daemon for %s, running in process", opts.rulespath)
+        rules = _load(opts)
+        response = {"rules": len(rules)}
+        if opts.target is not None:
+            response["output"] = targets.translate(opts.target, rules)
+
+    if opts.target is not None:
+        print(response["output"])
+    else:
+        logging.info("%d rules are valid", response["rules"])
+
+    return 0
+
+
+def _set_translate_options(factor_strings: bool) -> None:
+    """
+    Set the options that change how rules are translated, in this process and
+    in each worker translating to a target
+    """
+    if factor_strings:
+        from sssig_rules.targets.common import set_factor_strings
+
+        set_factor_strings(True)
+
+
 def _translate(opts):
-    fmt = opts.target
-    rules = _load_rules(opts.rulespath)
-    return getattr(targets, fmt).translate(rules)
+    (fmt,) = opts.targets
+    return _translator(opts)(fmt, _load_for_translation(opts))
+
 
+def _translator(opts):
+    if opts.incremental:
+        from sssig_rules import incremental
 
-def _load_rules(rulespath: Path) -> list[Rule]:
-    with rulespath.open("r") as rulesfile:
-        return [
-            Rule.model_validate(rule_data)
-            for rule_data in yaml.safe_load(rulesfile)["rules"]
+        return incremental.translate
+
+    return targets.translate
+
+
+def _write_outputs(opts) -> None:
+    """
+    Validate the rules once and translate them to each target in parallel,
+    writing the results to files in the output directory
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    rules = _load_for_translation(opts)
+    translate = _translator(opts)
+    opts.output_dir.mkdir(parents=True, exist_ok=True)
+
+    if profiling.active() is not None:
+        # In this process so every target's stages are recorded
+        for fmt in opts.targets:
+            _write_if_changed(
+                opts.output_dir / targets.filename(fmt),
+                translate(fmt, rules) + "\n",
+            )
+
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=len(opts.targets),
+        initializer=_set_translate_options,
+        initargs=(opts.factor_strings,),
+    ) as pool:
+        futures = {fmt: pool.submit(translate, fmt, rules) for fmt in opts.targets}
+        for fmt, future in futures.items():
+            _write_if_changed(
+                opts.output_dir / targets.filename(fmt),
+                future.result() + "\n",
+            )
+
+
+def _stream_outputs(opts) -> None:
+    """
+    Translate to each target in parallel with every worker streaming the rules
+    from the rules file into its output file, so no process holds all of them
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    opts.output_dir.mkdir(parents=True, exist_ok=True)
+
+    if profiling.active() is not None:
+        # In this process so every target's stages are recorded
+        for fmt in opts.targets:
+            _stream_to_file(
+                fmt,
+                opts.rulespath,
+                opts.no_cache,
+                opts.threads,
+                opts.output_dir / targets.filename(fmt),
+            )
+
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=len(opts.targets),
+        initializer=_set_translate_options,
+        initargs=(opts.factor_strings,),
+    ) as pool:
+        futures = [
+            pool.submit(
+                _stream_to_file,
+                fmt,
+                opts.rulespath,
+                opts.no_cache,
+                opts.threads,
+                opts.output_dir / targets.filename(fmt),
+            )
+            for fmt in opts.targets
         ]
+        for future in futures:
+            future.result()
+
+
+def _stream_to_file(
+    kind: TargetKind,
+    rulespath: Path,
+    no_cache: bool,
+    threads: int,
+    outpath: Path,
+) -> None:
+    """
+    Stream a target's translation to a temporary file that replaces outpath
+    only if their content differs
+    """
+    import filecmp
+
+    tmppath = outpath.with_name(f".{outpath.name}.tmp")
+    try:
+        with tmppath.open("w") as out:
+            _stream_translate(kind, rulespath, no_cache, threads, out)
+
+        if outpath.is_file() and filecmp.cmp(tmppath, outpath, shallow=False):
+            logging.info("unchanged: %s", outpath)
+        else:
+            tmppath.replace(outpath)
+    finally:
+        tmppath.unlink(missing_ok=True)
+
+
+def _stream_translate(
+    kind: TargetKind,
+    rulespath: Path,
+    no_cache: bool,
+    threads: int,
+    out: TextIO,
+) -> None:
+    """
+    Load, validate and translate the rules a few at a time, writing each one
+    out as soon as it's translated
+    """
+    from sssig_rules.cache import open_validation_cache
+    from sssig_rules.dependencies import iter_checked_rules
+    from sssig_rules.loader import iter_rules_data
+    from sssig_rules.schema import iter_validated_rules
+
+    cache = None if no_cache else open_validation_cache()
+    try:
+        with rulespath.open("r") as rulesfile:
+            rules = iter_validated_rules(
+                iter_rules_data(rulesfile), cache, threads=threads
+            )
+            targets.write(kind, iter_checked_rules(rules), out)
+
+        out.write("\n")
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _write_if_changed(outpath: Path, content: str) -> None:
+    """
+    Leave files that already have the content alone so their mtime doesn't
+    change and file watchers aren't triggered
+    """
+    try:
+        if outpath.read_text() == content:
+            logging.info("unchanged: %s", outpath)
+            return
+    except FileNotFoundError:
+        pass
+
+    outpath.write_text(content)
+
+
+def _load_for_translation(opts) -> "list[Rule]":
+    if opts.dependency_order:
+        from sssig_rules.dependencies import dependency_order
+
+        return dependency_order(_validate(opts))
+
+    return _load(opts)
+
+
+def _load(opts) -> "list[Rule]":
+    """
+    Load and validate the rules, checking that their dependencies refer to
+    rules and don't form cycles
+    """
+    from sssig_rules.dependencies import check_dependencies
+
+    rules = _validate(opts)
+    check_dependencies(rules)
+    profiling.time_rule_compiles(rules)
+    return rules
+
+
+def _validate(opts) -> "list[Rule]":
+    with profiling.stage("load_rules"):
+        return _validate_rules(opts)
+
+
+def _validate_rules(opts) -> "list[Rule]":
+    if opts.jobs > 1:
+        from sssig_rules.schema import validate_rules_parallel
+
+        return validate_rules_parallel(
+            _load_rules_data(opts.rulespath),
+            opts.jobs,
+            use_cache=not opts.no_cache,
+            threads=opts.threads,
+        )
+
+    from sssig_rules.cache import open_validation_cache
+
+    cache = None if opts.no_cache else open_validation_cache()
+    try:
+        return _load_rules(opts.rulespath, cache, opts.threads)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _load_rules(
+    rulespath: Path,
+    cache: "ValidationCache | None" = None,
+    threads: int = 1,
+) -> "list[Rule]":
+    from sssig_rules.schema import validate_rules
+    from sssig_rules.schema import validate_rules_json
+
+    if rulespath.suffix == ".json":
+        return validate_rules_json(rulespath.read_bytes(), cache, threads)
+
+    return validate_rules(_load_rules_data(rulespath), cache, threads=threads)
+
+
+def _load_rules_data(rulespath: Path) -> list:
+    """
+    The raw rules from a YAML or JSON rules file
+    """
+    with profiling.stage("parse"):
+        if rulespath.suffix == ".json":
+            import json
+
+            return json.loads(rulespath.read_bytes())["rules"]
+
+        from sssig_rules.loader import load_rules_data
+
+        with rulespath.open("r") as rulesfile:
+            return load_rules_data(rulesfile)
+
+
+def _target_kinds(value: str) -> list[TargetKind]:
+    if value == "all":
+        return list(TargetKind)
+
+    try:
+        return [TargetKind(value)]
+    except ValueError:
+        raise ArgumentTypeError(f"invalid target: {value!r}")
 
 
 def _parse_args(args: list[str]) -> Namespace:
     parser = ArgumentParser(
         prog="translate",
-        description="translate rules",
+        description="translate, test, analyze, compile and scan with rules",
     )
-    parser.add_argument(
+    subparsers = parser.add_subparsers(dest="subcommand", required=True)
+
+    rules_parser = ArgumentParser(add_help=False)
+    rules_parser.add_argument(
         "rulespath",
         type=Path,
     )
-    parser.add_argument(
+    rules_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't use the on-disk pattern validation cache",
+    )
+    rules_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="validate the rules split across this many processes",
+    )
+    rules_parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="compile the patterns to validate on this many threads",
+    )
+    rules_parser.add_argument(
+        "--profile",
+        type=Path,
+        help="write the time spent in each stage and on each rule to this JSON file",
+    )
+    rules_parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=profiling.DEFAULT_TOP,
+        help="the number of slowest rules listed on stderr when profiling",
+    )
+
+    translate_parser = subparsers.add_parser(
+        "translate",
+        parents=[rules_parser],
+        help="translate rules (the default)",
+    )
+    translate_parser.set_defaults(run=_translate_command)
+    translate_parser.add_argument(
+        "-t",
+        "--target",
+        dest="targets",
+        type=_target_kinds,
+        action="extend",
+        metavar="{%s}" % ",".join([*TargetKind, "all"]),
+        required=True,
+        help="may be repeated, 'all' selects every target",
+    )
+    translate_parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=Path,
+        help="write each target's output to a file in this directory",
+    )
+    translate_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only translate the rules that changed since the last run",
+    )
+    translate_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="load, validate and write the rules a few at a time to bound memory",
+    )
+    translate_parser.add_argument(
+        "--dependency-order",
+        action="store_true",
+        help="order the rules so each one comes after the rules it depends on",
+    )
+    translate_parser.add_argument(
+        "--factor-strings",
+        action="store_true",
+        help="factor lists of strings into smaller patterns matching the same inputs",
+    )
+
+    test_parser = subparsers.add_parser(
+        "test",
+        parents=[rules_parser],
+        help="check rules against their examples",
+    )
+    test_parser.set_defaults(run=_test_command)
+
+    analyze_parser = subparsers.add_parser(
+        "analyze",
+        parents=[rules_parser],
+        help="estimate how expensive each rule's pattern is to match",
+    )
+    analyze_parser.set_defaults(run=_analyze_command)
+    analyze_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="print the report as JSON",
+    )
+    analyze_parser.add_argument(
+        "--max-score",
+        type=float,
+        help="exit non-zero if any rule's cost score is above this",
+    )
+
+    overlaps_parser = subparsers.add_parser(
+        "overlaps",
+        parents=[rules_parser],
+        help="find rules whose examples other rules also match",
+    )
+    overlaps_parser.set_defaults(run=_overlaps_command)
+    overlaps_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="print the report as JSON",
+    )
+    overlaps_parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="exit non-zero if there are overlaps that aren't in this JSON report",
+    )
+
+    scan_parser = subparsers.add_parser(
+        "scan",
+        parents=[rules_parser],
+        help="scan files with the reference scanner",
+    )
+    scan_parser.set_defaults(run=_scan_command)
+    scan_parser.add_argument(
+        "paths",
+        type=Path,
+        nargs="+",
+        help="files or directories to scan",
+    )
+    scan_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="the number of bytes read and scanned at a time (default 64KiB)",
+    )
+    scan_parser.add_argument(
+        "--bundle",
+        type=Path,
+        help="use the database in this bundle (from compile) instead of compiling",
+    )
+    scan_parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="verify findings with their rules' http analyzers",
+    )
+    scan_parser.add_argument(
+        "--host-limit",
+        type=int,
+        default=4,
+        help="the most concurrent verification requests to a host (default 4)",
+    )
+    scan_parser.add_argument(
+        "--verify-timeout",
+        type=float,
+        default=10.0,
+        help="the seconds to wait for analyzers without a timeout (default 10)",
+    )
+    scan_parser.add_argument(
+        "--verify-ttl",
+        type=float,
+        default=3600.0,
+        help="the seconds a secret's verdict is reused for (default 3600)",
+    )
+
+    compile_parser = subparsers.add_parser(
+        "compile",
+        parents=[rules_parser],
+        help="compile rules into a bundle scanners can load without compiling",
+    )
+    compile_parser.set_defaults(run=_compile_command)
+    compile_parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        required=True,
+        help="the bundle file to write",
+    )
+    compile_parser.add_argument(
+        "--mode",
+        choices=["stream", "block"],
+        default="stream",
+        help="the hyperscan mode to compile for, the scanner needs stream",
+    )
+
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        parents=[rules_parser],
+        help="keep rules validated and translated in memory for the client",
+    )
+    daemon_parser.set_defaults(run=_daemon_command)
+    daemon_parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=Path,
+        help="keep each target's output current in a file in this directory",
+    )
+
+    client_parser = subparsers.add_parser(
+        "client",
+        parents=[rules_parser],
+        help="translate or validate with the daemon, or in process without one",
+    )
+    client_parser.set_defaults(run=_client_command)
+    client_parser.add_argument(
         "-t",
         "--target",
         type=TargetKind,
         choices=list(TargetKind),
-        required=True,
+        help="the target to translate to, the rules are only validated without it",
     )
 
+    # Translating is the default when no subcommand is given
+    if not args or args[0] not in [*subparsers.choices, "-h", "--help"]:
+        args = ["translate", *args]
+
     opts = parser.parse_args(args)
     if not opts.rulespath.is_file():
         raise ValueError("provided rulespath does not exist")
 
+    if opts.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    if opts.threads < 1:
+        parser.error("--threads must be at least 1")
+
+    if opts.subcommand == "translate":
+        opts.targets = list(dict.fromkeys(opts.targets))
+        if len(opts.targets) > 1 and opts.output_dir is None:
+            translate_parser.error(
+                "translating to multiple targets requires --output-dir"
+            )
+
+        if opts.stream and opts.incremental:
+            translate_parser.error("--stream can't be used with --incremental")
+
+        if opts.stream and opts.jobs > 1:
+            translate_parser.error("--stream can't be used with --jobs")
+
+        if opts.stream and opts.dependency_order:
+            translate_parser.error("--stream can't be used with --dependency-order")
+
     return opts
 
 
 if __name__ == "__main__":
-    main(sys.argv[1:])
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,323 @@
+"""
+Estimate how expensive each rule's match pattern is for the backtracking and
+RE2 based engines the targets use, which can be slow on patterns hyperscan
+handles easily.
+
+Hyperscan's expression info (the match widths) is combined with a structural
+walk of the pattern parsed by Python's regex parser, which understands enough
+of the syntax once hyperscan specific bits are rewritten.
+"""
+
+import logging
+import platform
+import re
+
+from typing import NamedTuple
+
+from pydantic import BaseModel
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.schema import Rule
+from sssig_rules.targets.common import _match_pattern
+
+logger = logging.getLogger(__name__)
+
+# Bounded repeats that can match this many more times than their minimum are
+# reported, e.g. .{0,128}
+LARGE_REPEAT = 64
+
+# The shortest literal worth prefiltering on
+MIN_LITERAL = 3
+
+NESTED_QUANTIFIER_COST = 10.0
+LARGE_REPEAT_COST = 1 / 32  # per possible extra repetition
+UNBOUNDED_REPEAT_COST = 2.0
+ALTERNATION_COST = 3.0
+NO_LITERAL_COST = 5.0
+UNBOUNDED_WIDTH_COST = 2.0
+EMPTY_MATCH_COST = 5.0
+
+
+def _unsupported_parser(e: Exception) -> str:
+    return f"Python {platform.python_version()}'s regex parser isn't supported: {e}"
+
+
+# The structure is walked with Python's private regex parser. Where it has
+# moved or changed, patterns are only scored on hyperscan's expression info.
+try:
+    from re import _constants as sre  # type: ignore
+    from re import _parser as sre_parse  # type: ignore
+
+    _REPEATS = {sre.MAX_REPEAT, sre.MIN_REPEAT, sre.POSSESSIVE_REPEAT}
+    _ANCHORS = {sre.AT_BEGINNING, sre.AT_BEGINNING_STRING}
+    _PARSER_ERROR = None
+except (ImportError, AttributeError) as e:
+    _PARSER_ERROR = _unsupported_parser(e)
+
+_FLAG_GROUP = re.compile(r"\(\?[imsx]*(?:-[imsx]*)?\)")
+
+
+class PatternCost(BaseModel):
+    id: str
+    name: str
+    pattern: str
+    score: float
+    min_width: int
+    max_width: int | None
+    anchored: bool | None
+    longest_literal: int | None
+    issues: list[str]
+
+
+class CostReport(BaseModel):
+    # Sorted from the most to the least expensive
+    results: list[PatternCost]
+
+    def above(self, score: float) -> list[PatternCost]:
+        return [result for result in self.results if result.score > score]
+
+
+def _class_end(pattern: str, start: int) -> int:
+    """
+    The index just past the character class starting at start
+    """
+    i = start + 1
+    if pattern.startswith("^", i):
+        i += 1
+
+    # A ] right at the start of a class is a literal
+    if pattern.startswith("]", i):
+        i += 1
+
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+        elif pattern[i] == "]":
+            return i + 1
+        else:
+            i += 1
+
+    return len(pattern)
+
+
+def _python_pattern(pattern: str) -> str:
+    """
+    Rewrite the hyperscan syntax Python's parser doesn't accept: \\z and
+    inline flags after the start of the pattern. Flags don't change the
+    structure so they're dropped.
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            escape = pattern[i : i + 2]
+            out.append("\\Z" if escape == "\\z" else escape)
+            i += 2
+        elif pattern[i] == "[":
+            end = _class_end(pattern, i)
+            out.append(pattern[i:end])
+            i = end
+        elif flags := _FLAG_GROUP.match(pattern, i):
+            i = flags.end()
+        else:
+            out.append(pattern[i])
+            i += 1
+
+    return "".join(out)
+
+
+class _Literals(NamedTuple):
+    """
+    The literal runs every match of part of a pattern contains. An alternation
+    of literals counts as its shortest alternative since a set of literals can
+    be prefiltered on just as well as one.
+    """
+
+    prefix: int
+    longest: int
+    suffix: int
+    # Whether the part is all literal, so its runs join its neighbours'
+    whole: bool
+
+
+_NO_LITERALS = _Literals(0, 0, 0, False)
+
+
+class _Structure:
+    """
+    The features of a parsed pattern that make it expensive to match
+    """
+
+    def __init__(self, parsed: "sre_parse.SubPattern") -> None:
+        self.nested_quantifiers = 0
+        self.unbounded_repeats = 0
+        self.large_repeats: list[int] = []
+        self.alternations_without_literal = 0
+        self._walk(parsed, in_repeat=False)
+        self.longest_literal = self._literals(parsed).longest
+        self.anchored = self._anchored(parsed)
+
+    def _walk(self, parsed: "sre_parse.SubPattern", in_repeat: bool) -> None:
+        for i, (op, av) in enumerate(parsed):
+            if op in _REPEATS:
+                lo, hi, body = av
+                repeats = hi == sre.MAXREPEAT or hi > 1
+                if repeats and in_repeat:
+                    self.nested_quantifiers += 1
+
+                if hi == sre.MAXREPEAT:
+                    self.unbounded_repeats += 1
+                elif hi - lo >= LARGE_REPEAT:
+                    self.large_repeats.append(hi)
+
+                self._walk(body, in_repeat or repeats)
+            elif op == sre.BRANCH:
+                alternatives = av[1]
+                # Alternations of single characters/assertions are effectively
+                # character classes
+                widest = max(alt.getwidth()[1] for alt in alternatives)
+                if widest > 1 and self._factor(parsed, i) < MIN_LITERAL:
+                    self.alternations_without_literal += 1
+
+                for alt in alternatives:
+                    self._walk(alt, in_repeat)
+            elif op == sre.SUBPATTERN:
+                self._walk(av[3], in_repeat)
+            elif op == sre.ATOMIC_GROUP:
+                self._walk(av, in_repeat)
+            elif op in (sre.ASSERT, sre.ASSERT_NOT):
+                self._walk(av[1], in_repeat)
+
+    def _factor(self, parsed: "sre_parse.SubPattern", index: int) -> int:
+        """
+        The longest literal an alternation shares with the literals around it.
+        The parser moves the common prefix of the alternatives in front of
+        them, so those have to be counted too.
+        """
+        branch = self._literals(parsed[index : index + 1])
+        before = self._literals(parsed[:index]).suffix
+        after = self._literals(parsed[index + 1 :]).prefix
+        return max(branch.longest, before + branch.prefix, branch.suffix + after)
+
+    def _item_literals(self, op, av) -> _Literals:
+        if op == sre.LITERAL:
+            return _Literals(1, 1, 1, True)
+        elif op == sre.AT:
+            # Zero width so literals on either side still join up
+            return _Literals(0, 0, 0, True)
+        elif op == sre.SUBPATTERN:
+            return self._literals(av[3])
+        elif op == sre.ATOMIC_GROUP:
+            return self._literals(av)
+        elif op in _REPEATS and av[0] >= 1:
+            inner = self._literals(av[2])
+            return inner._replace(whole=inner.whole and av[0] == av[1] == 1)
+        elif op == sre.BRANCH:
+            alternatives = [self._literals(alt) for alt in av[1]]
+            return _Literals(
+                min(alt.prefix for alt in alternatives),
+                min(alt.longest for alt in alternatives),
+                min(alt.suffix for alt in alternatives),
+                all(alt.whole for alt in alternatives),
+            )
+
+        return _NO_LITERALS
+
+    def _literals(self, parsed: "sre_parse.SubPattern") -> _Literals:
+        prefix = longest = run = 0
+        whole = True
+        for op, av in parsed:
+            item = self._item_literals(op, av)
+            longest = max(longest, item.longest, run + item.prefix)
+            run = run + item.longest if item.whole else item.suffix
+            if whole:
+                prefix += item.longest if item.whole else item.prefix
+                whole = item.whole
+
+        return _Literals(prefix, max(longest, run), run, whole)
+
+    def _anchored(self, parsed: "sre_parse.SubPattern") -> bool:
+        if not len(parsed):
+            return False
+
+        op, av = parsed[0]
+        if op == sre.AT:
+            return av in _ANCHORS
+        elif op == sre.SUBPATTERN:
+            return self._anchored(av[3])
+        elif op == sre.BRANCH:
+            return all(self._anchored(alt) for alt in av[1])
+
+        return False
+
+
+def analyze_pattern(rule: Rule) -> PatternCost:
+    pattern = _match_pattern(rule)
+    info = hscheck.expression_info(pattern)
+    issues = []
+    score = 0.0
+
+    if info["max_width"] is None:
+        issues.append("unbounded match width")
+        score += UNBOUNDED_WIDTH_COST
+
+    if info["min_width"] == 0:
+        issues.append("can match the empty string")
+        score += EMPTY_MATCH_COST
+
+    structure = None
+    if _PARSER_ERROR is not None:
+        issues.append(f"structure not analyzed: {_PARSER_ERROR}")
+    else:
+        try:
+            structure = _Structure(sre_parse.parse(_python_pattern(pattern)))
+        except re.error as e:
+            issues.append(f"structure not analyzed: {e}")
+        except AttributeError as e:
+            # The parser's output isn't what _Structure expects
+            issues.append(f"structure not analyzed: {_unsupported_parser(e)}")
+
+    if structure is not None:
+        if structure.nested_quantifiers:
+            issues.append(f"{structure.nested_quantifiers} nested quantifier(s)")
+            score += NESTED_QUANTIFIER_COST * structure.nested_quantifiers
+
+        for hi in structure.large_repeats:
+            issues.append(f"bounded repeat of up to {hi}")
+            score += LARGE_REPEAT_COST * hi
+
+        if structure.unbounded_repeats:
+            issues.append(f"{structure.unbounded_repeats} unbounded repeat(s)")
+            score += UNBOUNDED_REPEAT_COST * structure.unbounded_repeats
+
+        if structure.alternations_without_literal:
+            issues.append(
+                f"{structure.alternations_without_literal} alternation(s) "
+                "without a literal factor"
+            )
+            score += ALTERNATION_COST * structure.alternations_without_literal
+
+        if structure.longest_literal < MIN_LITERAL:
+            issues.append(f"no literal of at least {MIN_LITERAL} characters")
+            score += NO_LITERAL_COST
+
+    return PatternCost(
+        id=rule.id,
+        name=rule.meta.name,
+        pattern=pattern,
+        score=round(score, 2),
+        min_width=info["min_width"],
+        max_width=info["max_width"],
+        anchored=structure.anchored if structure else None,
+        longest_literal=structure.longest_literal if structure else None,
+        issues=issues,
+    )
+
+
+def analyze_rules(rules: list[Rule]) -> CostReport:
+    if _PARSER_ERROR is not None:
+        logger.warning("%s, only hyperscan's expression info is scored", _PARSER_ERROR)
+
+    results = [analyze_pattern(rule) for rule in rules]
+    results.sort(key=lambda result: result.score, reverse=True)
+    return CostReport(results=results)
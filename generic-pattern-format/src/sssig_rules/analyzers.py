@@ -0,0 +1,543 @@
+"""
+Run the rules' HTTP analyzers to verify candidate secrets.
+
+An analyzer's url, headers and body are liquid templates rendered with the
+candidate secret as target (along with any other variables given), and the
+secret is verified if the response passes all of the analyzer's conditions.
+A rule with several analyzers verifies a secret if any of them does.
+
+Requests are made with asyncio streams over keep-alive connections pooled
+per host, with a limit on the concurrent requests to each host. Verdicts are
+cached by rule id and a hash of the secret until they expire, so a secret
+found again isn't verified again, and concurrent verifications of the same
+secret share one set of requests.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import ssl
+import time
+
+from collections import OrderedDict
+from typing import AsyncIterator
+from typing import Iterable
+from typing import NamedTuple
+from urllib.parse import quote
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel
+
+from sssig_rules.conditions import CompiledCondition
+from sssig_rules.scanner import Finding
+from sssig_rules.schema import Analyzer
+from sssig_rules.schema import AnalyzerKind
+from sssig_rules.schema import Rule
+from sssig_rules.template import render
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_HOST_LIMIT = 4
+DEFAULT_CACHE_TTL = 3600.0
+DEFAULT_CACHE_SIZE = 100_000
+
+# Responses are only read up to this size, the rest of the body is ignored
+MAX_BODY_SIZE = 1024 * 1024
+
+USER_AGENT = "sssig-rules"
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Methods that can be sent again if a pooled connection fails, the server may
+# have acted on a request before the connection went away (RFC 9110 9.2.2)
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "TRACE", "PUT", "DELETE"})
+
+# URLs are normalized when rules are validated, which percent encodes the
+# braces and spaces of the templates in them
+_URL_VARIABLE = re.compile(r"(?:\{|%7B){2}(.*?)(?:\}|%7D){2}", re.IGNORECASE)
+
+
+class Verdict(BaseModel):
+    rule_id: str
+    verified: bool
+    # The status of the last response, if there was one
+    status: int | None = None
+    error: str | None = None
+
+
+class VerifiedFinding(Finding):
+    verified: bool | None = None
+    verification_error: str | None = None
+
+
+class ResponseError(ValueError):
+    pass
+
+
+class _StaleConnection(ConnectionError):
+    """
+    A pooled connection was closed by the server before it responded
+    """
+
+
+class _Response(NamedTuple):
+    status: int
+    # By lowercased header name
+    headers: dict[str, list[str]]
+    body: bytes
+
+
+class _Connection(NamedTuple):
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _header_line(name: str, value: str) -> str:
+    if any(c in name or c in value for c in "\r\n\0"):
+        raise ValueError(f"invalid characters in the {name!r} header")
+
+    return f"{name}: {value}\r\n"
+
+
+def _request_bytes(
+    method: str,
+    host: str,
+    target: str,
+    headers: dict[str, str],
+    body: bytes | None,
+) -> bytes:
+    names = {name.lower() for name in headers}
+    lines = [f"{method} {target} HTTP/1.1\r\n", _header_line("Host", host)]
+    if "user-agent" not in names:
+        lines.append(_header_line("User-Agent", USER_AGENT))
+
+    # Compressed bodies would need decoding before they're matched
+    lines.append(_header_line("Accept-Encoding", "identity"))
+    lines.extend(_header_line(name, value) for name, value in headers.items())
+    if body is not None:
+        lines.append(_header_line("Content-Length", str(len(body))))
+
+    lines.append("\r\n")
+    return "".join(lines).encode("latin-1") + (body or b"")
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, list[str]]:
+    headers: dict[str, list[str]] = {}
+    while line := (await reader.readline()).rstrip(b"\r\n"):
+        name, sep, value = line.decode("latin-1").partition(":")
+        if not sep:
+            raise ResponseError(f"malformed header: {line!r}")
+
+        headers.setdefault(name.strip().lower(), []).append(value.strip())
+
+    return headers
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> tuple[bytes, bool]:
+    """
+    The body (up to MAX_BODY_SIZE) and whether all of it was read
+    """
+    chunks = []
+    size = 0
+    while True:
+        line = await reader.readline()
+        chunk_size = int(line.split(b";", 1)[0].strip() or b"x", 16)
+        if chunk_size == 0:
+            await _read_headers(reader)
+            return b"".join(chunks), True
+
+        if size + chunk_size > MAX_BODY_SIZE:
+            chunks.append(await reader.readexactly(MAX_BODY_SIZE - size))
+            return b"".join(chunks), False
+
+        chunks.append(await reader.readexactly(chunk_size))
+        size += chunk_size
+        await reader.readexactly(2)
+
+
+async def _read_to_eof(reader: asyncio.StreamReader) -> bytes:
+    """
+    The data up to the end of the stream or MAX_BODY_SIZE, whichever is first.
+    A read only returns what has arrived so far.
+    """
+    chunks = []
+    size = 0
+    while size < MAX_BODY_SIZE and (chunk := await reader.read(MAX_BODY_SIZE - size)):
+        chunks.append(chunk)
+        size += len(chunk)
+
+    return b"".join(chunks)
+
+
+async def _read_response(
+    reader: asyncio.StreamReader,
+    method: str,
+) -> tuple[_Response, bool]:
+    """
+    The response and whether the connection can be used again
+    """
+    while True:
+        status_line = await reader.readline()
+        if not status_line:
+            raise _StaleConnection("the connection was closed")
+
+        version, _, rest = status_line.decode("latin-1").partition(" ")
+        try:
+            status = int(rest[:3])
+        except ValueError:
+            raise ResponseError(f"malformed status line: {status_line!r}") from None
+
+        headers = await _read_headers(reader)
+        # Informational responses are followed by the real one
+        if not 100 <= status < 200:
+            break
+
+    keep_alive = version == "HTTP/1.1" and "close" not in (
+        value.lower() for value in headers.get("connection", [])
+    )
+
+    if method == "HEAD" or status in (204, 304):
+        body = b""
+    elif "chunked" in ",".join(headers.get("transfer-encoding", [])).lower():
+        body, complete = await _read_chunked(reader)
+        keep_alive = keep_alive and complete
+    elif content_length := headers.get("content-length"):
+        length = int(content_length[0])
+        body = await reader.readexactly(min(length, MAX_BODY_SIZE))
+        keep_alive = keep_alive and length <= MAX_BODY_SIZE
+    else:
+        # The body runs until the server closes the connection
+        body = await _read_to_eof(reader)
+        keep_alive = False
+
+    return _Response(status, headers, body), keep_alive
+
+
+class _HostPool:
+    """
+    Keep-alive connections to one host and the limit on concurrent requests to
+    it
+    """
+
+    def __init__(
+        self,
+        scheme: str,
+        host: str,
+        port: int,
+        limit: int,
+        ssl_context: ssl.SSLContext | None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context if scheme == "https" else None
+        self._idle: list[_Connection] = []
+        self._limit = asyncio.Semaphore(limit)
+
+    async def _connect(self) -> _Connection:
+        reader, writer = await asyncio.open_connection(
+            self.host,
+            self.port,
+            ssl=self.ssl_context,
+            limit=MAX_BODY_SIZE,
+        )
+        return _Connection(reader, writer)
+
+    async def _exchange(
+        self,
+        connection: _Connection,
+        method: str,
+        request: bytes,
+    ) -> _Response:
+        try:
+            connection.writer.write(request)
+            await connection.writer.drain()
+            response, keep_alive = await _read_response(connection.reader, method)
+        except BaseException:
+            connection.close()
+            raise
+
+        if keep_alive:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+        return response
+
+    async def request(self, method: str, request: bytes, timeout: float) -> _Response:
+        """
+        Send the request and read the response. The timeout starts once the
+        request's turn under the host's limit comes, not while it waits.
+        """
+        async with self._limit, asyncio.timeout(timeout):
+            while self._idle:
+                connection = self._idle.pop()
+                if connection.reader.at_eof():
+                    connection.close()
+                    continue
+
+                try:
+                    return await self._exchange(connection, method, request)
+                except (_StaleConnection, ConnectionResetError, BrokenPipeError):
+                    if method not in _IDEMPOTENT_METHODS:
+                        raise
+
+                    # The server closed the idle connection, use a new one
+                    logger.debug("stale connection: host=%s", self.host)
+
+            return await self._exchange(await self._connect(), method, request)
+
+    def close(self) -> None:
+        for connection in self._idle:
+            connection.close()
+
+        self._idle.clear()
+
+
+class VerdictCache:
+    """
+    Verdicts by key until they're older than the ttl. Every verdict lives as
+    long, so the oldest are always first and are evicted as new ones are
+    added.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_CACHE_TTL,
+        max_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, bytes], tuple[float, Verdict]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple[str, bytes]) -> Verdict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, verdict = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        return verdict
+
+    def put(self, key: tuple[str, bytes], verdict: Verdict) -> None:
+        now = time.monotonic()
+        self._entries[key] = (now + self.ttl, verdict)
+        self._entries.move_to_end(key)
+
+        while self._entries:
+            oldest_key, (expires, _) = next(iter(self._entries.items()))
+            if expires > now and len(self._entries) <= self.max_size:
+                break
+
+            del self._entries[oldest_key]
+
+
+def secret_hash(secret: str, variables: dict[str, str] | None = None) -> bytes:
+    """
+    A hash of the secret and the other variables its analyzers are rendered
+    with, so secrets aren't kept in the cache
+    """
+    digest = hashlib.sha256(secret.encode())
+    for name, value in sorted((variables or {}).items()):
+        digest.update(f"\0{name}\0{value}".encode())
+
+    return digest.digest()
+
+
+def _url_template(url: str) -> str:
+    return _URL_VARIABLE.sub(lambda m: "{{" + unquote(m[1]) + "}}", url)
+
+
+class AnalyzerRunner:
+    """
+    Verifies candidate secrets with the analyzers of their rules. Use it as an
+    async context manager so its connections are closed.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[Rule],
+        host_limit: int = DEFAULT_HOST_LIMIT,
+        timeout: float = DEFAULT_TIMEOUT,
+        cache: VerdictCache | None = None,
+        ssl_context: ssl.SSLContext | None = None,
+    ) -> None:
+        self.host_limit = host_limit
+        self.timeout = timeout
+        self.cache = cache if cache is not None else VerdictCache()
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.requests = 0
+
+        # Each rule's HTTP analyzers with their compiled conditions
+        self._analyzers: dict[str, list[tuple[Analyzer, CompiledCondition]]] = {}
+        for rule in rules:
+            analyzers = [
+                (a, CompiledCondition(a.condition))
+                for a in rule.analyzers or []
+                if a.meta.kind == AnalyzerKind.HTTP
+            ]
+            if analyzers:
+                self._analyzers.setdefault(rule.id, analyzers)
+
+        self._pools: dict[tuple[str, str, int], _HostPool] = {}
+        self._pending: dict[tuple[str, bytes], asyncio.Future[Verdict]] = {}
+
+    async def __aenter__(self) -> "AnalyzerRunner":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for pool in self._pools.values():
+            pool.close()
+
+        self._pools.clear()
+
+    def has_analyzers(self, rule_id: str) -> bool:
+        return rule_id in self._analyzers
+
+    async def verify(
+        self,
+        rule_id: str,
+        secret: str,
+        variables: dict[str, str] | None = None,
+    ) -> Verdict | None:
+        """
+        Verify the secret with the rule's analyzers, or None if the rule has no
+        HTTP analyzers. Failed requests are verdicts with an error, which
+        aren't cached.
+        """
+        if rule_id not in self._analyzers:
+            return None
+
+        key = (rule_id, secret_hash(secret, variables))
+        if (verdict := self.cache.get(key)) is not None:
+            return verdict
+
+        if (pending := self._pending.get(key)) is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.ensure_future(
+            self._verify(rule_id, {**(variables or {}), "target": secret})
+        )
+        self._pending[key] = future
+        try:
+            verdict = await asyncio.shield(future)
+        finally:
+            del self._pending[key]
+
+        if verdict.error is None:
+            self.cache.put(key, verdict)
+
+        return verdict
+
+    async def _verify(self, rule_id: str, variables: dict[str, str]) -> Verdict:
+        status = None
+        for analyzer, condition in self._analyzers[rule_id]:
+            try:
+                response = await self._run(analyzer, variables)
+            except TimeoutError:
+                return Verdict(rule_id=rule_id, verified=False, error="timed out")
+            except Exception as e:
+                return Verdict(
+                    rule_id=rule_id,
+                    verified=False,
+                    status=status,
+                    error=f"{type(e).__name__}: {e}",
+                )
+
+            status = response.status
+            if condition.matches(response.status, response.headers, response.body):
+                return Verdict(rule_id=rule_id, verified=True, status=status)
+
+        return Verdict(rule_id=rule_id, verified=False, status=status)
+
+    async def _run(self, analyzer: Analyzer, variables: dict[str, str]) -> _Response:
+        action = analyzer.action
+        url = urlsplit(
+            render(
+                _url_template(str(action.url)),
+                {name: quote(value, safe="") for name, value in variables.items()},
+            )
+        )
+        headers = {
+            name: render(value, variables)
+            for name, value in (action.headers or {}).items()
+        }
+        body = None if action.body is None else render(action.body, variables)
+
+        if url.scheme not in _DEFAULT_PORTS or not url.hostname:
+            raise ValueError(f"unsupported url: {url.geturl()}")
+
+        port = url.port or _DEFAULT_PORTS[url.scheme]
+        pool_key = (url.scheme, url.hostname, port)
+        if (pool := self._pools.get(pool_key)) is None:
+            pool = self._pools[pool_key] = _HostPool(
+                url.scheme,
+                url.hostname,
+                port,
+                self.host_limit,
+                self.ssl_context,
+            )
+
+        method = (action.method or "GET").upper()
+        target = url.path or "/"
+        if url.query:
+            target = f"{target}?{url.query}"
+
+        request = _request_bytes(
+            method,
+            url.netloc.rpartition("@")[2],
+            target,
+            headers,
+            None if body is None else body.encode(),
+        )
+
+        self.requests += 1
+        return await pool.request(method, request, action.timeout or self.timeout)
+
+
+async def verify_findings(
+    runner: AnalyzerRunner,
+    findings: Iterable[Finding],
+    batch_size: int = 256,
+) -> AsyncIterator[VerifiedFinding]:
+    """
+    Verify the findings of rules with analyzers, a batch at a time so the
+    requests run concurrently, in the order the findings are given
+    """
+
+    async def verified(finding: Finding) -> VerifiedFinding:
+        result = VerifiedFinding(**finding.model_dump())
+        verdict = await runner.verify(finding.rule_id, finding.target)
+        if verdict is not None:
+            result.verified = verdict.verified
+            result.verification_error = verdict.error
+
+        return result
+
+    batch: list[Finding] = []
+    for finding in findings:
+        batch.append(finding)
+        if len(batch) >= batch_size:
+            for result in await asyncio.gather(*map(verified, batch)):
+                yield result
+
+            batch.clear()
+
+    for result in await asyncio.gather(*map(verified, batch)):
+        yield result
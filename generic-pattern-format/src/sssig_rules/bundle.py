@@ -0,0 +1,177 @@
+"""
+Rule bundles: every rule's match pattern compiled into one hyperscan database
+and serialized along with a compact table of rule metadata, so matching can
+start without compiling the rules again.
+
+A bundle file is laid out as (little endian):
+
+    magic           8 bytes, MAGIC
+    format version  uint32, FORMAT_VERSION
+    metadata size   uint32
+    database size   uint64
+    metadata        JSON, see _metadata
+    database        hyperscan's serialized database
+
+The id of each expression in the database is the index of its rule in the
+metadata table.
+"""
+
+import json
+import logging
+import mmap
+import struct
+
+from pathlib import Path
+from typing import Any
+from typing import NamedTuple
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.database import compile_rules
+from sssig_rules.schema import Rule
+from sssig_rules.targets.common import _min_entropy
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SSSIGHS\0"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQ")
+
+
+class BundleError(ValueError):
+    pass
+
+
+class BundleRule(NamedTuple):
+    id: str
+    kind: str
+    confidence: str | None
+    report: bool
+    min_entropy: float | None
+    # The flags the rule's pattern was compiled with, or None if it was left
+    # out of the database
+    flags: int | None
+
+
+class Bundle(NamedTuple):
+    db: hscheck.Database
+    mode: int
+    # The version of hyperscan that compiled the database
+    hyperscan: str
+    rules: list[BundleRule]
+
+
+def _bundle_rule(rule: Rule, flags: int | None) -> BundleRule:
+    return BundleRule(
+        id=rule.id,
+        kind=rule.meta.kind,
+        confidence=rule.meta.confidence,
+        report=rule.meta.report,
+        min_entropy=_min_entropy(rule),
+        flags=flags,
+    )
+
+
+def _metadata(mode: int, rules: list[BundleRule]) -> dict[str, Any]:
+    """
+    The rules are stored as rows of values in BundleRule's field order, which
+    is a lot smaller than an object per rule
+    """
+    return {
+        "hyperscan": hscheck.version(),
+        "mode": mode,
+        "columns": list(BundleRule._fields),
+        "rules": [list(rule) for rule in rules],
+    }
+
+
+def write_bundle(
+    path: Path,
+    rules: list[Rule],
+    flags: int = 0,
+    mode: int = hscheck.MODE_BLOCK,
+    fallback_flags: int | None = None,
+) -> Bundle:
+    """
+    Compile the rules (see compile_rules) and write them to a bundle file
+    """
+    db, rule_flags = compile_rules(rules, flags, mode, fallback_flags)
+    bundle_rules = [_bundle_rule(*args) for args in zip(rules, rule_flags)]
+    metadata = json.dumps(
+        _metadata(mode, bundle_rules),
+        separators=(",", ":"),
+    ).encode()
+    database = db.serialize()
+
+    with path.open("wb") as bundlefile:
+        bundlefile.write(
+            _HEADER.pack(MAGIC, FORMAT_VERSION, len(metadata), len(database))
+        )
+        bundlefile.write(metadata)
+        bundlefile.write(database)
+
+    logger.info(
+        "wrote bundle: path=%s rules=%d size=%d",
+        path,
+        len(bundle_rules),
+        _HEADER.size + len(metadata) + len(database),
+    )
+    return Bundle(db, mode, hscheck.version(), bundle_rules)
+
+
+def _read_bundle(data: memoryview) -> Bundle:
+    if len(data) < _HEADER.size:
+        raise BundleError("not a rule bundle: the file is too small")
+
+    magic, version, metadata_size, database_size = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise BundleError("not a rule bundle")
+
+    if version != FORMAT_VERSION:
+        raise BundleError(
+            f"unsupported bundle format version {version}, "
+            f"expected {FORMAT_VERSION}"
+        )
+
+    database_start = _HEADER.size + metadata_size
+    if len(data) != database_start + database_size:
+        raise BundleError("the bundle is truncated or corrupt")
+
+    # Every field is read here so metadata that isn't what write_bundle wrote
+    # is reported as a BundleError
+    try:
+        metadata = json.loads(bytes(data[_HEADER.size : database_start]))
+        columns = metadata["columns"]
+        mode = int(metadata["mode"])
+        hyperscan = str(metadata["hyperscan"])
+        rules = [BundleRule(*row) for row in metadata["rules"]]
+    except (ValueError, KeyError, TypeError) as e:
+        raise BundleError(f"the bundle's metadata is corrupt: {e!r}") from e
+
+    if columns != list(BundleRule._fields):
+        raise BundleError(f"unexpected rule columns: {columns}")
+
+    with data[database_start:] as database:
+        try:
+            db = hscheck.deserialize(database)
+        except ValueError as e:
+            raise BundleError(
+                f"unable to load a database compiled by hyperscan "
+                f"{hyperscan} with {hscheck.version()}: {e}"
+            ) from e
+
+    return Bundle(db, mode, hyperscan, rules)
+
+
+def load_bundle(path: Path) -> Bundle:
+    """
+    Load a bundle written by write_bundle. The file is memory mapped rather
+    than read so only the database is copied, by hyperscan.
+    """
+    with path.open("rb") as bundlefile:
+        if path.stat().st_size == 0:
+            raise BundleError("not a rule bundle: the file is empty")
+
+        with mmap.mmap(bundlefile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as data:
+                return _read_bundle(data)
@@ -0,0 +1,231 @@
+"""
+Persistent caches for pattern validation results and translated rules.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import sqlite3
+import time
+
+from pathlib import Path
+from typing import Any
+
+from sssig_rules import hscheck  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+# SQLite limits the number of host parameters in a single statement
+_QUERY_CHUNK_SIZE = 500
+
+
+def cache_dir() -> Path:
+    """
+    The directory the caches are stored in. Set SSSIG_CACHE_DIR to override it.
+    """
+    if path := os.environ.get("SSSIG_CACHE_DIR"):
+        return Path(path)
+
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "sssig-rules"
+
+
+def _chunks(items: list, size: int = _QUERY_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class _SqliteCache:
+    """
+    A size bounded key/value store in a SQLite file. The least recently used
+    entries are evicted once there are more than max_entries.
+
+    Each lookup and store is its own transaction. Lookups write too (marking
+    the entries used), so a transaction left open would hold the file's write
+    lock, blocking every other process sharing the cache, until it's closed.
+    """
+
+    filename: str
+    name: str
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.path = path or cache_dir() / self.filename
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Several translation processes may share the cache, and the daemon
+        # uses it from worker threads (one at a time)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key BLOB PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)"
+        )
+
+    def _get_many(self, keys: list[bytes]) -> dict[bytes, str]:
+        found: dict[bytes, str] = {}
+
+        with self._db:
+            for chunk in _chunks(keys):
+                params = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({params})",
+                    chunk,
+                )
+                found.update(rows)
+                self._db.execute(
+                    f"UPDATE entries SET used = ? WHERE key IN ({params})",
+                    [time.time(), *chunk],
+                )
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def _put_many(self, items: dict[bytes, str]) -> None:
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, used) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in items.items()],
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count <= self.max_entries:
+            return
+
+        self._db.execute(
+            "DELETE FROM entries WHERE key IN "
+            "(SELECT key FROM entries ORDER BY used LIMIT ?)",
+            (count - self.max_entries,),
+        )
+
+    def close(self) -> None:
+        self._db.close()
+        logger.info("%s cache: hits=%d misses=%d", self.name, self.hits, self.misses)
+
+
+class ValidationCache(_SqliteCache):
+    """
+    Maps pattern text to the hyperscan compile error for it ("" when valid).
+
+    Entries are keyed by a hash of the pattern, the compile flags and mode, and
+    the hyperscan version and platform so upgrading hyperscan doesn't reuse
+    stale results.
+    """
+
+    filename = "validation.sqlite3"
+    name = "pattern validation"
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        flags: int = 0,
+        mode: str = "block",
+    ) -> None:
+        super().__init__(path, max_entries)
+        self._salt = "\0".join(
+            [
+                hscheck.version(),
+                platform.machine(),
+                f"flags={flags}",
+                f"mode={mode}",
+                "",
+            ]
+        )
+
+    def _key(self, pattern: str) -> bytes:
+        return hashlib.sha256((self._salt + pattern).encode()).digest()
+
+    def get_many(self, patterns: list[str]) -> dict[str, str]:
+        """
+        Look up the cached errors for the patterns. Patterns that aren't in the
+        cache are left out of the result.
+        """
+        keys = {self._key(pattern): pattern for pattern in patterns}
+        return {keys[key]: err for key, err in self._get_many(list(keys)).items()}
+
+    def put_many(self, results: dict[str, str]) -> None:
+        """
+        Store the errors for the patterns ("" for valid patterns)
+        """
+        self._put_many({self._key(p): err for p, err in results.items()})
+
+
+class BuildCache(_SqliteCache):
+    """
+    Maps a (target, rule hash) pair to the translated fragment for that rule.
+
+    The translator sources are part of the key so changing a translator
+    invalidates everything it produced before.
+    """
+
+    filename = "build.sqlite3"
+    name = "build"
+
+    def __init__(
+        self,
+        salt: bytes,
+        path: Path | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        super().__init__(path, max_entries)
+        self._salt = salt
+
+    def _key(self, rule_hash: bytes) -> bytes:
+        return hashlib.sha256(self._salt + rule_hash).digest()
+
+    def get_many(self, rule_hashes: list[bytes]) -> dict[bytes, Any]:
+        """
+        Look up the cached fragments for the rule hashes. Rules that aren't in
+        the cache are left out of the result.
+        """
+        keys = {self._key(rule_hash): rule_hash for rule_hash in rule_hashes}
+        return {
+            keys[key]: json.loads(fragment)
+            for key, fragment in self._get_many(list(keys)).items()
+        }
+
+    def put_many(self, fragments: dict[bytes, Any]) -> None:
+        self._put_many(
+            {
+                self._key(rule_hash): json.dumps(fragment)
+                for rule_hash, fragment in fragments.items()
+            }
+        )
+
+
+def open_validation_cache(**kwargs) -> ValidationCache | None:
+    """
+    Open the validation cache, or return None if it can't be used so callers
+    can carry on without it
+    """
+    try:
+        return ValidationCache(**kwargs)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("pattern validation cache disabled: %s", e)
+        return None
+
+
+def open_build_cache(salt: bytes, **kwargs) -> BuildCache | None:
+    """
+    Open the build cache, or return None if it can't be used so callers can
+    carry on without it
+    """
+    try:
+        return BuildCache(salt, **kwargs)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("build cache disabled: %s", e)
+        return None
@@ -0,0 +1,65 @@
+"""
+The client for the rules daemon (see sssig_rules.daemon).
+
+Requests and responses are a line of JSON each over the daemon's Unix
+socket. Only the standard library is used here so asking a running daemon
+takes milliseconds, where loading the rules in process means importing and
+validating everything.
+"""
+
+import hashlib
+import json
+import os
+import socket
+
+from pathlib import Path
+from typing import Any
+
+DEFAULT_TIMEOUT = 30.0
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+def socket_path(rulespath: Path) -> Path:
+    """
+    Where the daemon for a rules file listens, one per rules file
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    digest = hashlib.sha256(os.fsencode(rulespath.resolve())).hexdigest()[:16]
+    return Path(base) / f"sssig-rules-{os.getuid()}-{digest}.sock"
+
+
+def request(
+    rulespath: Path,
+    message: dict[str, Any],
+    timeout: float = DEFAULT_TIMEOUT,
+) -> dict[str, Any] | None:
+    """
+    Send a request to the daemon for the rules file and return its response,
+    or None if no daemon is running for it. Raises DaemonError if the daemon
+    couldn't handle the request.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(os.fspath(socket_path(rulespath)))
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    finally:
+        sock.close()
+
+    if not line:
+        raise DaemonError("the daemon closed the connection without responding")
+
+    response = json.loads(line)
+    if not response.get("ok"):
+        raise DaemonError(response.get("error") or "the request failed")
+
+    return response
@@ -0,0 +1,212 @@
+"""
+Analyzer conditions compiled for evaluating responses and translating them.
+
+Status ranges are merged into sorted intervals, header names and expected
+values are normalized once, and the body patterns and strings of every
+matcher in a condition are compiled into one hyperscan database (each
+pattern's id is the index of its matcher) so a body is scanned once however
+many there are.
+"""
+
+import json
+import re
+import xml.etree.ElementTree as ElementTree
+
+from bisect import bisect_right
+from functools import cached_property
+from typing import Iterable
+from typing import Iterator
+from typing import Sequence
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.schema import HttpMatcher
+from sssig_rules.schema import Syntax
+from sssig_rules.targets.common import _strings_to_pattern
+
+# The inclusive range of valid HTTP statuses
+MIN_STATUS = 100
+MAX_STATUS = 599
+
+_HTML = re.compile(rb"<html[\s>]", re.IGNORECASE)
+
+
+class StatusSet:
+    """
+    A set of statuses as sorted, merged, inclusive intervals
+    """
+
+    def __init__(self, ranges: Iterable[Sequence[int]] = ()) -> None:
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        for start, end in sorted((r[0], r[-1]) for r in ranges):
+            if self._ends and start <= self._ends[-1] + 1:
+                self._ends[-1] = max(self._ends[-1], end)
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    def __contains__(self, status: int) -> bool:
+        i = bisect_right(self._starts, status) - 1
+        return i >= 0 and status <= self._ends[i]
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in self.intervals())
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self.intervals():
+            yield from range(start, end + 1)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StatusSet):
+            return NotImplemented
+
+        return self.intervals() == other.intervals()
+
+    def __repr__(self) -> str:
+        return f"StatusSet({self.intervals()})"
+
+    def intervals(self) -> list[tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def complement(
+        self,
+        start: int = MIN_STATUS,
+        end: int = MAX_STATUS,
+    ) -> "StatusSet":
+        """
+        The statuses from start to end (inclusive) that aren't in the set
+        """
+        gaps = []
+        for interval_start, interval_end in self.intervals():
+            if interval_start > start:
+                gaps.append((start, min(interval_start - 1, end)))
+
+            start = max(start, interval_end + 1)
+
+        gaps.append((start, end))
+        return StatusSet(gap for gap in gaps if gap[0] <= gap[1])
+
+    def smallest_form(self) -> tuple[bool, "StatusSet"]:
+        """
+        Whether listing the valid statuses that aren't in the set is shorter
+        than listing the valid statuses in it, and the shorter of the two.
+        Statuses outside of the valid range can't be responses so they're
+        left out of both.
+        """
+        negated = self.complement()
+        valid = negated.complement()
+        if len(valid) > len(negated):
+            return True, negated
+
+        return False, valid
+
+
+def has_syntax(syntax: Syntax, headers: dict[str, list[str]], body: bytes) -> bool:
+    match syntax:
+        case Syntax.JSON:
+            try:
+                json.loads(body)
+            except ValueError:
+                return False
+        case Syntax.XML:
+            try:
+                ElementTree.fromstring(body)
+            except ElementTree.ParseError:
+                return False
+        case Syntax.HTML:
+            content_types = ",".join(headers.get("content-type", []))
+            return "html" in content_types.lower() or bool(_HTML.search(body))
+
+    return True
+
+
+class CompiledMatcher:
+    def __init__(self, matcher: HttpMatcher) -> None:
+        self.statuses = (
+            StatusSet(matcher.statuses) if matcher.statuses is not None else None
+        )
+        # Lowercased header names and the lowercased values one of which has
+        # to be in the header's value
+        self.headers = [
+            (name.lower(), [value.lower() for value in values])
+            for name, values in (matcher.headers or {}).items()
+        ]
+        self.body_syntax = matcher.body_syntax
+        self.body_patterns = list(matcher.body_patterns or [])
+        strings_pattern = _strings_to_pattern(matcher.body_strings)
+        if strings_pattern is not None:
+            self.body_patterns.append(strings_pattern)
+
+    def matches_head(self, status: int, headers: dict[str, list[str]]) -> bool:
+        """
+        Whether the status and headers match. headers should have lowercased
+        names and values.
+        """
+        if self.statuses and status not in self.statuses:
+            return False
+
+        return all(
+            any(e in value for e in expected for value in headers.get(name, []))
+            for name, expected in self.headers
+        )
+
+
+class CompiledCondition:
+    """
+    An analyzer's condition, which matches a response if all of its matchers
+    do. Each matcher matches if all of the fields it sets do, and any one of a
+    field's values can match.
+    """
+
+    def __init__(self, condition: list[HttpMatcher]) -> None:
+        self.matchers = [CompiledMatcher(matcher) for matcher in condition]
+        self._with_patterns = {
+            i for i, m in enumerate(self.matchers) if m.body_patterns
+        }
+
+    @cached_property
+    def _body_db(self) -> "hscheck.Database | None":
+        # Compiled the first time a body is checked, translation only needs the
+        # statuses and headers
+        patterns = []
+        ids = []
+        for i, matcher in enumerate(self.matchers):
+            patterns.extend(matcher.body_patterns)
+            ids.extend([i] * len(matcher.body_patterns))
+
+        if not patterns:
+            return None
+
+        return hscheck.compile(patterns, ids=ids, flags=hscheck.FLAG_SINGLEMATCH)
+
+    def _body_matches(self, body: bytes) -> set[int]:
+        """
+        The indexes of the matchers with a body pattern matching the body
+        """
+        if self._body_db is None:
+            return set()
+
+        return {i for i, _, _ in self._body_db.scan(body)}
+
+    def matches(self, status: int, headers: dict[str, list[str]], body: bytes) -> bool:
+        """
+        Whether a response matches. headers should have lowercased names.
+        """
+        normalized = {
+            name: [value.lower() for value in values]
+            for name, values in headers.items()
+        }
+        if not all(m.matches_head(status, normalized) for m in self.matchers):
+            return False
+
+        if not all(
+            has_syntax(m.body_syntax, headers, body)
+            for m in self.matchers
+            if m.body_syntax
+        ):
+            return False
+
+        if not self._with_patterns:
+            return True
+
+        return self._with_patterns <= self._body_matches(body)
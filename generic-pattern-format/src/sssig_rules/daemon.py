@@ -0,0 +1,421 @@
+"""
+A long running process that keeps a rules file's validated rules and their
+translations in memory and serves them over a Unix socket.
+
+The rules file's directory is watched with inotify (or polled where inotify
+isn't available) and the file is reloaded when it changes. Each rule's raw
+data is compared with the last load so only the rules that changed are
+validated again, and each target keeps the translated fragments of the rules
+by their raw data so only the changed rules are translated again. The
+translations for every target are rebuilt after each reload, so a translate
+request only has to send them.
+
+Requests are a line of JSON with a command:
+
+    {"command": "validate"}
+    {"command": "translate", "target": "gitleaks"}
+
+and get a line of JSON back with "ok" and the result, or "error" saying why
+it failed (e.g. the rules file isn't valid).
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import time
+
+from pathlib import Path
+from typing import Any
+from typing import AsyncIterator
+
+import yaml
+
+from pydantic import ValidationError
+
+from sssig_rules import targets
+from sssig_rules.cache import ValidationCache
+from sssig_rules.client import socket_path
+from sssig_rules.dependencies import check_dependencies
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import Rule
+from sssig_rules.schema import validate_rules
+from sssig_rules.targets import TargetKind
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+# How long to wait for more changes after one, editors often write a file in
+# several steps
+DEBOUNCE_SECONDS = 0.05
+
+# From <sys/inotify.h>
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _rule_key(rule_data: Any) -> str:
+    """
+    The raw data of a rule in a canonical form, to tell if it changed
+    """
+    return json.dumps(rule_data, sort_keys=True, default=str)
+
+
+class RuleSet:
+    """
+    The validated rules of a rules file and their translations, kept current
+    with reload
+    """
+
+    def __init__(
+        self,
+        rulespath: Path,
+        cache: ValidationCache | None = None,
+        threads: int = 1,
+    ):
+        self.rulespath = rulespath
+        self.cache = cache
+        self.threads = threads
+        self.rules: list[Rule] = []
+        self.outputs: dict[TargetKind, str] = {}
+        self.error: str | None = None
+        self.reloads = 0
+
+        self._digest: bytes | None = None
+        self._validated: dict[str, Rule] = {}
+        self._fragments: dict[TargetKind, dict[str, Any]] = {
+            kind: {} for kind in TargetKind
+        }
+
+    def reload(self) -> bool:
+        """
+        Load the rules file again if its content changed, returning whether
+        it did
+        """
+        try:
+            content = self.rulespath.read_bytes()
+        except OSError as e:
+            self.error = f"can't read {self.rulespath}: {e}"
+            self._digest = None
+            return True
+
+        digest = hashlib.sha256(content).digest()
+        if digest == self._digest:
+            return False
+
+        self._digest = digest
+        start = time.perf_counter()
+        try:
+            validated = self._load(content)
+        except (yaml.YAMLError, ValidationError, ValueError, KeyError, TypeError) as e:
+            self.error = str(e)
+            logger.error("invalid rules: %s", e)
+            return True
+
+        self.error = None
+        self.reloads += 1
+        logger.info(
+            "reloaded %d rules (%d validated) in %.3fs",
+            len(self.rules),
+            validated,
+            time.perf_counter() - start,
+        )
+        return True
+
+    def _load(self, content: bytes) -> int:
+        """
+        Load the rules from the file's content, validating the rules that
+        weren't in the last load and translating them for every target.
+        Returns the number of rules validated.
+        """
+        if self.rulespath.suffix == ".json":
+            rules_data = json.loads(content)["rules"]
+        else:
+            rules_data = load_rules_data(content.decode())
+
+        keys = [_rule_key(rule_data) for rule_data in rules_data]
+        new = {}
+        for i, key in enumerate(keys):
+            if key not in self._validated and key not in new:
+                new[key] = i
+
+        positions = list(new.values())
+        validated = dict(
+            zip(new, self._validate([rules_data[i] for i in positions], positions))
+        )
+        validated.update(
+            (key, self._validated[key]) for key in keys if key in self._validated
+        )
+        rules = [validated[key] for key in keys]
+        check_dependencies(rules)
+
+        outputs = {}
+        for kind in TargetKind:
+            module = targets.module(kind)
+            previous = self._fragments[kind]
+            fragments = {
+                key: previous[key] if key in previous else module._fragment(rule)
+                for key, rule in validated.items()
+            }
+            outputs[kind] = module._document([fragments[key] for key in keys])
+            self._fragments[kind] = fragments
+
+        # Only replaced once everything succeeded, so a broken edit leaves the
+        # last good rules to build on
+        self.rules = rules
+        self.outputs = outputs
+        self._validated = validated
+        return len(new)
+
+    def _validate(self, rules_data: list[Any], positions: list[int]) -> list[Rule]:
+        try:
+            return validate_rules(rules_data, self.cache, threads=self.threads)
+        except ValidationError as e:
+            # Located by the rules' positions in the file rather than in the
+            # list of changed rules
+            raise ValidationError.from_exception_data(
+                e.title,
+                [
+                    {**err, "loc": (positions[err["loc"][0]], *err["loc"][1:])}
+                    for err in e.errors()
+                ],
+            ) from None
+
+    def handle(self, message: Any) -> dict[str, Any]:
+        """
+        The response to a request
+        """
+        if not isinstance(message, dict):
+            return {"ok": False, "error": "requests must be JSON objects"}
+
+        self.reload()
+        match message.get("command"):
+            case "validate" if self.error is None:
+                return {"ok": True, "rules": len(self.rules)}
+            case "translate" if self.error is None:
+                try:
+                    kind = TargetKind(message.get("target"))
+                except ValueError:
+                    return {
+                        "ok": False,
+                        "error": f"invalid target: {message.get('target')!r}",
+                    }
+
+                return {"ok": True, "output": self.outputs[kind]}
+            case "validate" | "translate":
+                return {"ok": False, "error": self.error}
+            case command:
+                return {"ok": False, "error": f"unknown command: {command!r}"}
+
+    def write_outputs(self, output_dir: Path) -> None:
+        """
+        Write each target's translation to its file in output_dir, leaving the
+        files whose content didn't change alone
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for kind, output in self.outputs.items():
+            outpath = output_dir / targets.filename(kind)
+            content = output + "\n"
+            try:
+                if outpath.read_text() == content:
+                    continue
+            except FileNotFoundError:
+                pass
+
+            outpath.write_text(content)
+            logger.info("wrote %s", outpath)
+
+
+def _inotify(directory: Path) -> int | None:
+    """
+    A nonblocking inotify file descriptor watching the directory, or None if
+    inotify isn't available
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+
+    if fd < 0:
+        return None
+
+    if libc.inotify_add_watch(fd, os.fsencode(directory), _IN_WATCH_MASK) < 0:
+        logger.warning("can't watch %s: %s", directory, os.strerror(ctypes.get_errno()))
+        os.close(fd)
+        return None
+
+    return fd
+
+
+def _event_names(data: bytes) -> list[bytes]:
+    """
+    The names of the files in a buffer of inotify events
+    """
+    names = []
+    offset = 0
+    while offset < len(data):
+        _, _, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+        offset += _INOTIFY_EVENT.size
+        names.append(data[offset : offset + length].rstrip(b"\0"))
+        offset += length
+
+    return names
+
+
+async def watch(
+    path: Path,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+) -> AsyncIterator[None]:
+    """
+    Yield when the file might have changed. The file's directory is watched
+    with inotify, so files replaced by renaming them (as many editors do) are
+    noticed. Without inotify the file's metadata is polled instead.
+    """
+    fd = _inotify(path.parent)
+    if fd is None:
+        logger.info("polling %s every %.2fs", path, poll_interval)
+        async for _ in _poll(path, poll_interval):
+            yield
+
+        return
+
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+    name = os.fsencode(path.name)
+
+    def read_events() -> None:
+        try:
+            while data := os.read(fd, 64 * 1024):
+                if name in _event_names(data):
+                    changed.set()
+        except BlockingIOError:
+            pass
+
+    loop.add_reader(fd, read_events)
+    try:
+        while True:
+            await changed.wait()
+            await asyncio.sleep(DEBOUNCE_SECONDS)
+            changed.clear()
+            yield
+    finally:
+        loop.remove_reader(fd)
+        os.close(fd)
+
+
+async def _poll(path: Path, interval: float) -> AsyncIterator[None]:
+    def signature() -> tuple[int, int, int] | None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    last = signature()
+    while True:
+        await asyncio.sleep(interval)
+        if (current := signature()) != last:
+            last = current
+            yield
+
+
+def _is_serving(path: Path) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(os.fspath(path))
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+    return True
+
+
+async def serve(
+    ruleset: RuleSet,
+    output_dir: Path | None = None,
+    path: Path | None = None,
+) -> None:
+    """
+    Serve requests for the rules until cancelled (or sent SIGTERM), reloading
+    them as the rules file changes
+    """
+    path = path or socket_path(ruleset.rulespath)
+    lock = asyncio.Lock()
+
+    async def in_thread(fn, *args):
+        # Reloading validates and translates rules, which would stop the loop
+        # accepting connections, so the rule set is used in a worker thread
+        # by one caller at a time
+        async with lock:
+            return await asyncio.to_thread(fn, *args)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            line = await reader.readline()
+            try:
+                message = json.loads(line)
+            except ValueError:
+                response = {"ok": False, "error": "requests must be a line of JSON"}
+            else:
+                response = await in_thread(ruleset.handle, message)
+
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    written = None
+
+    def reload() -> None:
+        # Requests reload the rules too, so the outputs are written whenever
+        # they've been reloaded since they were last written
+        nonlocal written
+        ruleset.reload()
+        if output_dir is not None and not ruleset.error and written != ruleset.reloads:
+            ruleset.write_outputs(output_dir)
+            written = ruleset.reloads
+
+    if _is_serving(path):
+        raise RuntimeError(f"a daemon is already serving {path}")
+
+    await in_thread(reload)
+
+    # A socket left behind by a daemon that didn't exit cleanly
+    path.unlink(missing_ok=True)
+    server = await asyncio.start_unix_server(handle, path)
+    # Stopped like any service, cleaning up the socket on the way out
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGTERM, asyncio.current_task().cancel
+    )
+    logger.info("serving %s on %s", ruleset.rulespath, path)
+    try:
+        async with server:
+            async for _ in watch(ruleset.rulespath):
+                await in_thread(reload)
+    finally:
+        path.unlink(missing_ok=True)
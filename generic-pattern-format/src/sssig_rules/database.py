@@ -0,0 +1,81 @@
+"""
+Helpers for compiling rules into a single hyperscan database.
+"""
+
+import logging
+
+from typing import NamedTuple
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.schema import Rule
+from sssig_rules.targets.common import _match_pattern
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledRules(NamedTuple):
+    db: hscheck.Database
+    # The flags each rule was compiled with, or None if it was left out
+    flags: list[int | None]
+
+
+def compile_rules(
+    rules: list[Rule],
+    flags: int = 0,
+    mode: int = hscheck.MODE_BLOCK,
+    fallback_flags: int | None = None,
+) -> CompiledRules:
+    """
+    Compile the match pattern of every rule into one database. Each pattern's
+    id is the index of its rule in rules.
+
+    Some patterns that are valid on their own can't be compiled with every
+    flag or mode (e.g. leftmost start of match in stream mode). Those rules are
+    compiled with fallback_flags instead if they're given, otherwise they're
+    left out with a warning so they never match.
+    """
+    patterns = [_match_pattern(rule) for rule in rules]
+    try:
+        db = hscheck.compile(patterns, flags=flags, mode=mode)
+        return CompiledRules(db, [flags] * len(rules))
+    except hscheck.CompileError as e:
+        logger.debug("finding the rules that can't be compiled: %s", e.args[0])
+
+    rule_flags: list[int | None] = [flags] * len(rules)
+    errors = hscheck.validate_patterns(patterns, flags, mode)
+    for i, err in enumerate(errors):
+        if err is None:
+            continue
+
+        if (
+            fallback_flags is not None
+            and not hscheck.validate_patterns([patterns[i]], fallback_flags, mode)[0]
+        ):
+            logger.info(
+                "rule compiled with fallback flags: rule_id=%r: %s", rules[i].id, err
+            )
+            rule_flags[i] = fallback_flags
+        else:
+            logger.warning(
+                "rule left out of the database: rule_id=%r: %s", rules[i].id, err
+            )
+            rule_flags[i] = None
+
+    indexes = [i for i, f in enumerate(rule_flags) if f is not None]
+    if not indexes:
+        raise ValueError("none of the rules could be compiled")
+
+    db = hscheck.compile(
+        [patterns[i] for i in indexes],
+        ids=indexes,
+        flags=[rule_flags[i] for i in indexes],
+        mode=mode,
+    )
+    return CompiledRules(db, rule_flags)
+
+
+def matched_rules(db: hscheck.Database, data: bytes) -> set[int]:
+    """
+    The indexes of the rules that match somewhere in data
+    """
+    return {rule_index for rule_index, _, _ in db.scan(data)}
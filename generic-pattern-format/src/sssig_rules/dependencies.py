@@ -0,0 +1,229 @@
+"""
+The graph of rule dependencies, for checking that every dependency refers to
+a rule, that there are no cycles, and ordering rules so each one comes after
+the rules it depends on.
+"""
+
+import logging
+
+from typing import Iterable
+from typing import Iterator
+from typing import NamedTuple
+
+from sssig_rules import profiling
+from sssig_rules.schema import Rule
+
+logger = logging.getLogger(__name__)
+
+
+class MissingDependency(NamedTuple):
+    rule_id: str
+    dependency: str
+
+
+class DependencyError(ValueError):
+    def __init__(self, missing: list[MissingDependency], cycles: list[list[str]]):
+        self.missing = missing
+        self.cycles = cycles
+
+        problems = [
+            f"rule {m.rule_id} depends on missing rule {m.dependency}" for m in missing
+        ]
+        problems.extend(
+            f"dependency cycle: {' -> '.join([*cycle, cycle[0]])}" for cycle in cycles
+        )
+        super().__init__("invalid rule dependencies:\n  " + "\n  ".join(problems))
+
+    def __reduce__(self):
+        # So the error can be raised in a process pool worker
+        return type(self), (self.missing, self.cycles)
+
+
+class DependencyGraph:
+    """
+    The rules' dependencies, by the position each rule was added at. Only ids
+    are kept so rules can be checked as they're streamed. Ids aren't always
+    unique, a dependency on an id shared by several rules is a dependency on
+    all of them.
+    """
+
+    def __init__(self):
+        self._ids: list[str] = []
+        self._dependencies: list[list[str]] = []
+        self._positions: dict[str, list[int]] = {}
+        self._components: list[list[int]] | None = None
+
+    @classmethod
+    def from_rules(cls, rules: Iterable[Rule]) -> "DependencyGraph":
+        graph = cls()
+        for rule in rules:
+            graph.add(rule)
+
+        return graph
+
+    def add(self, rule: Rule) -> None:
+        self._positions.setdefault(rule.id, []).append(len(self._ids))
+        self._ids.append(rule.id)
+        self._dependencies.append([d.rule_id for d in rule.dependencies or []])
+        self._components = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, rule_id: str) -> bool:
+        return rule_id in self._positions
+
+    def positions(self, rule_id: str) -> list[int]:
+        """
+        The positions of the rules with the id
+        """
+        return self._positions.get(rule_id, [])
+
+    def duplicates(self) -> list[str]:
+        return [
+            rule_id
+            for rule_id, positions in self._positions.items()
+            if len(positions) > 1
+        ]
+
+    def missing(self) -> list[MissingDependency]:
+        return [
+            MissingDependency(rule_id, dependency)
+            for rule_id, dependencies in zip(self._ids, self._dependencies)
+            for dependency in dependencies
+            if dependency not in self._positions
+        ]
+
+    def _edges(self, position: int) -> Iterator[int]:
+        for dependency in self._dependencies[position]:
+            yield from self._positions.get(dependency, [])
+
+    def components(self) -> list[list[int]]:
+        """
+        The strongly connected components, as rule positions (Tarjan's
+        algorithm, without recursion so long dependency chains don't hit the
+        recursion limit). Each component comes after the components it
+        depends on and is sorted. Missing dependencies are ignored.
+        """
+        if self._components is None:
+            self._components = self._strongly_connected()
+
+        return self._components
+
+    def _strongly_connected(self) -> list[list[int]]:
+        index: list[int | None] = [None] * len(self._ids)
+        lowlink: list[int] = [0] * len(self._ids)
+        visited = 0
+        stack: list[int] = []
+        on_stack = [False] * len(self._ids)
+        work: list[tuple[int, Iterator[int]]] = []
+        components = []
+
+        def push(position: int) -> None:
+            nonlocal visited
+            index[position] = lowlink[position] = visited
+            visited += 1
+            stack.append(position)
+            on_stack[position] = True
+            work.append((position, self._edges(position)))
+
+        for root in range(len(self._ids)):
+            if index[root] is not None:
+                continue
+
+            push(root)
+            while work:
+                position, edges = work[-1]
+                for dependency in edges:
+                    if index[dependency] is None:
+                        push(dependency)
+                        break
+
+                    if on_stack[dependency]:
+                        lowlink[position] = min(lowlink[position], index[dependency])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[position])
+
+                    if lowlink[position] == index[position]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component.append(member)
+                            if member == position:
+                                break
+
+                        component.sort()
+                        components.append(component)
+
+        return components
+
+    def cycles(self) -> list[list[str]]:
+        """
+        The ids of the rules in each dependency cycle
+        """
+        return [
+            [self._ids[position] for position in component]
+            for component in self.components()
+            if len(component) > 1
+            or self._ids[component[0]] in self._dependencies[component[0]]
+        ]
+
+    def order(self) -> list[int]:
+        """
+        The rule positions with every rule after the rules it depends on
+        (apart from rules in cycles), otherwise in the order they were added
+        """
+        return [position for component in self.components() for position in component]
+
+    def check(self) -> None:
+        """
+        Raise a DependencyError if rules depend on missing rules or there are
+        dependency cycles. Duplicate ids are only warned about since they're
+        harmless to rules that don't depend on them.
+        """
+        for rule_id in self.duplicates():
+            logger.warning("duplicate rule id: rule_id=%r", rule_id)
+
+        missing = self.missing()
+        cycles = self.cycles()
+        if missing or cycles:
+            raise DependencyError(missing, cycles)
+
+
+def check_dependencies(rules: list[Rule]) -> DependencyGraph:
+    """
+    Build the dependency graph of the rules, raising a DependencyError if it
+    has problems (see DependencyGraph.check)
+    """
+    with profiling.stage("dependencies"):
+        graph = DependencyGraph.from_rules(rules)
+        graph.check()
+
+    return graph
+
+
+def dependency_order(rules: list[Rule]) -> list[Rule]:
+    """
+    The rules with every rule after the rules it depends on, for engines that
+    resolve dependencies in a single pass
+    """
+    return [rules[position] for position in check_dependencies(rules).order()]
+
+
+def iter_checked_rules(rules: Iterable[Rule]) -> Iterator[Rule]:
+    """
+    Pass the rules through, checking their dependencies once they've all been
+    seen. A rule can depend on a rule further on, so a DependencyError is only
+    raised after the last rule has been passed through and whatever it was
+    written to already has every rule.
+    """
+    graph = DependencyGraph()
+    for rule in rules:
+        graph.add(rule)
+        yield rule
+
+    graph.check()
@@ -0,0 +1,194 @@
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <math.h>
+
+/*
+ * count * log2(count) for the small counts most candidates are made of, so the
+ * common case doesn't call log2 at all
+ */
+#define COUNT_TABLE_SIZE 1024
+static double count_log2_count[COUNT_TABLE_SIZE];
+
+static inline double n_log2_n(Py_ssize_t n) {
+  if (n < COUNT_TABLE_SIZE) {
+    return count_log2_count[n];
+  }
+
+  return (double)n * log2((double)n);
+}
+
+/*
+ * The Shannon entropy of the bytes in bits per byte. The byte counts are
+ * reset as they're summed so the caller's counts array can be reused.
+ *
+ *   H = log2(n) - sum(c * log2(c)) / n
+ */
+static double shannon_entropy(const unsigned char *data, Py_ssize_t len, Py_ssize_t counts[256]) {
+  unsigned char seen[256];
+  int distinct = 0;
+  double sum = 0.0;
+
+  if (len == 0) {
+    return 0.0;
+  }
+
+  for (Py_ssize_t i = 0; i < len; i++) {
+    if (counts[data[i]]++ == 0) {
+      seen[distinct++] = data[i];
+    }
+  }
+
+  for (int i = 0; i < distinct; i++) {
+    sum += n_log2_n(counts[seen[i]]);
+    counts[seen[i]] = 0;
+  }
+
+  return log2((double)len) - sum / (double)len;
+}
+
+/*
+ * Call fn with the entropy of each candidate in the sequence. Stops early and
+ * returns -1 if a candidate isn't bytes-like or fn fails.
+ */
+typedef int (*entropy_fn)(Py_ssize_t index, double entropy, void *ctx);
+
+static int each_entropy(PyObject *arg, entropy_fn fn, void *ctx) {
+  Py_ssize_t counts[256] = {0};
+  PyObject *seq;
+  Py_buffer data;
+  Py_ssize_t count;
+  int result = 0;
+
+  seq = PySequence_Fast(arg, "candidates must be a sequence");
+  if (seq == NULL) {
+    return -1;
+  }
+
+  count = PySequence_Fast_GET_SIZE(seq);
+  for (Py_ssize_t i = 0; i < count; i++) {
+    PyObject *item = PySequence_Fast_GET_ITEM(seq, i);
+    double entropy;
+
+    if (PyBytes_CheckExact(item)) {
+      entropy = shannon_entropy((const unsigned char *)PyBytes_AS_STRING(item), PyBytes_GET_SIZE(item), counts);
+    } else {
+      if (PyObject_GetBuffer(item, &data, PyBUF_SIMPLE) < 0) {
+        result = -1;
+        break;
+      }
+
+      entropy = shannon_entropy(data.buf, data.len, counts);
+      PyBuffer_Release(&data);
+    }
+
+    if (fn(i, entropy, ctx) < 0) {
+      result = -1;
+      break;
+    }
+  }
+
+  Py_DECREF(seq);
+  return result;
+}
+
+static int append_entropy(Py_ssize_t index, double entropy, void *ctx) {
+  PyObject *value = PyFloat_FromDouble(entropy);
+  if (value == NULL) {
+    return -1;
+  }
+
+  PyList_SET_ITEM((PyObject *)ctx, index, value);
+  return 0;
+}
+
+static PyObject* entropy_shannon_entropy(PyObject *self, PyObject *arg) {
+  PyObject *seq;
+  PyObject *results;
+
+  seq = PySequence_Fast(arg, "candidates must be a sequence");
+  if (seq == NULL) {
+    return NULL;
+  }
+
+  results = PyList_New(PySequence_Fast_GET_SIZE(seq));
+  if (results != NULL && each_entropy(seq, append_entropy, results) < 0) {
+    Py_CLEAR(results);
+  }
+
+  Py_DECREF(seq);
+  return results;
+}
+
+typedef struct {
+  double min_entropy;
+  PyObject *indexes;
+} at_least_t;
+
+static int append_index_at_least(Py_ssize_t index, double entropy, void *ctx) {
+  at_least_t *at_least = ctx;
+  PyObject *value;
+  int result;
+
+  if (entropy < at_least->min_entropy) {
+    return 0;
+  }
+
+  value = PyLong_FromSsize_t(index);
+  if (value == NULL) {
+    return -1;
+  }
+
+  result = PyList_Append(at_least->indexes, value);
+  Py_DECREF(value);
+  return result;
+}
+
+static PyObject* entropy_at_least(PyObject *self, PyObject *args) {
+  PyObject *arg;
+  at_least_t at_least;
+
+  if (!PyArg_ParseTuple(args, "Od", &arg, &at_least.min_entropy)) {
+    return NULL;
+  }
+
+  at_least.indexes = PyList_New(0);
+  if (at_least.indexes == NULL) {
+    return NULL;
+  }
+
+  if (each_entropy(arg, append_index_at_least, &at_least) < 0) {
+    Py_DECREF(at_least.indexes);
+    return NULL;
+  }
+
+  return at_least.indexes;
+}
+
+static PyMethodDef entropy_methods[] = {
+  {"shannon_entropy",  entropy_shannon_entropy, METH_O, "The Shannon entropy in bits per byte of each of a sequence of bytes-like candidates"},
+  {"at_least",  entropy_at_least, METH_VARARGS, "The indexes of the candidates whose Shannon entropy is at least min_entropy"},
+  {NULL, NULL, 0, NULL}
+};
+
+static int entropy_exec(PyObject *module) {
+  count_log2_count[0] = 0.0;
+  for (Py_ssize_t n = 1; n < COUNT_TABLE_SIZE; n++) {
+    count_log2_count[n] = (double)n * log2((double)n);
+  }
+
+  return 0;
+}
+
+static PyModuleDef_Slot entropy_slots[] = {
+  {Py_mod_exec, entropy_exec},
+  {0, NULL}
+};
+
+static struct PyModuleDef entropy_module = {
+  .m_methods = entropy_methods,
+  .m_slots = entropy_slots,
+};
+
+PyMODINIT_FUNC PyInit_entropy(void) {
+      return PyModuleDef_Init(&entropy_module);
+}
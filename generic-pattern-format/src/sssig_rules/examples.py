@@ -0,0 +1,68 @@
+"""
+Check that each rule's match pattern matches its positive examples and
+doesn't match its negative examples. All of the rules are compiled into one
+hyperscan database so each example is only scanned once.
+"""
+
+import time
+
+from pydantic import BaseModel
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.database import compile_rules
+from sssig_rules.database import matched_rules
+from sssig_rules.schema import Rule
+
+
+class RuleResult(BaseModel):
+    id: str
+    name: str
+    examples: int = 0
+    missed_positives: list[str] = []
+    matched_negatives: list[str] = []
+    seconds: float = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return not (self.missed_positives or self.matched_negatives)
+
+
+class ExamplesReport(BaseModel):
+    compile_seconds: float
+    results: list[RuleResult]
+
+    @property
+    def passed(self) -> bool:
+        return all(result.passed for result in self.results)
+
+
+def run_examples(rules: list[Rule]) -> ExamplesReport:
+    start = time.perf_counter()
+    # Only whether a rule matched matters, not every match
+    db = compile_rules(rules, flags=hscheck.FLAG_SINGLEMATCH).db
+    compile_seconds = time.perf_counter() - start
+
+    results = []
+    for rule_index, rule in enumerate(rules):
+        examples = rule.meta.examples
+        positive = (examples and examples.positive) or []
+        negative = (examples and examples.negative) or []
+        result = RuleResult(
+            id=rule.id,
+            name=rule.meta.name,
+            examples=len(positive) + len(negative),
+        )
+
+        start = time.perf_counter()
+        for example in positive:
+            if rule_index not in matched_rules(db, example.encode()):
+                result.missed_positives.append(example)
+
+        for example in negative:
+            if rule_index in matched_rules(db, example.encode()):
+                result.matched_negatives.append(example)
+
+        result.seconds = time.perf_counter() - start
+        results.append(result)
+
+    return ExamplesReport(compile_seconds=compile_seconds, results=results)
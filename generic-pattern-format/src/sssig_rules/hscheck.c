@@ -14,7 +14,12 @@ static PyObject* hscheck_validate_pattern(PyObject *self, PyObject *args) {
     return NULL;
   }
 
-  if (hs_compile(pattern, flags, mode, NULL, &db, &compile_error) != HS_SUCCESS) {
+  /* compiles are thread safe, other threads can run (or compile) meanwhile */
+  Py_BEGIN_ALLOW_THREADS
+  error = hs_compile(pattern, flags, mode, NULL, &db, &compile_error);
+  Py_END_ALLOW_THREADS
+
+  if (error != HS_SUCCESS) {
     PyObject* err = PyUnicode_FromString(compile_error->message);
     hs_free_compile_error(compile_error);
     return err;
@@ -24,13 +29,704 @@ static PyObject* hscheck_validate_pattern(PyObject *self, PyObject *args) {
   return PyUnicode_FromString("");
 }
 
+/*
+ * The patterns as a tuple. The GIL is released while they're compiled, so a
+ * list could be changed (freeing its strings) by another thread meanwhile.
+ */
+static PyObject* pattern_tuple(PyObject *arg) {
+  PyObject *seq = PySequence_Fast(arg, "patterns must be a sequence");
+  PyObject *tuple;
+
+  if (seq == NULL || PyTuple_CheckExact(seq)) {
+    return seq;
+  }
+
+  tuple = PySequence_Tuple(seq);
+  Py_DECREF(seq);
+  return tuple;
+}
+
+/*
+ * The utf-8 strings of a sequence from pattern_tuple. The buffers are owned
+ * by the items, which the sequence keeps alive. Free the array with PyMem_Free.
+ */
+static const char** pattern_array(PyObject *seq, Py_ssize_t count) {
+  const char **patterns = PyMem_New(const char *, count);
+  Py_ssize_t size;
+
+  if (patterns == NULL) {
+    PyErr_NoMemory();
+    return NULL;
+  }
+
+  for (Py_ssize_t i = 0; i < count; i++) {
+    PyObject *item = PySequence_Fast_GET_ITEM(seq, i);
+    if (!PyUnicode_Check(item)) {
+      PyErr_SetString(PyExc_TypeError, "patterns must be strings");
+      goto error;
+    }
+
+    patterns[i] = PyUnicode_AsUTF8AndSize(item, &size);
+    if (patterns[i] == NULL) {
+      goto error;
+    }
+
+    if ((Py_ssize_t)strlen(patterns[i]) != size) {
+      PyErr_SetString(PyExc_ValueError, "embedded null character");
+      goto error;
+    }
+  }
+
+  return patterns;
+
+error:
+  PyMem_Free(patterns);
+  return NULL;
+}
+
+/*
+ * Compile patterns[lo:hi] in one pass and only split the range in half when
+ * the compile fails, until the failing patterns are isolated. Errors are
+ * stored in results at the index of the pattern.
+ */
+static int validate_range(const char **patterns, const unsigned int *flags, unsigned int mode, Py_ssize_t lo, Py_ssize_t hi, PyObject *results) {
+  hs_database_t *db;
+  hs_compile_error_t *compile_error;
+  hs_error_t error;
+  Py_ssize_t mid;
+
+  Py_BEGIN_ALLOW_THREADS
+  error = hs_compile_multi(patterns + lo, flags + lo, NULL, (unsigned int)(hi - lo), mode, NULL, &db, &compile_error);
+  Py_END_ALLOW_THREADS
+
+  if (error == HS_SUCCESS) {
+    hs_free_database(db);
+    return 0;
+  }
+
+  if (hi - lo == 1) {
+    PyObject* err = PyUnicode_FromString(compile_error->message);
+    hs_free_compile_error(compile_error);
+    if (err == NULL) {
+      return -1;
+    }
+
+    /* steals the reference and releases the None placeholder */
+    PyList_SetItem(results, lo, err);
+    return 0;
+  }
+
+  hs_free_compile_error(compile_error);
+  mid = lo + (hi - lo) / 2;
+  if (validate_range(patterns, flags, mode, lo, mid, results) < 0) {
+    return -1;
+  }
+
+  return validate_range(patterns, flags, mode, mid, hi, results);
+}
+
+static PyObject* hscheck_validate_patterns(PyObject *self, PyObject *args) {
+  PyObject *arg;
+  PyObject *seq;
+  PyObject *results;
+  const char **patterns = NULL;
+  unsigned int *flags = NULL;
+  unsigned int pattern_flags = 0;
+  unsigned int mode = HS_MODE_BLOCK;
+  Py_ssize_t count;
+
+  if (!PyArg_ParseTuple(args, "O|II", &arg, &pattern_flags, &mode)) {
+    return NULL;
+  }
+
+  seq = pattern_tuple(arg);
+  if (seq == NULL) {
+    return NULL;
+  }
+
+  count = PySequence_Fast_GET_SIZE(seq);
+  results = PyList_New(count);
+  if (results == NULL) {
+    goto done;
+  }
+
+  for (Py_ssize_t i = 0; i < count; i++) {
+    PyList_SET_ITEM(results, i, Py_NewRef(Py_None));
+  }
+
+  if (count == 0) {
+    goto done;
+  }
+
+  patterns = pattern_array(seq, count);
+  if (patterns == NULL) {
+    goto error;
+  }
+
+  flags = PyMem_New(unsigned int, count);
+  if (flags == NULL) {
+    PyErr_NoMemory();
+    goto error;
+  }
+
+  for (Py_ssize_t i = 0; i < count; i++) {
+    flags[i] = pattern_flags;
+  }
+
+  if (validate_range(patterns, flags, mode, 0, count, results) < 0) {
+    goto error;
+  }
+
+  goto done;
+
+error:
+  Py_CLEAR(results);
+
+done:
+  PyMem_Free(flags);
+  PyMem_Free(patterns);
+  Py_DECREF(seq);
+  return results;
+}
+
+/*
+ * Matches are collected into a plain array while scanning so the callback
+ * never has to touch python objects
+ */
+typedef struct {
+  unsigned int id;
+  unsigned long long from;
+  unsigned long long to;
+} match_t;
+
+typedef struct {
+  match_t *items;
+  size_t len;
+  size_t cap;
+  int nomem;
+} matches_t;
+
+static int collect_match(unsigned int id, unsigned long long from, unsigned long long to, unsigned int flags, void *context) {
+  matches_t *matches = context;
+
+  if (matches->len == matches->cap) {
+    size_t cap = matches->cap ? matches->cap * 2 : 16;
+    match_t *items = PyMem_RawRealloc(matches->items, cap * sizeof(match_t));
+    if (items == NULL) {
+      /* stop scanning, the error is raised once the scan returns */
+      matches->nomem = 1;
+      return 1;
+    }
+
+    matches->items = items;
+    matches->cap = cap;
+  }
+
+  matches->items[matches->len].id = id;
+  matches->items[matches->len].from = from;
+  matches->items[matches->len].to = to;
+  matches->len++;
+  return 0;
+}
+
+/*
+ * Convert the collected matches to a list of (id, from, to) tuples and free
+ * them
+ */
+static PyObject* scan_result(hs_error_t error, matches_t *matches) {
+  PyObject *result = NULL;
+
+  if (matches->nomem) {
+    PyErr_NoMemory();
+    goto done;
+  }
+
+  if (error != HS_SUCCESS) {
+    PyErr_Format(PyExc_RuntimeError, "hyperscan scan failed with error %d", error);
+    goto done;
+  }
+
+  result = PyList_New(matches->len);
+  if (result == NULL) {
+    goto done;
+  }
+
+  for (size_t i = 0; i < matches->len; i++) {
+    match_t *match = &matches->items[i];
+    PyObject *item = Py_BuildValue("(IKK)", match->id, match->from, match->to);
+    if (item == NULL) {
+      Py_CLEAR(result);
+      goto done;
+    }
+
+    PyList_SET_ITEM(result, i, item);
+  }
+
+done:
+  PyMem_RawFree(matches->items);
+  return result;
+}
+
+/*
+ * Fill out with an unsigned int for each of the count items in arg. arg may be
+ * a sequence or a single int for every item. When arg is NULL or None the
+ * index of the item is used if use_index is set and 0 otherwise.
+ */
+static int uint_array(PyObject *arg, unsigned int *out, Py_ssize_t count, int use_index) {
+  PyObject *seq;
+
+  if (arg == NULL || arg == Py_None) {
+    for (Py_ssize_t i = 0; i < count; i++) {
+      out[i] = use_index ? (unsigned int)i : 0;
+    }
+    return 0;
+  }
+
+  if (PyLong_Check(arg)) {
+    unsigned long value = PyLong_AsUnsignedLong(arg);
+    if (PyErr_Occurred()) {
+      return -1;
+    }
+
+    for (Py_ssize_t i = 0; i < count; i++) {
+      out[i] = (unsigned int)value;
+    }
+    return 0;
+  }
+
+  seq = PySequence_Fast(arg, "expected an int or a sequence of ints");
+  if (seq == NULL) {
+    return -1;
+  }
+
+  if (PySequence_Fast_GET_SIZE(seq) != count) {
+    PyErr_SetString(PyExc_ValueError, "expected one value for each pattern");
+    Py_DECREF(seq);
+    return -1;
+  }
+
+  for (Py_ssize_t i = 0; i < count; i++) {
+    unsigned long value = PyLong_AsUnsignedLong(PySequence_Fast_GET_ITEM(seq, i));
+    if (PyErr_Occurred()) {
+      Py_DECREF(seq);
+      return -1;
+    }
+    out[i] = (unsigned int)value;
+  }
+
+  Py_DECREF(seq);
+  return 0;
+}
+
+/* raised with (message, expression index) args when compiling fails */
+static PyObject *CompileError;
+
+typedef struct {
+  PyObject_HEAD
+  hs_database_t *db;
+  hs_scratch_t *scratch;
+} DatabaseObject;
+
+static PyTypeObject DatabaseType;
+
+typedef struct {
+  PyObject_HEAD
+  DatabaseObject *database;
+  hs_stream_t *stream;
+} StreamObject;
+
+static PyTypeObject StreamType;
+
+/*
+ * Wrap a compiled database, taking ownership of it
+ */
+static PyObject* database_new(hs_database_t *db) {
+  DatabaseObject *self = PyObject_New(DatabaseObject, &DatabaseType);
+  if (self == NULL) {
+    hs_free_database(db);
+    return NULL;
+  }
+
+  self->db = db;
+  self->scratch = NULL;
+  if (hs_alloc_scratch(db, &self->scratch) != HS_SUCCESS) {
+    Py_DECREF(self);
+    PyErr_SetString(PyExc_MemoryError, "unable to allocate hyperscan scratch space");
+    return NULL;
+  }
+
+  return (PyObject*)self;
+}
+
+static void database_dealloc(DatabaseObject *self) {
+  if (self->scratch != NULL) {
+    hs_free_scratch(self->scratch);
+  }
+
+  if (self->db != NULL) {
+    hs_free_database(self->db);
+  }
+
+  PyObject_Free(self);
+}
+
+static PyObject* database_scan(DatabaseObject *self, PyObject *args) {
+  Py_buffer data;
+  matches_t matches = {0};
+  hs_error_t error;
+
+  if (!PyArg_ParseTuple(args, "y*", &data)) {
+    return NULL;
+  }
+
+  if ((size_t)data.len > UINT_MAX) {
+    PyBuffer_Release(&data);
+    PyErr_SetString(PyExc_ValueError, "data is too large to scan in one block");
+    return NULL;
+  }
+
+  error = hs_scan(self->db, data.buf, (unsigned int)data.len, 0, self->scratch, collect_match, &matches);
+  PyBuffer_Release(&data);
+  return scan_result(error, &matches);
+}
+
+static PyObject* database_open_stream(DatabaseObject *self, PyObject *Py_UNUSED(args)) {
+  StreamObject *stream = PyObject_New(StreamObject, &StreamType);
+  if (stream == NULL) {
+    return NULL;
+  }
+
+  stream->database = (DatabaseObject*)Py_NewRef(self);
+  stream->stream = NULL;
+  if (hs_open_stream(self->db, 0, &stream->stream) != HS_SUCCESS) {
+    Py_DECREF(stream);
+    PyErr_SetString(PyExc_ValueError, "unable to open a stream, the database must be compiled in stream mode");
+    return NULL;
+  }
+
+  return (PyObject*)stream;
+}
+
+static PyObject* database_serialize(DatabaseObject *self, PyObject *Py_UNUSED(args)) {
+  char *bytes;
+  size_t length;
+  PyObject *result;
+  hs_error_t error = hs_serialize_database(self->db, &bytes, &length);
+
+  if (error != HS_SUCCESS) {
+    PyErr_Format(PyExc_RuntimeError, "hyperscan serialize failed with error %d", error);
+    return NULL;
+  }
+
+  result = PyBytes_FromStringAndSize(bytes, (Py_ssize_t)length);
+  /* allocated by hyperscan's misc allocator, which defaults to malloc */
+  free(bytes);
+  return result;
+}
+
+static PyMethodDef database_methods[] = {
+  {"scan",  (PyCFunction)database_scan, METH_VARARGS, "Scan a block of data, returning (id, from, to) for each match"},
+  {"open_stream",  (PyCFunction)database_open_stream, METH_NOARGS, "Open a Stream to scan data in chunks with a stream mode database"},
+  {"serialize",  (PyCFunction)database_serialize, METH_NOARGS, "Serialize the database to bytes that deserialize() can load"},
+  {NULL, NULL, 0, NULL}
+};
+
+static PyTypeObject DatabaseType = {
+  PyVarObject_HEAD_INIT(NULL, 0)
+  .tp_name = "sssig_rules.hscheck.Database",
+  .tp_doc = "A compiled hyperscan database",
+  .tp_basicsize = sizeof(DatabaseObject),
+  .tp_itemsize = 0,
+  .tp_flags = Py_TPFLAGS_DEFAULT,
+  .tp_dealloc = (destructor)database_dealloc,
+  .tp_methods = database_methods,
+};
+
+static void stream_dealloc(StreamObject *self) {
+  if (self->stream != NULL) {
+    /* discard any matches at the end of the stream */
+    hs_close_stream(self->stream, NULL, NULL, NULL);
+  }
+
+  Py_DECREF(self->database);
+  PyObject_Free(self);
+}
+
+static PyObject* stream_scan(StreamObject *self, PyObject *args) {
+  Py_buffer data;
+  matches_t matches = {0};
+  hs_error_t error;
+
+  if (!PyArg_ParseTuple(args, "y*", &data)) {
+    return NULL;
+  }
+
+  if (self->stream == NULL) {
+    PyBuffer_Release(&data);
+    PyErr_SetString(PyExc_ValueError, "the stream is closed");
+    return NULL;
+  }
+
+  if ((size_t)data.len > UINT_MAX) {
+    PyBuffer_Release(&data);
+    PyErr_SetString(PyExc_ValueError, "data is too large to scan in one chunk");
+    return NULL;
+  }
+
+  error = hs_scan_stream(self->stream, data.buf, (unsigned int)data.len, 0, self->database->scratch, collect_match, &matches);
+  PyBuffer_Release(&data);
+  return scan_result(error, &matches);
+}
+
+static PyObject* stream_close(StreamObject *self, PyObject *Py_UNUSED(args)) {
+  matches_t matches = {0};
+  hs_error_t error;
+
+  if (self->stream == NULL) {
+    return PyList_New(0);
+  }
+
+  error = hs_close_stream(self->stream, self->database->scratch, collect_match, &matches);
+  self->stream = NULL;
+  return scan_result(error, &matches);
+}
+
+static PyMethodDef stream_methods[] = {
+  {"scan",  (PyCFunction)stream_scan, METH_VARARGS, "Scan the next chunk of the stream, returning (id, from, to) for each match"},
+  {"close",  (PyCFunction)stream_close, METH_NOARGS, "Close the stream, returning (id, from, to) for the matches at the end of it"},
+  {NULL, NULL, 0, NULL}
+};
+
+static PyTypeObject StreamType = {
+  PyVarObject_HEAD_INIT(NULL, 0)
+  .tp_name = "sssig_rules.hscheck.Stream",
+  .tp_doc = "A stream being scanned with a stream mode Database",
+  .tp_basicsize = sizeof(StreamObject),
+  .tp_itemsize = 0,
+  .tp_flags = Py_TPFLAGS_DEFAULT,
+  .tp_dealloc = (destructor)stream_dealloc,
+  .tp_methods = stream_methods,
+};
+
+static PyObject* hscheck_compile(PyObject *self, PyObject *args, PyObject *kwargs) {
+  static char *kwlist[] = {"patterns", "ids", "flags", "mode", NULL};
+  PyObject *arg;
+  PyObject *ids_arg = NULL;
+  PyObject *flags_arg = NULL;
+  PyObject *seq;
+  PyObject *result = NULL;
+  unsigned int mode = HS_MODE_BLOCK;
+  const char **patterns = NULL;
+  unsigned int *ids = NULL;
+  unsigned int *flags = NULL;
+  hs_database_t *db;
+  hs_compile_error_t *compile_error;
+  hs_error_t error;
+  Py_ssize_t count;
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|OOI", kwlist, &arg, &ids_arg, &flags_arg, &mode)) {
+    return NULL;
+  }
+
+  seq = pattern_tuple(arg);
+  if (seq == NULL) {
+    return NULL;
+  }
+
+  count = PySequence_Fast_GET_SIZE(seq);
+  if (count == 0) {
+    PyErr_SetString(PyExc_ValueError, "no patterns to compile");
+    goto done;
+  }
+
+  patterns = pattern_array(seq, count);
+  if (patterns == NULL) {
+    goto done;
+  }
+
+  ids = PyMem_New(unsigned int, count);
+  flags = PyMem_New(unsigned int, count);
+  if (ids == NULL || flags == NULL) {
+    PyErr_NoMemory();
+    goto done;
+  }
+
+  if (uint_array(ids_arg, ids, count, 1) < 0 || uint_array(flags_arg, flags, count, 0) < 0) {
+    goto done;
+  }
+
+  Py_BEGIN_ALLOW_THREADS
+  error = hs_compile_multi(patterns, flags, ids, (unsigned int)count, mode, NULL, &db, &compile_error);
+  Py_END_ALLOW_THREADS
+
+  if (error != HS_SUCCESS) {
+    PyObject *err_args = Py_BuildValue("(si)", compile_error->message, compile_error->expression);
+    hs_free_compile_error(compile_error);
+    if (err_args != NULL) {
+      PyErr_SetObject(CompileError, err_args);
+      Py_DECREF(err_args);
+    }
+    goto done;
+  }
+
+  result = database_new(db);
+
+done:
+  PyMem_Free(flags);
+  PyMem_Free(ids);
+  PyMem_Free(patterns);
+  Py_DECREF(seq);
+  return result;
+}
+
+/*
+ * Load a database from any buffer (e.g. an mmap) holding the output of
+ * Database.serialize. The database is copied out of the buffer.
+ */
+static PyObject* hscheck_deserialize(PyObject *self, PyObject *args) {
+  Py_buffer data;
+  hs_database_t *db = NULL;
+  hs_error_t error;
+  char *info;
+
+  if (!PyArg_ParseTuple(args, "y*", &data)) {
+    return NULL;
+  }
+
+  error = hs_deserialize_database(data.buf, (size_t)data.len, &db);
+  if (error != HS_SUCCESS) {
+    /* says which hyperscan version and platform it was serialized by */
+    if (hs_serialized_database_info(data.buf, (size_t)data.len, &info) == HS_SUCCESS) {
+      PyErr_Format(PyExc_ValueError, "unable to deserialize the database (error %d): %s", error, info);
+      free(info);
+    } else {
+      PyErr_Format(PyExc_ValueError, "unable to deserialize the database (error %d)", error);
+    }
+
+    PyBuffer_Release(&data);
+    return NULL;
+  }
+
+  PyBuffer_Release(&data);
+  return database_new(db);
+}
+
+static PyObject* hscheck_version(PyObject *self, PyObject *Py_UNUSED(args)) {
+  return PyUnicode_FromString(hs_version());
+}
+
+/*
+ * What hyperscan can tell about a pattern without compiling a database for
+ * it. An unbounded max_width is returned as None.
+ */
+static PyObject* hscheck_expression_info(PyObject *self, PyObject *args, PyObject *kwargs) {
+  static char *kwlist[] = {"pattern", "flags", NULL};
+  const char *pattern;
+  unsigned int flags = 0;
+  hs_expr_info_t *info;
+  hs_compile_error_t *compile_error;
+  hs_error_t error;
+  PyObject *max_width;
+  PyObject *result;
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s|I", kwlist, &pattern, &flags)) {
+    return NULL;
+  }
+
+  Py_BEGIN_ALLOW_THREADS
+  error = hs_expression_info(pattern, flags, &info, &compile_error);
+  Py_END_ALLOW_THREADS
+
+  if (error != HS_SUCCESS) {
+    PyObject *err_args = Py_BuildValue("(si)", compile_error->message, compile_error->expression);
+    hs_free_compile_error(compile_error);
+    if (err_args != NULL) {
+      PyErr_SetObject(CompileError, err_args);
+      Py_DECREF(err_args);
+    }
+    return NULL;
+  }
+
+  if (info->max_width == UINT_MAX) {
+    max_width = Py_NewRef(Py_None);
+  } else {
+    max_width = PyLong_FromUnsignedLong(info->max_width);
+  }
+
+  result = Py_BuildValue(
+    "{s:I,s:N,s:O,s:O,s:O}",
+    "min_width", info->min_width,
+    "max_width", max_width,
+    "unordered_matches", info->unordered_matches ? Py_True : Py_False,
+    "matches_at_eod", info->matches_at_eod ? Py_True : Py_False,
+    "matches_only_at_eod", info->matches_only_at_eod ? Py_True : Py_False
+  );
+  /* allocated by hyperscan's misc allocator, which defaults to malloc */
+  free(info);
+  return result;
+}
+
 static PyMethodDef hscheck_methods[] = {
   {"validate_pattern",  hscheck_validate_pattern, METH_VARARGS, "Validate that a pattern is a valid hyperscan pattern"},
+  {"validate_patterns",  hscheck_validate_patterns, METH_VARARGS, "Validate a list of patterns with one compile, optionally with flags and a mode, returning an error or None for each"},
+  {"version",  hscheck_version, METH_NOARGS, "The version of the hyperscan library in use"},
+  {"expression_info",  (PyCFunction)(void(*)(void))hscheck_expression_info, METH_VARARGS | METH_KEYWORDS, "The min/max width and end of data behaviour of a pattern, raising CompileError if it's invalid"},
+  {"compile",  (PyCFunction)(void(*)(void))hscheck_compile, METH_VARARGS | METH_KEYWORDS, "Compile patterns into a Database, optionally with an id, flags and mode for them"},
+  {"deserialize",  hscheck_deserialize, METH_VARARGS, "Load a Database from a buffer holding the output of Database.serialize"},
   {NULL, NULL, 0, NULL}
 };
 
+static int hscheck_exec(PyObject *module) {
+  if (PyType_Ready(&DatabaseType) < 0 || PyType_Ready(&StreamType) < 0) {
+    return -1;
+  }
+
+  if (PyModule_AddObjectRef(module, "Database", (PyObject*)&DatabaseType) < 0
+      || PyModule_AddObjectRef(module, "Stream", (PyObject*)&StreamType) < 0) {
+    return -1;
+  }
+
+  if (CompileError == NULL) {
+    CompileError = PyErr_NewExceptionWithDoc(
+      "sssig_rules.hscheck.CompileError",
+      "Raised with (message, expression index) when patterns can't be compiled",
+      PyExc_ValueError,
+      NULL
+    );
+    if (CompileError == NULL) {
+      return -1;
+    }
+  }
+
+  if (PyModule_AddObjectRef(module, "CompileError", CompileError) < 0) {
+    return -1;
+  }
+
+  if (PyModule_AddIntConstant(module, "FLAG_CASELESS", HS_FLAG_CASELESS) < 0
+      || PyModule_AddIntConstant(module, "FLAG_DOTALL", HS_FLAG_DOTALL) < 0
+      || PyModule_AddIntConstant(module, "FLAG_MULTILINE", HS_FLAG_MULTILINE) < 0
+      || PyModule_AddIntConstant(module, "FLAG_SINGLEMATCH", HS_FLAG_SINGLEMATCH) < 0
+      || PyModule_AddIntConstant(module, "FLAG_ALLOWEMPTY", HS_FLAG_ALLOWEMPTY) < 0
+      || PyModule_AddIntConstant(module, "FLAG_UTF8", HS_FLAG_UTF8) < 0
+      || PyModule_AddIntConstant(module, "FLAG_UCP", HS_FLAG_UCP) < 0
+      || PyModule_AddIntConstant(module, "FLAG_SOM_LEFTMOST", HS_FLAG_SOM_LEFTMOST) < 0
+      || PyModule_AddIntConstant(module, "MODE_BLOCK", HS_MODE_BLOCK) < 0
+      || PyModule_AddIntConstant(module, "MODE_STREAM", HS_MODE_STREAM) < 0
+      || PyModule_AddIntConstant(module, "MODE_SOM_HORIZON_LARGE", HS_MODE_SOM_HORIZON_LARGE) < 0) {
+    return -1;
+  }
+
+  return 0;
+}
+
+static PyModuleDef_Slot hscheck_slots[] = {
+  {Py_mod_exec, hscheck_exec},
+  {0, NULL}
+};
+
 static struct PyModuleDef hscheck_module = {
   .m_methods = hscheck_methods,
+  .m_slots = hscheck_slots,
 };
 
 PyMODINIT_FUNC PyInit_hscheck(void) {
@@ -0,0 +1,126 @@
+"""
+Incremental translation that reuses the translated fragments of rules that
+haven't changed since the last run.
+"""
+
+import hashlib
+import logging
+import threading
+
+from functools import cache
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import pydantic
+
+from sssig_rules import targets
+from sssig_rules.cache import BuildCache
+from sssig_rules.cache import open_build_cache
+from sssig_rules.schema import Rule
+from sssig_rules.targets import TargetKind
+from sssig_rules.targets.common import factoring_strings
+
+_PACKAGE_DIR = Path(__file__).parent
+
+
+def rule_hash(rule: Rule) -> bytes:
+    """
+    A content hash of a validated rule
+    """
+    return hashlib.sha256(rule.model_dump_json().encode()).digest()
+
+
+@cache
+def _sources_hash() -> bytes:
+    """
+    A hash of the package's sources, which only change between processes
+    """
+    digest = hashlib.sha256()
+    for path in sorted(_PACKAGE_DIR.rglob("*.py")):
+        digest.update(path.read_bytes())
+
+    return digest.digest()
+
+
+def _translator_hash(kind: TargetKind) -> bytes:
+    """
+    A hash of everything besides the rule that affects a translated fragment so
+    changes to the translators don't reuse stale fragments
+    """
+    digest = hashlib.sha256(
+        f"{kind}\0{pydantic.VERSION}\0{factoring_strings()}\0".encode()
+    )
+    digest.update(_sources_hash())
+    return digest.digest()
+
+
+class _WarningRecorder(logging.Handler):
+    """
+    Records the warnings logged by this thread, so the ones logged while a rule
+    is translated can be cached with its fragment
+    """
+
+    def __init__(self) -> None:
+        super().__init__(logging.WARNING)
+        self.thread = threading.get_ident()
+        self.warnings: list[tuple[str, int, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.thread == self.thread:
+            self.warnings.append((record.name, record.levelno, record.getMessage()))
+
+
+def _translate_rule(module: ModuleType, rule: Rule) -> dict[str, Any]:
+    """
+    The rule's fragment along with the warnings logged translating it
+    """
+    recorder = _WarningRecorder()
+    root = logging.getLogger()
+    root.addHandler(recorder)
+    try:
+        fragment = module._fragment(rule)
+    finally:
+        root.removeHandler(recorder)
+
+    return {"fragment": fragment, "warnings": recorder.warnings}
+
+
+def _replay_warnings(warnings: list[list[Any]]) -> None:
+    for name, level, message in warnings:
+        logging.getLogger(name).log(level, "%s", message)
+
+
+def _translate(kind: TargetKind, rules: list[Rule], cache: BuildCache) -> str:
+    module = targets.module(kind)
+    hashes = [rule_hash(rule) for rule in rules]
+    entries = cache.get_many(hashes)
+
+    # The warnings of the rules found in the cache are logged again, in the
+    # same order as translating every rule would log them
+    translated = {}
+    for h, rule in zip(hashes, rules):
+        if h in entries:
+            _replay_warnings(entries[h]["warnings"])
+        else:
+            entries[h] = translated[h] = _translate_rule(module, rule)
+
+    if translated:
+        cache.put_many(translated)
+
+    return module._document([entries[h]["fragment"] for h in hashes])
+
+
+def translate(kind: TargetKind, rules: list[Rule]) -> str:
+    """
+    Translate the rules for the target, only translating the rules that aren't
+    in the build cache. The output is identical to targets.translate.
+    """
+    cache = open_build_cache(_translator_hash(kind))
+    if cache is None:
+        return targets.translate(kind, rules)
+
+    try:
+        return _translate(kind, rules, cache)
+    finally:
+        cache.close()
@@ -0,0 +1,104 @@
+"""
+A keyword prefilter for the rules.
+
+Every rule's keywords (the context and target strings of its require filters)
+are compiled into one hyperscan literal database. Scanning some data with it
+gives the rules that could possibly match there, so only those rules need
+their patterns and filters checked. Rules without keywords always can.
+"""
+
+import logging
+
+from functools import cached_property
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.schema import Rule
+from sssig_rules.targets.common import _keywords
+from sssig_rules.targets.common import _strings_to_pattern
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordIndex:
+    def __init__(self, rules: list[Rule]) -> None:
+        # The rules each keyword (lower cased, like the targets match them)
+        # is a keyword of
+        keyword_rules: dict[str, set[int]] = {}
+        unfiltered = set()
+
+        for rule_index, rule in enumerate(rules):
+            keywords = _keywords(rule)
+            if not keywords:
+                unfiltered.add(rule_index)
+                continue
+
+            for keyword in keywords:
+                keyword_rules.setdefault(keyword.lower(), set()).add(rule_index)
+
+        self.keywords = list(keyword_rules)
+        self.unfiltered = frozenset(unfiltered)
+        self._keyword_rules = [frozenset(r) for r in keyword_rules.values()]
+        logger.debug(
+            "keyword index: keywords=%d unfiltered_rules=%d",
+            len(self.keywords),
+            len(self.unfiltered),
+        )
+
+    def _compile(self, mode: int) -> hscheck.Database | None:
+        if not self.keywords:
+            return None
+
+        return hscheck.compile(
+            [_strings_to_pattern([keyword]) for keyword in self.keywords],
+            flags=hscheck.FLAG_SINGLEMATCH,
+            mode=mode,
+        )
+
+    @cached_property
+    def _db(self) -> hscheck.Database | None:
+        return self._compile(hscheck.MODE_BLOCK)
+
+    @cached_property
+    def _stream_db(self) -> hscheck.Database | None:
+        return self._compile(hscheck.MODE_STREAM)
+
+    def _rules_for_matches(self, matches: list[tuple[int, int, int]]) -> set[int]:
+        rules = set()
+        for keyword_index, _, _ in matches:
+            rules.update(self._keyword_rules[keyword_index])
+
+        return rules
+
+    def rules_for(self, data: bytes) -> set[int]:
+        """
+        The indexes of the rules that have a keyword in data, plus the rules
+        without any keywords
+        """
+        rules = set(self.unfiltered)
+        if self._db is not None:
+            rules.update(self._rules_for_matches(self._db.scan(data)))
+
+        return rules
+
+    def open_stream(self) -> "KeywordStream":
+        return KeywordStream(self)
+
+
+class KeywordStream:
+    """
+    Tracks the rules whose keywords have occurred so far in a stream scanned a
+    chunk at a time
+    """
+
+    def __init__(self, index: KeywordIndex) -> None:
+        self._index = index
+        self._stream = index._stream_db and index._stream_db.open_stream()
+        self.rules = set(index.unfiltered)
+
+    def scan(self, chunk: bytes) -> None:
+        if self._stream is not None:
+            self.rules.update(self._index._rules_for_matches(self._stream.scan(chunk)))
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self.rules.update(self._index._rules_for_matches(self._stream.close()))
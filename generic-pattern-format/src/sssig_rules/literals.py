@@ -0,0 +1,158 @@
+"""
+Factoring lists of literal strings into smaller case insensitive patterns.
+
+A flat alternation of the strings, e.g. (?i)(?:token)|(?:tokens)|(?:test), is
+slow for the backtracking and automata based engines the targets use once
+there are hundreds of strings. The factored pattern matches the same inputs
+with each common prefix written once:
+
+    (?i)t(?:oken|est)
+
+Duplicate strings and strings containing another string are dropped ("tokens"
+above) since the patterns are only used to check whether the strings occur.
+"""
+
+import logging
+import re
+
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a string in the trie, it can't collide with a character
+_END = ""
+
+
+class FactoredStrings(NamedTuple):
+    pattern: str
+    # The number of strings before and after removing duplicates and strings
+    # containing another string
+    strings: int
+    kept: int
+    # The length of the flat alternation and the factored pattern
+    flat_length: int
+    length: int
+
+
+def _flat_pattern(strings: list[str]) -> str:
+    return "(?i)" + "|".join(f"(?:{re.escape(s).lower()})" for s in strings)
+
+
+def _minimal_strings(strings: list[str]) -> list[str]:
+    """
+    The lowercased strings without duplicates or strings containing another,
+    in the order they were first given
+    """
+    unique = list(dict.fromkeys(s.lower() for s in strings))
+    kept: list[str] = []
+    for s in sorted(unique, key=len):
+        if not any(k in s for k in kept):
+            kept.append(s)
+
+    keep = set(kept)
+    return [s for s in unique if s in keep]
+
+
+def _trie(strings: list[str]) -> dict[str, dict]:
+    root: dict[str, dict] = {}
+    for s in strings:
+        node = root
+        for c in s:
+            node = node.setdefault(c, {})
+
+        node[_END] = {}
+
+    return root
+
+
+def _alternatives(node: dict[str, dict]) -> list[str]:
+    """
+    The patterns for each branch below a trie node, with runs of single
+    children joined into one literal
+    """
+    alternatives = []
+    for c, child in node.items():
+        if c == _END:
+            continue
+
+        chars = [c]
+        while len(child) == 1 and _END not in child:
+            ((c, child),) = child.items()
+            chars.append(c)
+
+        alternatives.append(re.escape("".join(chars)) + _trie_pattern(child))
+
+    return alternatives
+
+
+def _trie_pattern(node: dict[str, dict]) -> str:
+    alternatives = _alternatives(node)
+    match len(alternatives):
+        case 0:
+            return ""
+        case 1:
+            pattern = alternatives[0]
+        case _:
+            pattern = "(?:" + "|".join(alternatives) + ")"
+
+    if _END in node:
+        return f"(?:{pattern})?"
+
+    return pattern
+
+
+def _probes(strings: list[str]) -> set[str]:
+    """
+    Inputs to compare the patterns with: every string, every prefix of one
+    (where the factored pattern branches) and every string with a character
+    either side
+    """
+    probes = set()
+    for s in strings:
+        probes.update(s[:i] for i in range(len(s) + 1))
+        probes.update([f"{s}_", f"_{s}", s.upper()])
+
+    return probes
+
+
+def _equivalent(strings: list[str], flat: str, factored: str) -> bool:
+    flat_re = re.compile(flat)
+    factored_re = re.compile(factored)
+    return all(
+        bool(flat_re.search(probe)) == bool(factored_re.search(probe))
+        for probe in _probes(strings)
+    )
+
+
+def factor_strings(strings: list[str]) -> FactoredStrings:
+    """
+    A case insensitive pattern matching wherever one of the strings occurs.
+    The factored pattern is checked against the flat alternation of the
+    strings, which is used instead if they disagree on any of the probes.
+    """
+    flat = _flat_pattern(strings)
+    # Dropping the strings that contain another only keeps the pattern
+    # equivalent for unanchored searches that check whether any string occurs,
+    # which is all the targets do with them. What matches can differ (with
+    # "token" and "ok", only "ok" is left to match in "token"), so the pattern
+    # mustn't be anchored or used to pull out what matched.
+    kept = _minimal_strings(strings)
+    # No string is a prefix of another once they're minimal, so the root of
+    # the trie is never optional and its branches can be top level
+    factored = "(?i)" + "|".join(_alternatives(_trie(kept)))
+
+    if not _equivalent(strings, flat, factored):
+        logger.warning(
+            "factored strings pattern doesn't match the same inputs, "
+            "using the flat pattern: %r",
+            strings,
+        )
+        factored, kept = flat, strings
+
+    return FactoredStrings(
+        pattern=factored,
+        strings=len(strings),
+        kept=len(kept),
+        flat_length=len(flat),
+        length=len(factored),
+    )
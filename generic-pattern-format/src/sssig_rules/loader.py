@@ -0,0 +1,85 @@
+"""
+Load the rules from a rules file, with libyaml when PyYAML was built with it.
+
+yaml.safe_load builds the whole document before any of it can be used, so the
+memory needed grows with the size of the rules file. iter_rules_data parses
+the file as a stream of events instead and each item of the top level rules
+list is composed, constructed and handed over on its own, then forgotten.
+Anchors defined anywhere before an alias (e.g. in another top level key) still
+resolve.
+"""
+
+from typing import Any
+from typing import Iterator
+from typing import TextIO
+
+import yaml
+
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.resolver import Resolver
+
+if yaml.__with_libyaml__:
+    from yaml.cyaml import CParser
+
+    _SafeLoader = yaml.CSafeLoader
+
+    class _EventLoader(CParser, Composer, SafeConstructor, Resolver):
+        """
+        libyaml's parser with PyYAML's composer, since libyaml's composer
+        can't compose a node at a time
+        """
+
+        def __init__(self, stream: TextIO) -> None:
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+else:
+    _SafeLoader = yaml.SafeLoader
+    _EventLoader = yaml.SafeLoader
+
+
+def load_rules_data(stream: TextIO | str) -> list[Any]:
+    """
+    The raw data of every rule in the rules list of a rules file
+    """
+    return yaml.load(stream, Loader=_SafeLoader)["rules"]
+
+
+def _expect(loader: _EventLoader, event: type[yaml.Event], what: str) -> None:
+    if not loader.check_event(event):
+        raise yaml.YAMLError(f"expected {what}, got {loader.peek_event()}")
+
+    loader.get_event()
+
+
+def iter_rules_data(stream: TextIO) -> Iterator[Any]:
+    """
+    The raw data of each rule in the rules list of a rules file
+    """
+    loader = _EventLoader(stream)
+    try:
+        _expect(loader, yaml.StreamStartEvent, "the start of the stream")
+        _expect(loader, yaml.DocumentStartEvent, "the start of a document")
+        _expect(loader, yaml.MappingStartEvent, "a mapping")
+
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = loader.construct_object(loader.compose_node(None, None))
+            if key != "rules":
+                # Composed so any anchors in it are known, but not constructed
+                loader.compose_node(None, None)
+                continue
+
+            _expect(loader, yaml.SequenceStartEvent, "a list of rules")
+            while not loader.check_event(yaml.SequenceEndEvent):
+                node = loader.compose_node(None, None)
+                yield loader.construct_object(node, deep=True)
+                # The constructor remembers every object it built, which would
+                # keep all of the rules alive
+                loader.constructed_objects = {}
+
+            loader.get_event()
+    finally:
+        loader.dispose()
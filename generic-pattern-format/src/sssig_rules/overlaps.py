@@ -0,0 +1,121 @@
+"""
+Find rules whose positive examples are also matched by other rules, which
+means duplicate findings and time spent matching the same secrets twice.
+
+All of the rules are compiled into one hyperscan database and each positive
+example is scanned once, so finding the overlaps takes time proportional to
+the number of examples rather than the number of pairs of rules.
+"""
+
+import time
+
+from pydantic import BaseModel
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.database import compile_rules
+from sssig_rules.database import matched_rules
+from sssig_rules.schema import Rule
+
+
+class OverlappingRule(BaseModel):
+    # Rules are told apart by their index in the rules file since ids can be
+    # duplicated
+    index: int
+    id: str
+
+
+class ExampleOverlap(BaseModel):
+    example: str
+    # The other rules matching the example
+    matched_by: list[OverlappingRule]
+
+
+class RuleOverlaps(BaseModel):
+    index: int
+    id: str
+    name: str
+    # The other rules matching any of the rule's examples
+    overlapping: list[OverlappingRule]
+    examples: list[ExampleOverlap]
+
+
+class OverlapReport(BaseModel):
+    rules: int
+    examples: int
+    compile_seconds: float
+    scan_seconds: float
+    # Only the rules with overlapping examples, in rules file order
+    results: list[RuleOverlaps]
+
+    def pairs(self) -> set[tuple[str, str]]:
+        """
+        Each rule id with the id of a rule matching its examples. Ids are
+        compared with a baseline rather than indexes, which change when rules
+        are added or removed.
+        """
+        return {
+            (result.id, other.id)
+            for result in self.results
+            for other in result.overlapping
+        }
+
+    def new_since(self, baseline: "OverlapReport") -> list[tuple[str, str]]:
+        """
+        The overlapping pairs that aren't in the baseline report
+        """
+        return sorted(self.pairs() - baseline.pairs())
+
+
+def _overlapping_rule(rules: list[Rule], rule_index: int) -> OverlappingRule:
+    return OverlappingRule(index=rule_index, id=rules[rule_index].id)
+
+
+def find_overlaps(rules: list[Rule]) -> OverlapReport:
+    start = time.perf_counter()
+    # Only whether a rule matched matters, not every match
+    db = compile_rules(rules, flags=hscheck.FLAG_SINGLEMATCH).db
+    compile_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Rules often share examples, each distinct one is only scanned once
+    scanned: dict[str, set[int]] = {}
+    results = []
+    for rule_index, rule in enumerate(rules):
+        examples = rule.meta.examples
+        overlaps = []
+        for example in (examples and examples.positive) or []:
+            if example not in scanned:
+                scanned[example] = matched_rules(db, example.encode())
+
+            others = sorted(scanned[example] - {rule_index})
+            if others:
+                overlaps.append(
+                    ExampleOverlap(
+                        example=example,
+                        matched_by=[_overlapping_rule(rules, i) for i in others],
+                    )
+                )
+
+        if overlaps:
+            overlapping = {
+                other.index for overlap in overlaps for other in overlap.matched_by
+            }
+            results.append(
+                RuleOverlaps(
+                    index=rule_index,
+                    id=rule.id,
+                    name=rule.meta.name,
+                    overlapping=[
+                        _overlapping_rule(rules, i) for i in sorted(overlapping)
+                    ],
+                    examples=overlaps,
+                )
+            )
+
+    return OverlapReport(
+        rules=len(rules),
+        examples=len(scanned),
+        compile_seconds=compile_seconds,
+        scan_seconds=time.perf_counter() - start,
+        results=results,
+    )
@@ -0,0 +1,167 @@
+"""
+Optional profiling of where a run spends its time.
+
+The pipeline marks its stages with stage() and reports per-rule timings with
+record_rule(). Both do nothing unless profiling was enabled, stage() returns
+a shared no-op context manager, so the instrumentation stays in place at no
+cost. A stage records its wall time, CPU time and the change in the number of
+allocated memory blocks, summed over every time it runs (nested stages are
+included in the stages around them).
+"""
+
+import json
+import sys
+import time
+
+from contextlib import contextmanager
+from contextlib import nullcontext
+from typing import TYPE_CHECKING
+from typing import ContextManager
+from typing import Iterator
+from typing import NamedTuple
+from typing import TextIO
+
+if TYPE_CHECKING:
+    from sssig_rules.schema import Rule
+
+DEFAULT_TOP = 10
+
+_NULL_STAGE = nullcontext()
+
+
+class StageStats(NamedTuple):
+    name: str
+    calls: int
+    wall_seconds: float
+    cpu_seconds: float
+    # The change in sys.getallocatedblocks(), what the stage left allocated
+    allocated_blocks: int
+
+
+class RuleTiming(NamedTuple):
+    rule_id: str
+    # What was timed, e.g. "compile" or "translate.gitleaks"
+    kind: str
+    seconds: float
+
+
+class Profile:
+    def __init__(self) -> None:
+        self._stages: dict[str, list[float]] = {}
+        self.rules: list[RuleTiming] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        blocks = sys.getallocatedblocks()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self._stages.setdefault(name, [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += time.perf_counter() - wall
+            stats[2] += time.process_time() - cpu
+            stats[3] += sys.getallocatedblocks() - blocks
+
+    def record_rule(self, rule_id: str, kind: str, seconds: float) -> None:
+        self.rules.append(RuleTiming(rule_id, kind, seconds))
+
+    def stages(self) -> list[StageStats]:
+        """
+        The stages in the order they first ran
+        """
+        return [
+            StageStats(name, int(calls), wall, cpu, int(blocks))
+            for name, (calls, wall, cpu, blocks) in self._stages.items()
+        ]
+
+    def slowest_rules(self, top: int = DEFAULT_TOP) -> list[RuleTiming]:
+        return sorted(self.rules, key=lambda r: r.seconds, reverse=True)[:top]
+
+    def report(self) -> dict:
+        return {
+            "stages": [stats._asdict() for stats in self.stages()],
+            "rules": [timing._asdict() for timing in self.rules],
+        }
+
+    def write_json(self, out: TextIO) -> None:
+        json.dump(self.report(), out, indent=2)
+        out.write("\n")
+
+    def write_summary(self, out: TextIO, top: int = DEFAULT_TOP) -> None:
+        out.write(
+            f"{'stage':<32} {'calls':>6} {'wall':>10} {'cpu':>10} {'blocks':>10}\n"
+        )
+        for s in self.stages():
+            out.write(
+                f"{s.name:<32} {s.calls:>6} {s.wall_seconds * 1000:>8.1f}ms "
+                f"{s.cpu_seconds * 1000:>8.1f}ms {s.allocated_blocks:>10}\n"
+            )
+
+        if self.rules:
+            out.write(f"slowest {min(top, len(self.rules))} of {len(self.rules)}:\n")
+            for timing in self.slowest_rules(top):
+                out.write(
+                    f"  {timing.seconds * 1000:>8.3f}ms {timing.kind} {timing.rule_id}\n"
+                )
+
+
+_active: Profile | None = None
+
+
+def enable() -> Profile:
+    """
+    Start profiling, returning the profile the stages are recorded in
+    """
+    global _active
+    _active = Profile()
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def active() -> Profile | None:
+    return _active
+
+
+def stage(name: str) -> ContextManager[None]:
+    """
+    Record a stage of the pipeline when profiling
+    """
+    if _active is None:
+        return _NULL_STAGE
+
+    return _active.stage(name)
+
+
+def record_rule(rule_id: str, kind: str, seconds: float) -> None:
+    if _active is not None:
+        _active.record_rule(rule_id, kind, seconds)
+
+
+def time_rule_compiles(rules: "list[Rule]") -> None:
+    """
+    Compile each rule's match pattern on its own to record how long each
+    takes, which the batched compiles of the pipeline can't tell. Only done
+    when profiling.
+    """
+    if _active is None:
+        return
+
+    from sssig_rules import hscheck  # type: ignore
+    from sssig_rules.targets.common import _match_pattern
+
+    with stage("compile.rules"):
+        for rule in rules:
+            start = time.perf_counter()
+            try:
+                hscheck.compile([_match_pattern(rule)])
+            except hscheck.CompileError:
+                # Some match patterns only compile with other flags
+                continue
+
+            record_rule(rule.id, "compile", time.perf_counter() - start)
@@ -0,0 +1,449 @@
+"""
+A reference scanner that interprets the generic rules directly.
+
+The match pattern of every rule is compiled into one hyperscan stream mode
+database. Files are streamed through it in fixed size chunks, keeping only a
+bounded window of recent data to pull matches and their lines out of, and
+each candidate match is then checked against its rule's filters. Candidates
+of rules whose keywords haven't occurred in the file are skipped without
+checking their filters.
+
+Rules whose patterns can't be compiled with leftmost start of match in stream
+mode are compiled without it, and their matches are taken to start at the
+beginning of the line they end on.
+
+Dependencies and analyzers aren't evaluated.
+"""
+
+import logging
+import os
+import time
+
+from functools import cached_property
+from pathlib import Path
+from typing import BinaryIO
+from typing import Iterable
+from typing import Iterator
+from typing import NamedTuple
+
+from pydantic import BaseModel
+
+from sssig_rules import entropy  # type: ignore
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.bundle import Bundle
+from sssig_rules.bundle import BundleError
+from sssig_rules.database import compile_rules
+from sssig_rules.keywords import KeywordIndex
+from sssig_rules.schema import ExcludeFilter
+from sssig_rules.schema import Pattern
+from sssig_rules.schema import RequireFilter
+from sssig_rules.schema import Rule
+from sssig_rules.targets.common import _excluded_filters
+from sssig_rules.targets.common import _pattern_str
+from sssig_rules.targets.common import _required_filters
+from sssig_rules.targets.common import _strings_to_pattern
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_WINDOW_SIZE = 64 * 1024
+
+# How the rules' patterns are compiled for scanning, also used for bundles
+SCAN_FLAGS = hscheck.FLAG_SOM_LEFTMOST
+SCAN_MODE = hscheck.MODE_STREAM | hscheck.MODE_SOM_HORIZON_LARGE
+SCAN_FALLBACK_FLAGS = 0
+
+# The ids of the patterns that split a match into its prefix, target and suffix
+_ANCHORED_PREFIX = 0
+_ANCHORED_TARGET = 1
+_ANCHORED_SUFFIX = 2
+
+
+class Finding(BaseModel):
+    rule_id: str
+    path: str
+    line: int
+    start: int
+    end: int
+    target: str
+
+
+class _Candidate(NamedTuple):
+    path: bytes
+    match: bytes
+    target: bytes
+    context: bytes
+
+
+class _Matcher:
+    """
+    Checks if any of a list of patterns or strings occur in some data. Strings
+    are matched case insensitively like the targets do.
+    """
+
+    def __init__(
+        self,
+        patterns: list[Pattern] | None,
+        strings: list[str] | None = None,
+    ) -> None:
+        self.patterns = list(patterns or [])
+        strings_pattern = _strings_to_pattern(strings)
+        if strings_pattern is not None:
+            self.patterns.append(strings_pattern)
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    @cached_property
+    def _db(self) -> hscheck.Database:
+        return hscheck.compile(self.patterns, flags=hscheck.FLAG_SINGLEMATCH)
+
+    def search(self, data: bytes) -> bool:
+        return bool(self._db.scan(data))
+
+
+class _Filter:
+    def __init__(self, f: RequireFilter | ExcludeFilter) -> None:
+        exclude = f if isinstance(f, ExcludeFilter) else None
+        self.target = _Matcher(exclude and exclude.target_patterns, f.target_strings)
+        self.path = _Matcher(f.path_patterns, f.path_strings)
+        self.context = _Matcher(exclude and exclude.context_patterns, f.context_strings)
+        self.match = _Matcher(
+            exclude and exclude.match_patterns,
+            exclude and exclude.match_strings,
+        )
+        self.min_entropy = getattr(f, "target_min_entropy", None)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.target
+            or self.path
+            or self.context
+            or self.match
+            or self.min_entropy is not None
+        )
+
+    def matches(self, candidate: _Candidate) -> bool:
+        """
+        Check that every feature set on the filter matches. Features are AND'd
+        the same way gitleaks allowlists are.
+        """
+        features = [
+            (self.target, candidate.target),
+            (self.path, candidate.path),
+            (self.context, candidate.context),
+            (self.match, candidate.match),
+        ]
+        if not all(matcher.search(data) for matcher, data in features if matcher):
+            return False
+
+        if self.min_entropy is not None:
+            return bool(entropy.at_least([candidate.target], self.min_entropy))
+
+        return True
+
+
+class _RuleFilters:
+    """
+    The compiled filters and target pattern of a rule, built the first time
+    the rule has a candidate match
+    """
+
+    def __init__(self, rule: Rule) -> None:
+        self.rule = rule
+        self.required = [_Filter(f) for f in _required_filters(rule)]
+        # Exclude filters without any features would exclude everything
+        self.excluded = [f for f in map(_Filter, _excluded_filters(rule)) if f]
+
+    @cached_property
+    def _anchored_db(self) -> hscheck.Database | None:
+        """
+        The prefix pattern anchored to the start of the data, the target
+        pattern anchored to the start and the suffix pattern anchored to both
+        ends, by their _ANCHORED_* id
+        """
+        target = self.rule.target
+        patterns = [
+            f"\\A{_pattern_str(target.prefix_pattern, noncapture_group=True)}",
+            f"\\A{_pattern_str(target.pattern, noncapture_group=True)}",
+            f"\\A{_pattern_str(target.suffix_pattern, noncapture_group=True)}\\z",
+        ]
+        try:
+            return hscheck.compile(
+                patterns,
+                ids=[_ANCHORED_PREFIX, _ANCHORED_TARGET, _ANCHORED_SUFFIX],
+                flags=hscheck.FLAG_ALLOWEMPTY,
+            )
+        except hscheck.CompileError as e:
+            logger.warning(
+                "using the whole match as the target: rule_id=%r: %s",
+                self.rule.id,
+                e.args[0],
+            )
+            return None
+
+    def _ends(self, data: bytes, pattern_id: int) -> list[int]:
+        return sorted(
+            {end for i, _, end in self._anchored_db.scan(data) if i == pattern_id},
+            reverse=True,
+        )
+
+    def target_span(self, match: bytes) -> tuple[int, int]:
+        """
+        Where the target is in the match, between the prefix at its start and
+        the suffix at its end. Where there are several ways to split the match
+        the longest prefix and then the longest target are used, like the
+        greedy capture group of the targets' match patterns. Matches that
+        can't be split (those taken to start at the beginning of their line)
+        are their own target.
+        """
+        if not (self.rule.target.prefix_pattern or self.rule.target.suffix_pattern):
+            return 0, len(match)
+
+        if self._anchored_db is None:
+            return 0, len(match)
+
+        for start in self._ends(match, _ANCHORED_PREFIX):
+            for end in self._ends(match[start:], _ANCHORED_TARGET):
+                if self._ends(match[start + end :], _ANCHORED_SUFFIX):
+                    return start, start + end
+
+        return 0, len(match)
+
+    def passes(self, candidate: _Candidate) -> bool:
+        return all(f.matches(candidate) for f in self.required) and not any(
+            f.matches(candidate) for f in self.excluded
+        )
+
+
+class _Window:
+    """
+    The most recently scanned bytes of a stream along with where they start
+    """
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.start = 0
+        self.line = 1
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.data)
+
+    def append(self, chunk: bytes) -> None:
+        self.data += chunk
+
+    def trim(self, keep_from: int) -> None:
+        drop = min(max(keep_from - self.start, 0), len(self.data))
+        self.line += self.data.count(b"\n", 0, drop)
+        del self.data[:drop]
+        self.start += drop
+
+    def slice(self, start: int, end: int) -> bytes:
+        return bytes(self.data[max(start - self.start, 0) : end - self.start])
+
+    def line_start(self, offset: int) -> int:
+        """
+        Where the line containing offset starts, or the window start if the
+        line starts before it
+        """
+        return self.start + self.data.rfind(b"\n", 0, max(offset - self.start, 0)) + 1
+
+    def line_of(self, offset: int) -> int:
+        return self.line + self.data.count(b"\n", 0, max(offset - self.start, 0))
+
+    def has_line_end(self, offset: int) -> bool:
+        return self.data.find(b"\n", max(offset - self.start, 0)) != -1
+
+    def context(self, start: int, end: int) -> bytes:
+        """
+        The line(s) containing start:end, as much of them as is in the window
+        """
+        line_start = self.data.rfind(b"\n", 0, max(start - self.start, 0)) + 1
+        line_end = self.data.find(b"\n", max(end - self.start, 0))
+        if line_end == -1:
+            line_end = len(self.data)
+
+        return bytes(self.data[line_start:line_end])
+
+
+class Scanner:
+    def __init__(
+        self,
+        rules: list[Rule],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        bundle: Bundle | None = None,
+    ) -> None:
+        """
+        The rules are compiled unless a bundle of them (in the same order,
+        compiled for scanning) is given
+        """
+        self.rules = rules
+        self.chunk_size = chunk_size
+        self.window_size = window_size
+        self.bytes_scanned = 0
+        self.seconds = 0.0
+        self._filters: dict[int, _RuleFilters] = {}
+        if bundle is None:
+            self._db, rule_flags = compile_rules(
+                rules,
+                flags=SCAN_FLAGS,
+                mode=SCAN_MODE,
+                fallback_flags=SCAN_FALLBACK_FLAGS,
+            )
+        else:
+            if [rule.id for rule in bundle.rules] != [rule.id for rule in rules]:
+                raise BundleError("the bundle wasn't compiled from these rules")
+
+            if bundle.mode != SCAN_MODE:
+                raise BundleError("the bundle wasn't compiled for scanning")
+
+            self._db = bundle.db
+            rule_flags = [rule.flags for rule in bundle.rules]
+
+        self._without_som = {i for i, flags in enumerate(rule_flags) if flags == 0}
+        self._keywords = KeywordIndex(rules)
+
+    @property
+    def throughput(self) -> float:
+        """
+        Bytes scanned per second
+        """
+        return self.bytes_scanned / self.seconds if self.seconds else 0.0
+
+    def _rule_filters(self, rule_index: int) -> _RuleFilters:
+        if rule_index not in self._filters:
+            self._filters[rule_index] = _RuleFilters(self.rules[rule_index])
+
+        return self._filters[rule_index]
+
+    def scan_paths(self, paths: Iterable[Path]) -> Iterator[Finding]:
+        """
+        Scan the files, walking any directories
+        """
+        for path in paths:
+            if path.is_dir():
+                for root, _, filenames in os.walk(path):
+                    for filename in sorted(filenames):
+                        yield from self.scan_file(Path(root) / filename)
+            else:
+                yield from self.scan_file(path)
+
+    def scan_file(self, path: Path) -> Iterator[Finding]:
+        try:
+            with path.open("rb") as stream:
+                yield from self.scan_stream(stream, str(path))
+        except OSError as e:
+            logger.warning("unable to scan %s: %s", path, e)
+
+    def scan_stream(self, stream: BinaryIO, path: str) -> Iterator[Finding]:
+        hs_stream = self._db.open_stream()
+        keywords = self._keywords.open_stream()
+        window = _Window()
+        # (rule index, start) -> furthest end seen for that start
+        pending: dict[tuple[int, int], int] = {}
+        reported_to: dict[int, int] = {}
+
+        def add(matches: list[tuple[int, int, int]]) -> None:
+            for rule_index, start, end in matches:
+                if rule_index in self._without_som:
+                    start = max(window.line_start(end), end - self.window_size)
+
+                key = (rule_index, start)
+                pending[key] = max(end, pending.get(key, end))
+
+        while True:
+            start_time = time.perf_counter()
+            chunk = stream.read(self.chunk_size)
+            if chunk:
+                window.append(chunk)
+                keywords.scan(chunk)
+                add(hs_stream.scan(chunk))
+            else:
+                keywords.close()
+                add(hs_stream.close())
+
+            findings = list(
+                self._flush(
+                    path,
+                    window,
+                    pending,
+                    reported_to,
+                    keywords.rules,
+                    closed=not chunk,
+                )
+            )
+            self.bytes_scanned += len(chunk)
+            self.seconds += time.perf_counter() - start_time
+
+            yield from findings
+            if not chunk:
+                return
+
+            keep_from = min(
+                [start for _, start in pending] + [window.end - self.window_size]
+            )
+            window.trim(keep_from)
+
+    def _flush(
+        self,
+        path: str,
+        window: _Window,
+        pending: dict[tuple[int, int], int],
+        reported_to: dict[int, int],
+        keyword_rules: set[int],
+        closed: bool,
+    ) -> Iterator[Finding]:
+        """
+        Check the pending matches that can't grow any more and whose line has
+        ended (or that have outgrown the window)
+        """
+        for rule_index, start in sorted(pending, key=lambda key: key[1]):
+            end = pending[(rule_index, start)]
+            ready = closed or (
+                end < window.end
+                and (window.has_line_end(end) or window.end - start >= self.window_size)
+            )
+            if not ready:
+                continue
+
+            del pending[(rule_index, start)]
+
+            # The lines a ready match is on have already been scanned for
+            # keywords, so the rule's filters can't pass without one
+            if rule_index not in keyword_rules:
+                continue
+
+            # Only report non-overlapping matches for a rule
+            if start < reported_to.get(rule_index, 0):
+                continue
+
+            if start < window.start:
+                logger.debug("match truncated to the scan window: %s:%d", path, start)
+
+            filters = self._rule_filters(rule_index)
+            match = window.slice(start, end)
+            target_start, target_end = filters.target_span(match)
+            candidate = _Candidate(
+                path=os.fsencode(path),
+                match=match,
+                target=match[target_start:target_end],
+                context=window.context(start, end),
+            )
+            if not filters.passes(candidate):
+                continue
+
+            reported_to[rule_index] = end
+            if filters.rule.meta.report:
+                # Findings are located by their target, the match includes the
+                # prefix and suffix context around it
+                match_start = max(start, window.start)
+                yield Finding(
+                    rule_id=filters.rule.id,
+                    path=path,
+                    line=window.line_of(match_start + target_start),
+                    start=match_start + target_start,
+                    end=match_start + target_end,
+                    target=candidate.target.decode(errors="replace"),
+                )
@@ -1,17 +1,33 @@
 import enum
+import itertools
+import math
 
 from enum import StrEnum
+from functools import cache
+from typing import TYPE_CHECKING
 from typing import Annotated
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 from typing import Union
 from typing import Literal
+from typing import TypedDict
 
 from pydantic import AfterValidator
 from pydantic import BaseModel
 from pydantic import BeforeValidator
 from pydantic import Field
 from pydantic import HttpUrl
+from pydantic import TypeAdapter
+from pydantic import ValidationError
+from pydantic import ValidationInfo
 
 from sssig_rules import hscheck  # type: ignore
+from sssig_rules import profiling
+
+if TYPE_CHECKING:
+    from sssig_rules.cache import ValidationCache
 
 
 def ensure_valid_range(value: int | list[int]) -> list[int]:
@@ -27,10 +43,86 @@ def ensure_valid_range(value: int | list[int]) -> list[int]:
     return value
 
 
-def is_valid_hs_pattern(raw_pattern: str) -> str:
+_CHUNKS_PER_THREAD = 4
+
+
+class PatternBatch:
+    """
+    Collects the patterns seen while validating models so they can all be
+    checked by hyperscan in one compile instead of one compile per pattern.
+    Patterns found in the cache (when one is provided) aren't compiled at all.
+    """
+
+    def __init__(
+        self,
+        cache: "ValidationCache | None" = None,
+        threads: int = 1,
+    ) -> None:
+        self.cache = cache
+        self.threads = threads
+        self.patterns: dict[str, None] = {}
+        self.errors: dict[str, str] | None = None
+
+    def check(self, raw_pattern: str) -> str:
+        if self.errors is None:
+            self.patterns.setdefault(raw_pattern)
+        elif err := self.errors.get(raw_pattern):
+            raise ValueError(err)
+
+        return raw_pattern
+
+    def validate(self) -> dict[str, str]:
+        patterns = list(self.patterns)
+        results = self.cache.get_many(patterns) if self.cache else {}
+
+        missed = [pattern for pattern in patterns if pattern not in results]
+        if missed:
+            compiled = {
+                pattern: err or ""
+                for pattern, err in zip(
+                    missed, validate_patterns_threaded(missed, self.threads)
+                )
+            }
+            if self.cache:
+                self.cache.put_many(compiled)
+
+            results.update(compiled)
+
+        self.errors = {pattern: err for pattern, err in results.items() if err}
+        return self.errors
+
+
+def validate_patterns_threaded(patterns: list[str], threads: int) -> list[str | None]:
+    """
+    The compile error of each pattern (None if it's valid), with the patterns
+    split into chunks that are compiled on threads at once. hscheck releases
+    the GIL while it compiles, so the chunks can compile on separate cores.
+    """
+    if threads <= 1 or len(patterns) < 2:
+        return hscheck.validate_patterns(patterns)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # More chunks than threads so a chunk of slow patterns doesn't leave the
+    # other threads idle at the end
+    size = math.ceil(len(patterns) / (threads * _CHUNKS_PER_THREAD))
+    chunks = [patterns[i : i + size] for i in range(0, len(patterns), size)]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return [
+            err
+            for errors in pool.map(hscheck.validate_patterns, chunks)
+            for err in errors
+        ]
+
+
+def is_valid_hs_pattern(raw_pattern: str, info: ValidationInfo) -> str:
     """
     Make sure the pattern is a valid hyperscan pattern
     """
+    batch = (info.context or {}).get("pattern_batch")
+    if batch is not None:
+        return batch.check(raw_pattern)
+
     err = hscheck.validate_pattern(raw_pattern)
     if err:
         raise ValueError(err)
@@ -222,3 +314,180 @@ class Rule(BaseModel):
     target: Target
     filters: list[Filter] | None = None
     analyzers: list[Analyzer] | None = None
+
+
+class RulesFile(TypedDict):
+    """
+    A rules file. Keys other than rules (e.g. ones only holding YAML anchors)
+    are ignored.
+    """
+
+    rules: list[Rule]
+
+
+# Building the validators is the slow part of creating an adapter, so they're
+# only created once
+@cache
+def _rules_adapter() -> TypeAdapter[list[Rule]]:
+    return TypeAdapter(list[Rule])
+
+
+@cache
+def _rules_file_adapter() -> TypeAdapter[RulesFile]:
+    return TypeAdapter(RulesFile)
+
+
+def _validate_batched(
+    validate: Callable[[dict[str, Any]], list[Rule]],
+    cache: "ValidationCache | None",
+    threads: int = 1,
+) -> list[Rule]:
+    """
+    Run validate with all of the patterns of the rules checked in a single
+    batch, compiled on threads at once. Invalid patterns are reported along
+    with any other errors in the rules.
+    """
+    batch = PatternBatch(cache, threads)
+    context = {"pattern_batch": batch}
+    schema_error = None
+    with profiling.stage("validate.models"):
+        try:
+            rules = validate(context)
+        except ValidationError as e:
+            # Every pattern reached has still been collected, so their errors
+            # can be raised with this one's
+            schema_error = e
+
+    with profiling.stage("validate.hyperscan"):
+        errors = batch.validate()
+
+    if errors:
+        # Validate again now that the errors are known so they're raised
+        # with the location of the pattern that caused them, in order with
+        # the rest of the errors
+        validate(context)
+
+    if schema_error is not None:
+        raise schema_error
+
+    return rules
+
+
+def _offset_errors(e: ValidationError, offset: int) -> ValidationError:
+    """
+    The errors from validating part of a list of rules, located in the whole
+    list. Errors about the list itself (e.g. it isn't one) have no location.
+    """
+    return ValidationError.from_exception_data(
+        e.title,
+        [
+            (
+                {**err, "loc": (err["loc"][0] + offset, *err["loc"][1:])}
+                if err["loc"]
+                else err
+            )
+            for err in e.errors()
+        ],
+    )
+
+
+def validate_rules(
+    rules_data: list[Any],
+    cache: "ValidationCache | None" = None,
+    offset: int = 0,
+    threads: int = 1,
+) -> list[Rule]:
+    """
+    Validate a list of raw rules with all of their patterns checked in a
+    single batch (compiled on threads at once). Errors are located as if the
+    rules started at offset in a longer list.
+    """
+    adapter = _rules_adapter()
+    try:
+        return _validate_batched(
+            lambda context: adapter.validate_python(rules_data, context=context),
+            cache,
+            threads,
+        )
+    except ValidationError as e:
+        if not offset:
+            raise
+
+        raise _offset_errors(e, offset) from None
+
+
+def validate_rules_json(
+    data: bytes | str,
+    cache: "ValidationCache | None" = None,
+    threads: int = 1,
+) -> list[Rule]:
+    """
+    Validate the rules of a JSON rules file straight from the JSON, without
+    building the Python objects for it first
+    """
+    adapter = _rules_file_adapter()
+    return _validate_batched(
+        lambda context: adapter.validate_json(data, context=context)["rules"],
+        cache,
+        threads,
+    )
+
+
+def _validate_rules_job(
+    rules_data: list[Any],
+    offset: int,
+    use_cache: bool,
+    threads: int,
+) -> list[Rule]:
+    """
+    Run in a worker process, so it opens its own connection to the cache
+    """
+    from sssig_rules.cache import open_validation_cache
+
+    cache = open_validation_cache() if use_cache else None
+    try:
+        return validate_rules(rules_data, cache, offset, threads)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def validate_rules_parallel(
+    rules_data: list[Any],
+    jobs: int,
+    use_cache: bool = True,
+    threads: int = 1,
+) -> list[Rule]:
+    """
+    Validate the rules split evenly across jobs worker processes, in the
+    rules' order, each compiling its patterns on threads at once. Each worker
+    uses its own connection to the validation cache when use_cache is set.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    size = math.ceil(len(rules_data) / max(jobs, 1)) or 1
+    offsets = range(0, len(rules_data), size)
+    with ProcessPoolExecutor(max_workers=max(len(offsets), 1)) as pool:
+        results = pool.map(
+            _validate_rules_job,
+            [rules_data[offset : offset + size] for offset in offsets],
+            offsets,
+            itertools.repeat(use_cache),
+            itertools.repeat(threads),
+        )
+        return [rule for rules in results for rule in rules]
+
+
+def iter_validated_rules(
+    rules_data: Iterable[Any],
+    cache: "ValidationCache | None" = None,
+    batch_size: int = 256,
+    threads: int = 1,
+) -> Iterator[Rule]:
+    """
+    Validate raw rules as they arrive, batch_size at a time, so the patterns
+    are still compiled in batches (on threads at once) without holding every
+    rule
+    """
+    for i, batch in enumerate(itertools.batched(rules_data, batch_size)):
+        yield from validate_rules(list(batch), cache, i * batch_size, threads)
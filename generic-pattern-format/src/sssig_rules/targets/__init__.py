@@ -1,12 +1,23 @@
+"""
+The translation targets. Each target's module is only imported the first time
+it's used, e.g. as targets.gitleaks, so a run only pays for the targets it
+translates to.
+"""
+
 import enum
+import importlib
+import time
 
 from enum import StrEnum
+from types import ModuleType
+from typing import TYPE_CHECKING
+from typing import Iterable
+from typing import TextIO
+
+from sssig_rules import profiling
 
-from sssig_rules.targets import github as github
-from sssig_rules.targets import gitleaks as gitleaks
-from sssig_rules.targets import kingfisher as kingfisher
-from sssig_rules.targets import noseyparker as noseyparker
-from sssig_rules.targets import trufflehog as trufflehog
+if TYPE_CHECKING:
+    from sssig_rules.schema import Rule
 
 
 class TargetKind(StrEnum):
@@ -17,4 +28,73 @@ class TargetKind(StrEnum):
     TRUFFLEHOG = enum.auto()
 
 
+_EXTENSIONS = {
+    TargetKind.GITHUB: "json",
+    TargetKind.GITLEAKS: "toml",
+    TargetKind.KINGFISHER: "yaml",
+    TargetKind.NOSEYPARKER: "yaml",
+    TargetKind.TRUFFLEHOG: "yaml",
+}
+
+
+def module(kind: TargetKind) -> ModuleType:
+    """
+    The module implementing a target, importing it if needed
+    """
+    return importlib.import_module(f"{__name__}.{TargetKind(kind)}")
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name in TargetKind._value2member_map_:
+        return module(TargetKind(name))
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def filename(kind: TargetKind) -> str:
+    """
+    The name of the file a target's translated rules are written to
+    """
+    return f"{kind}.{_EXTENSIONS[kind]}"
+
+
+def translate(kind: TargetKind, rules: "list[Rule]") -> str:
+    """
+    Translate the rules for the target. This is a module level function so it
+    can be run in a process pool.
+    """
+    if profiling.active() is not None:
+        return _profiled_translate(TargetKind(kind), rules)
+
+    return module(kind).translate(rules)
+
+
+def _profiled_translate(kind: TargetKind, rules: "list[Rule]") -> str:
+    """
+    Translate a rule at a time to record how long each rule takes, then
+    serialize them. The output is the same as translate's.
+    """
+    target = module(kind)
+    with profiling.stage(f"{kind}.translate"):
+        fragments = []
+        for rule in rules:
+            start = time.perf_counter()
+            fragments.append(target._fragment(rule))
+            profiling.record_rule(
+                rule.id, f"translate.{kind}", time.perf_counter() - start
+            )
+
+    with profiling.stage(f"{kind}.dump"):
+        return target._document(fragments)
+
+
+def write(kind: TargetKind, rules: "Iterable[Rule]", out: TextIO) -> None:
+    """
+    Translate the rules for the target, writing each one to out as it's
+    translated. The output is the same as translate's.
+    """
+    with profiling.stage(f"{TargetKind(kind)}.write"):
+        module(kind).write(rules, out)
+
+
 __all__ = [kind.value for kind in TargetKind]
@@ -1,8 +1,15 @@
 import logging
 import re
 import json
+import textwrap
+import weakref
+
+from functools import cache
+from functools import cached_property
+from typing import Any
+from typing import Iterable
+from typing import TextIO
 
-import tomlkit
 import yaml
 
 from sssig_rules.schema import ExcludeFilter
@@ -12,15 +19,27 @@ from sssig_rules.schema import RequireFilter
 from sssig_rules.schema import Rule
 
 from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
 
 logger = logging.getLogger(__name__)
 
+# Whether lists of strings are factored into smaller patterns, see
+# set_factor_strings
+_factor_strings = False
 
-def _match_pattern(rule: Rule) -> Pattern:
-    prefix = _pattern_str(rule.target.prefix_pattern, noncapture_group=True)
-    suffix = _pattern_str(rule.target.suffix_pattern, noncapture_group=True)
-    target = _pattern_str(rule.target.pattern, capture_group=bool(prefix or suffix))
-    return Pattern(f"{prefix}{target}{suffix}")
+
+def set_factor_strings(enabled: bool) -> None:
+    """
+    Translate lists of strings with literals.factor_strings instead of as flat
+    alternations. This has to be set before any rules are translated since
+    the patterns are cached in the rule views.
+    """
+    global _factor_strings
+    _factor_strings = enabled
+
+
+def factoring_strings() -> bool:
+    return _factor_strings
 
 
 def _pattern_str(
@@ -51,12 +70,31 @@ def _strings_to_pattern(strings: None | list[str]) -> Pattern | None:
             return None
         case 1:
             return Pattern(f"(?i){re.escape(strings[0]).lower()}")
+        case _ if _factor_strings:
+            return _factored_pattern(strings)
         case _:
             return Pattern(
                 "(?i)" + "|".join(f"(?:{re.escape(s).lower()})" for s in strings)
             )
 
 
+def _factored_pattern(strings: list[str]) -> Pattern:
+    # Only equivalent to the flat pattern for unanchored searches, see
+    # literals.factor_strings. literals is only needed when factoring strings.
+    from sssig_rules.literals import factor_strings
+
+    factored = factor_strings(strings)
+    logger.info(
+        "factored strings: strings=%d->%d length=%d->%d (%.0f%% smaller)",
+        factored.strings,
+        factored.kept,
+        factored.flat_length,
+        factored.length,
+        100 * (1 - factored.length / factored.flat_length),
+    )
+    return Pattern(factored.pattern)
+
+
 def _or_patterns(patterns: list[Pattern]) -> Pattern | None:
     match len(patterns):
         case 0:
@@ -67,25 +105,120 @@ def _or_patterns(patterns: list[Pattern]) -> Pattern | None:
             return Pattern("|".join(f"(?:{p})" for p in patterns))
 
 
+class RuleView:
+    """
+    The values the targets derive from a rule, each computed the first time
+    it's used. Get views with rule_view so every target translating the rule
+    shares one. The lists are shared too, so they mustn't be modified.
+    """
+
+    def __init__(self, rule: Rule):
+        # The registry in rule_view holds the views, so a strong reference
+        # here would keep every rule alive
+        self._rule = weakref.ref(rule)
+        self._string_patterns: dict[tuple[str, ...], Pattern | None] = {}
+
+    @property
+    def rule(self) -> Rule:
+        rule = self._rule()
+        assert rule is not None, "the view outlived its rule"
+        return rule
+
+    @cached_property
+    def match_pattern(self) -> Pattern:
+        rule = self.rule
+        prefix = _pattern_str(rule.target.prefix_pattern, noncapture_group=True)
+        suffix = _pattern_str(rule.target.suffix_pattern, noncapture_group=True)
+        target = _pattern_str(rule.target.pattern, capture_group=bool(prefix or suffix))
+        return Pattern(f"{prefix}{target}{suffix}")
+
+    @cached_property
+    def required_filters(self) -> list[RequireFilter]:
+        return [f for f in (self.rule.filters or []) if f.kind == FilterKind.REQUIRE]
+
+    @cached_property
+    def excluded_filters(self) -> list[ExcludeFilter]:
+        return [f for f in (self.rule.filters or []) if f.kind == FilterKind.EXCLUDE]
+
+    @cached_property
+    def min_entropy(self) -> float | None:
+        if not self.required_filters:
+            return None
+
+        entropy = 0.0
+        for f in self.required_filters:
+            if f.target_min_entropy and f.target_min_entropy > entropy:
+                entropy = f.target_min_entropy
+
+        return entropy or None
+
+    @cached_property
+    def keywords(self) -> list[str] | None:
+        """
+        The strings at least one of which has to occur for the rule to match,
+        from the context and target strings of its require filters
+        """
+        if not self.required_filters:
+            return None
+
+        keywords = []
+        for f in self.required_filters:
+            if f.context_strings:
+                keywords.extend(f.context_strings)
+
+            if f.target_strings:
+                keywords.extend(f.target_strings)
+
+        return keywords or None
+
+    def strings_pattern(self, strings: None | list[str]) -> Pattern | None:
+        """
+        _strings_to_pattern for one of the rule's string lists
+        """
+        if not strings:
+            return None
+
+        key = tuple(strings)
+        try:
+            return self._string_patterns[key]
+        except KeyError:
+            pattern = self._string_patterns[key] = _strings_to_pattern(strings)
+            return pattern
+
+
+# Views by the id of their rule, removed when the rule is garbage collected
+# (rules aren't hashable so they can't be weak keys)
+_views: dict[int, RuleView] = {}
+
+
+def rule_view(rule: Rule) -> RuleView:
+    key = id(rule)
+    view = _views.get(key)
+    if view is None:
+        view = _views[key] = RuleView(rule)
+        weakref.finalize(rule, _views.pop, key, None)
+
+    return view
+
+
+def _match_pattern(rule: Rule) -> Pattern:
+    return rule_view(rule).match_pattern
+
+
 def _required_filters(rule: Rule) -> list[RequireFilter]:
-    return [f for f in (rule.filters or []) if f.kind == FilterKind.REQUIRE]
+    return rule_view(rule).required_filters
 
 
 def _excluded_filters(rule: Rule) -> list[ExcludeFilter]:
-    return [f for f in (rule.filters or []) if f.kind == FilterKind.EXCLUDE]
+    return rule_view(rule).excluded_filters
 
 
 def _min_entropy(rule: Rule) -> float | None:
-    req_filters = _required_filters(rule)
-    if not req_filters:
-        return None
+    return rule_view(rule).min_entropy
 
-    entropy = 0.0
-    for f in req_filters:
-        if f.target_min_entropy and f.target_min_entropy > entropy:
-            entropy = f.target_min_entropy
 
-    return entropy or None
+def _keywords(rule: Rule) -> list[str] | None:
+    return rule_view(rule).keywords
 
 
 def _yaml_str_presenter(dumper, data):
@@ -106,9 +239,42 @@ class _YamlDumper(yaml.Dumper):
         return super(_YamlDumper, self).increase_indent(flow, False)
 
 
-def _dump_yaml(model: BaseModel) -> str:
+if yaml.__with_libyaml__:
+
+    class _CYamlDumper(yaml.CDumper):
+        # libyaml's emitter can't be told to indent sequences in mappings so
+        # that's done by _pyyaml_layout afterwards
+        pass
+
+    _CYamlDumper.add_representer(str, _yaml_str_presenter)
+
+# libyaml's best width is a C int
+_LIBYAML_MAX_WIDTH = 2**31 - 1
+
+# Flow scalars (keys and values) only span lines when they have line breaks
+# other than \n, which the str presenter doesn't put in a block, and keys only
+# become complex keys when they're long, or empty in PyYAML (libyaml writes '')
+_YAML_LINE_BREAKS = re.compile("[\r\x85\u2028\u2029]")
+_YAML_MAX_KEY_LENGTH = 64
+
+_YAML_SEQUENCE_ITEMS = re.compile(r"(?:- )*")
+_YAML_BLOCK_SCALAR = re.compile(r"(?:^|: )\|[1-9]?[-+]?$")
+
+
+def _dump_data(value: BaseModel | Any) -> Any:
+    """
+    Convert a model (or plain data containing models) to the json compatible
+    data that gets serialized
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+
+    return to_jsonable_python(value, exclude_none=True)
+
+
+def _dump_yaml_python(data: Any) -> str:
     return yaml.dump(
-        model.model_dump(mode="json", exclude_none=True),
+        data,
         Dumper=_YamlDumper,
         sort_keys=False,
         default_flow_style=False,
@@ -116,12 +282,272 @@ def _dump_yaml(model: BaseModel) -> str:
     )
 
 
-def _dump_toml(model: BaseModel) -> str:
-    return tomlkit.dumps(model.model_dump(mode="json", exclude_none=True))
+def _yaml_lines_are_nodes(data: Any) -> bool:
+    """
+    Whether every line libyaml emits for the data will be a node or a line of
+    a block scalar, which _pyyaml_layout relies on
+    """
+    if isinstance(data, str):
+        return not _YAML_LINE_BREAKS.search(data)
+    elif isinstance(data, list):
+        return all(map(_yaml_lines_are_nodes, data))
+    elif isinstance(data, dict):
+        return all(
+            isinstance(key, str)
+            and 0 < len(key) < _YAML_MAX_KEY_LENGTH
+            and "\n" not in key
+            and _yaml_lines_are_nodes(key)
+            and _yaml_lines_are_nodes(value)
+            for key, value in data.items()
+        )
+
+    return True
+
+
+def _pyyaml_layout(text: str) -> str:
+    """
+    Lay out libyaml's output like _YamlDumper's: block sequences are indented
+    under the mapping key they're the value of, and the document is only ended
+    explicitly (with ...) when its last node is a block scalar that keeps its
+    trailing line breaks. libyaml ends it after any such scalar.
+    """
+    if text.endswith("\n...\n"):
+        text = text.removesuffix("...\n")
+
+    lines = []
+    # The columns (in the input) of the sequences being indented
+    sequences: list[int] = []
+    # The column of the node the block scalar being copied belongs to
+    scalar_column = None
+    # The column of the last line's key if it has no value on the line
+    key_column = None
+    # Whether the last node is a block scalar keeping its line breaks
+    keeps_breaks = False
+
+    for line in text.splitlines(keepends=True):
+        stripped = line.lstrip(" ")
+        indent = len(line) - len(stripped)
+        if stripped == "\n":
+            # Only block scalars have empty lines, and they're left empty
+            lines.append(line)
+            continue
+
+        if scalar_column is not None and indent > scalar_column:
+            lines.append(" " * 2 * len(sequences) + line)
+            continue
+
+        scalar_column = None
+        is_item = stripped.startswith("- ")
+        while sequences and (
+            sequences[-1] > indent or (sequences[-1] == indent and not is_item)
+        ):
+            sequences.pop()
+
+        if is_item and key_column == indent:
+            sequences.append(indent)
+
+        lines.append(" " * 2 * len(sequences) + line)
+
+        items = _YAML_SEQUENCE_ITEMS.match(stripped).end()
+        column = indent + items
+        node = stripped[items:].rstrip("\n")
+        key_column = column if node.endswith(":") else None
+        keeps_breaks = False
+        if block_scalar := _YAML_BLOCK_SCALAR.search(node):
+            scalar_column = column if not node.startswith("|") else column - 2
+            keeps_breaks = block_scalar[0].endswith("+")
+
+    if keeps_breaks:
+        lines.append("...\n")
+
+    return "".join(lines)
+
+
+def _dump_yaml_libyaml(data: Any) -> str:
+    if not _yaml_lines_are_nodes(data):
+        return _dump_yaml_python(data)
+
+    text = yaml.dump(
+        data,
+        Dumper=_CYamlDumper,
+        sort_keys=False,
+        default_flow_style=False,
+        width=_LIBYAML_MAX_WIDTH,
+    )
+    return _pyyaml_layout(text)
+
+
+# Exercises the nesting, block scalars and quoting in the translated rules
+_YAML_PROBE = {
+    "rules": [
+        {
+            "id": "probe",
+            "pattern": "(?:\\A|\\W)([a-z]{8}): 'x'",
+            "tags": ["a", "b: c", "- d"],
+            "description": "one\n\n  two\nthree",
+            "nested": [[1, 2.5], {"x": [{"y": None, "z": True}]}, []],
+            "empty": {},
+        },
+        {"id": "- probe", "keep": "trailing\n\n"},
+    ],
+}
+
+
+@cache
+def _yaml_backend():
+    """
+    libyaml when it's available and gives the same output, else pure Python
+    """
+    if yaml.__with_libyaml__:
+        if _dump_yaml_libyaml(_YAML_PROBE) == _dump_yaml_python(_YAML_PROBE):
+            return _dump_yaml_libyaml
+
+        logger.debug("libyaml output differs, dumping YAML with pure Python")
+
+    return _dump_yaml_python
+
+
+def _dump_yaml(model: BaseModel | dict[str, Any]) -> str:
+    return _yaml_backend()(_dump_data(model))
+
+
+class _NotFlatToml(ValueError):
+    pass
+
+
+_TOML_BARE_KEY = re.compile(r"[A-Za-z0-9_-]+")
+
+# The escapes tomlkit uses in basic strings
+_TOML_ESCAPES = {c: f"\\u{c:04x}" for c in [*range(0x20), 0x7F]} | {
+    ord(c): f"\\{e}" for c, e in zip('\b\t\n\f\r\x1b"\\', 'btnfre"\\')
+}
+
+
+def _toml_key(key: str) -> str:
+    return key if _TOML_BARE_KEY.fullmatch(key) else _toml_value(key)
+
+
+def _toml_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, (int, float)):
+        return str(value)
+    elif isinstance(value, str):
+        return f'"{value.translate(_TOML_ESCAPES)}"'
+    elif isinstance(value, list) and not any(
+        isinstance(item, (list, dict)) for item in value
+    ):
+        return f"[{', '.join(map(_toml_value, value))}]"
+
+    raise _NotFlatToml(f"unsupported TOML value: {value!r}")
+
+
+def _is_toml_tables(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(item, dict) for item in value)
+    )
+
+
+def _write_toml_table(lines: list[str], name: str, table: dict[str, Any]) -> None:
+    tables = []
+    for key, value in table.items():
+        if _is_toml_tables(value):
+            tables.append((key, value))
+        elif tables:
+            raise _NotFlatToml(f"{key!r} comes after a table")
+        else:
+            lines.append(f"{_toml_key(key)} = {_toml_value(value)}\n")
+
+    for key, items in tables:
+        table_name = f"{name}.{_toml_key(key)}" if name else _toml_key(key)
+        for item in items:
+            # Tables are separated by a blank line, except an empty table from
+            # the next one in its array or its first child table
+            header = f"[[{table_name}]]\n"
+            if lines and lines[-1] not in (header, f"[[{name}]]\n"):
+                lines.append("\n")
 
+            lines.append(header)
+            _write_toml_table(lines, table_name, item)
 
-def _dump_json(model: BaseModel) -> str:
+
+def _dump_flat_toml(data: dict[str, Any]) -> str:
+    """
+    Format TOML the way tomlkit does for data that's only scalars, arrays of
+    scalars and arrays of tables like the gitleaks config, without building a
+    tomlkit document. Raises _NotFlatToml for anything else.
+    """
+    lines: list[str] = []
+    _write_toml_table(lines, "", data)
+    return "".join(lines)
+
+
+def _dump_toml(model: BaseModel | dict[str, Any]) -> str:
+    data = _dump_data(model)
+    try:
+        return _dump_flat_toml(data)
+    except _NotFlatToml:
+        pass
+
+    # Only gitleaks output is TOML and it's flat, so tomlkit is only needed
+    # (and imported) for anything else
+    import tomlkit
+
+    return tomlkit.dumps(data)
+
+
+def _dump_json(model: BaseModel | dict[str, Any]) -> str:
     return json.dumps(
-        model.model_dump(mode="json", exclude_none=True),
+        _dump_data(model),
         indent=2,
     )
+
+
+def _write_yaml(out: TextIO, key: str, fragments: Iterable[Any]) -> None:
+    """
+    Write the same YAML as _dump_yaml({key: list(fragments)}) a fragment at a
+    time. Each fragment is dumped as a one item document and the key line is
+    dropped from all but the first.
+    """
+    header = f"{key}:\n"
+    empty = True
+    for fragment in fragments:
+        item = _dump_yaml({key: [fragment]})
+        out.write(item if empty else item.removeprefix(header))
+        empty = False
+
+    if empty:
+        out.write(_dump_yaml({key: []}))
+
+
+def _write_toml(out: TextIO, key: str, fragments: Iterable[Any]) -> None:
+    """
+    Write the same TOML as _dump_toml({key: list(fragments)}) a fragment at a
+    time. Each fragment is its own array of tables entry.
+    """
+    empty = True
+    for fragment in fragments:
+        if not empty:
+            out.write("\n")
+
+        out.write(_dump_toml({key: [fragment]}))
+        empty = False
+
+    if empty:
+        out.write(_dump_toml({key: []}))
+
+
+def _write_json(out: TextIO, key: str, fragments: Iterable[Any]) -> None:
+    """
+    Write the same JSON as _dump_json({key: list(fragments)}) a fragment at a
+    time
+    """
+    empty = True
+    for fragment in fragments:
+        out.write(f"{{\n  {json.dumps(key)}: [\n" if empty else ",\n")
+        out.write(textwrap.indent(_dump_json(fragment), "    "))
+        empty = False
+
+    out.write(_dump_json({key: []}) if empty else "\n  ]\n}")
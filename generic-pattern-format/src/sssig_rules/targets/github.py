@@ -3,14 +3,18 @@ import logging
 
 from enum import StrEnum
 from typing import Any
+from typing import Iterable
+from typing import TextIO
 
 from pydantic import BaseModel
 
 from sssig_rules.schema import FilterKind
 from sssig_rules.schema import Rule
+from sssig_rules.targets.common import _dump_data
 from sssig_rules.targets.common import _dump_json
 from sssig_rules.targets.common import _or_patterns
-from sssig_rules.targets.common import _strings_to_pattern
+from sssig_rules.targets.common import _write_json
+from sssig_rules.targets.common import rule_view
 
 logger = logging.getLogger(__name__)
 
@@ -31,9 +35,10 @@ def _pattern(rule: Rule) -> dict[str, Any]:
         "after_secret": rule.target.suffix_pattern,
     }
 
+    view = rule_view(rule)
     for i, f in enumerate(rule.filters or []):
         post_proc_patterns = []
-        str_pattern = _strings_to_pattern(f.target_strings)
+        str_pattern = view.strings_pattern(f.target_strings)
         if str_pattern:
             post_proc_patterns.append(str_pattern)
 
@@ -60,5 +65,27 @@ def _config(rules: list[Rule]) -> _Config:
     return _Config(patterns=list(map(_pattern, rules)))
 
 
+def _fragment(rule: Rule) -> dict[str, Any]:
+    """
+    The serializable data for a single translated rule
+    """
+    return _dump_data(_pattern(rule))
+
+
+def _document(fragments: list[dict[str, Any]]) -> str:
+    """
+    Serialize the translated rules built by _fragment
+    """
+    return _dump_json({"patterns": fragments})
+
+
 def translate(rules: list[Rule]) -> str:
     return _dump_json(_config(rules))
+
+
+def write(rules: Iterable[Rule], out: TextIO) -> None:
+    """
+    Write the same output as translate() a rule at a time, so rules can be
+    streamed through without holding them all
+    """
+    _write_json(out, "patterns", map(_fragment, rules))
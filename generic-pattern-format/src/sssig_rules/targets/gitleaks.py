@@ -2,6 +2,9 @@ import enum
 import logging
 
 from enum import StrEnum
+from typing import Any
+from typing import Iterable
+from typing import TextIO
 
 from pydantic import BaseModel
 
@@ -12,13 +15,12 @@ from sssig_rules.schema import OptionalPositiveInt
 from sssig_rules.schema import Pattern
 from sssig_rules.schema import Rule
 
+from .common import _dump_data
 from .common import _dump_toml
-from .common import _excluded_filters
-from .common import _match_pattern
-from .common import _min_entropy as _entropy
+from .common import RuleView
 from .common import _or_patterns
-from .common import _required_filters
-from .common import _strings_to_pattern
+from .common import _write_toml
+from .common import rule_view
 
 logger = logging.getLogger(__name__)
 
@@ -65,33 +67,21 @@ class _Config(BaseModel):
     rules: list[_Rule]
 
 
-def _keywords(rule: Rule) -> list[str] | None:
-    req_filters = _required_filters(rule)
-    if not req_filters:
-        return None
-
-    keywords = []
-    for f in req_filters:
-        if f.context_strings:
-            keywords.extend(f.context_strings)
-
-        if f.target_strings:
-            keywords.extend(f.target_strings)
-
-    return keywords or None
+def _regex(rule: Rule) -> Pattern:
+    return rule_view(rule).match_pattern
 
 
-def _regex(rule: Rule) -> Pattern:
-    return _match_pattern(rule)
+def _entropy(rule: Rule) -> float | None:
+    return rule_view(rule).min_entropy
 
 
-def _path_patterns(f: Filter) -> list[Pattern] | None:
+def _path_patterns(view: RuleView, f: Filter) -> list[Pattern] | None:
     patterns = []
 
     if f.path_patterns:
         patterns.extend(f.path_patterns)
 
-    strings_pattern = _strings_to_pattern(f.path_strings)
+    strings_pattern = view.strings_pattern(f.path_strings)
     if strings_pattern is not None:
         patterns.append(strings_pattern)
 
@@ -99,9 +89,10 @@ def _path_patterns(f: Filter) -> list[Pattern] | None:
 
 
 def _path(rule: Rule) -> Pattern | None:
+    view = rule_view(rule)
     pattern_lists: list[list[Pattern]] = []
-    for f in _required_filters(rule):
-        patterns = _path_patterns(f)
+    for f in view.required_filters:
+        patterns = _path_patterns(view, f)
         if patterns is not None:
             pattern_lists.append(patterns)
     return _or_patterns([p for ps in pattern_lists for p in ps])
@@ -153,6 +144,7 @@ def _allowlist_regexes(
     # Gitleaks can't handle multiple allowlist pattern scopes AND'd together
     # so this tries to do the best it can to set the target correctly when
     # there are multiple scopes in the same rule
+    view = rule_view(rule)
     patterns: list[Pattern] = []
     regex_target: _RegexTarget | None = None
 
@@ -162,7 +154,7 @@ def _allowlist_regexes(
         if f.context_patterns:
             patterns.extend(f.context_patterns)
 
-        strings_pattern = _strings_to_pattern(f.context_strings)
+        strings_pattern = view.strings_pattern(f.context_strings)
         if strings_pattern is not None:
             patterns.append(strings_pattern)
 
@@ -177,7 +169,7 @@ def _allowlist_regexes(
         if f.match_patterns:
             patterns.extend(f.match_patterns)
 
-        strings_pattern = _strings_to_pattern(f.match_strings)
+        strings_pattern = view.strings_pattern(f.match_strings)
         if strings_pattern is not None:
             patterns.append(strings_pattern)
 
@@ -199,7 +191,8 @@ def _allowlist_regexes(
 
 
 def _allowlists(rule: Rule) -> list[_Allowlist] | None:
-    exc_filters = _excluded_filters(rule)
+    view = rule_view(rule)
+    exc_filters = view.excluded_filters
     if not exc_filters:
         return None
 
@@ -210,7 +203,7 @@ def _allowlists(rule: Rule) -> list[_Allowlist] | None:
             _Allowlist(
                 condition=_AllowlistCondition.AND,
                 stopwords=f.target_strings,
-                paths=_path_patterns(f),
+                paths=_path_patterns(view, f),
                 regexes=patterns,
                 regexTarget=regex_target,
             )
@@ -232,7 +225,7 @@ def _rule(rule: Rule) -> _Rule:
         path=_path(rule),
         regex=_regex(rule),
         entropy=_entropy(rule),
-        keywords=_keywords(rule),
+        keywords=rule_view(rule).keywords,
         tags=_tags(rule),
         required=_required(rule),
         allowlists=_allowlists(rule),
@@ -244,5 +237,27 @@ def _config(rules: list[Rule]) -> _Config:
     return _Config(rules=list(map(_rule, rules)))
 
 
+def _fragment(rule: Rule) -> dict[str, Any]:
+    """
+    The serializable data for a single translated rule
+    """
+    return _dump_data(_rule(rule))
+
+
+def _document(fragments: list[dict[str, Any]]) -> str:
+    """
+    Serialize the translated rules built by _fragment
+    """
+    return _dump_toml({"rules": fragments})
+
+
 def translate(rules: list[Rule]) -> str:
     return _dump_toml(_config(rules))
+
+
+def write(rules: Iterable[Rule], out: TextIO) -> None:
+    """
+    Write the same output as translate() a rule at a time, so rules can be
+    streamed through without holding them all
+    """
+    _write_toml(out, "rules", map(_fragment, rules))
@@ -1,8 +1,11 @@
 import logging
 
 from enum import StrEnum
+from typing import Any
+from typing import Iterable
 from typing import Literal
 from typing import Annotated
+from typing import TextIO
 from typing import Union
 from typing import overload
 
@@ -11,6 +14,7 @@ from pydantic import BaseModel
 from pydantic import Field
 from pydantic import HttpUrl
 
+from sssig_rules.conditions import CompiledCondition
 from sssig_rules.schema import Analyzer
 from sssig_rules.schema import AnalyzerKind
 from sssig_rules.schema import Confidence
@@ -19,12 +23,12 @@ from sssig_rules.schema import Rule
 from sssig_rules.schema import Syntax
 from sssig_rules.template import map_vars
 
+from .common import _dump_data
 from .common import _dump_yaml
-from .common import _match_pattern
-from .common import _min_entropy
+from .common import _write_yaml
+from .common import rule_view
 
 logger = logging.getLogger(__name__)
-valid_http_statuses = set(range(100, 600))
 varmap = {
     "target": "TOKEN",
 }
@@ -153,36 +157,22 @@ def _response_is_html(analyzer: Analyzer) -> bool | None:
     return None
 
 
-def _resolve_status(statuses: list[list[int]]) -> tuple[bool, list[int]]:
-    """
-    Look at the statuses that would be passed in from the inclusive ranges
-    and then expand those to a flat list of statuses.
-
-    From that list determine if it would be fewer statuses to negate or not
-    """
-    expanded = {status for start, end in statuses for status in range(start, end + 1)}
-
-    negated = valid_http_statuses - expanded
-    if len(expanded) > len(negated):
-        return True, list(negated)
-
-    return False, list(expanded)
-
-
 def _response_matcher(analyzer: Analyzer) -> list[_ResponseMatcher]:
     matchers: list[_ResponseMatcher] = []
 
-    for matcher in analyzer.condition:
+    condition = CompiledCondition(analyzer.condition)
+    for matcher, compiled in zip(analyzer.condition, condition.matchers):
         if matcher.body_syntax == Syntax.JSON:
             matchers.append(_JsonValidMatcher())
         elif matcher.body_syntax == Syntax.XML:
             matchers.append(_XmlValidMatcher())
 
-        if matcher.statuses:
-            negative, status = _resolve_status(matcher.statuses)
+        if compiled.statuses:
+            # Whichever of the statuses or the statuses to negate is shorter
+            negative, statuses = compiled.statuses.smallest_form()
             matchers.append(
                 _StatusMatcher(
-                    status=status,
+                    status=list(statuses),
                     negative=negative,
                 )
             )
@@ -269,11 +259,12 @@ def _rule(rule: Rule) -> _Rule:
             rule.id,
         )
 
+    view = rule_view(rule)
     return _Rule(
         name=rule.meta.name,
         id=rule.id,
-        pattern=_match_pattern(rule),
-        min_entropy=_min_entropy(rule),
+        pattern=view.match_pattern,
+        min_entropy=view.min_entropy,
         confidence=rule.meta.confidence,
         examples=_examples(rule),
         references=rule.meta.references,
@@ -287,5 +278,27 @@ def _config(rules: list[Rule]) -> _Config:
     return _Config(rules=list(map(_rule, rules)))
 
 
+def _fragment(rule: Rule) -> dict[str, Any]:
+    """
+    The serializable data for a single translated rule
+    """
+    return _dump_data(_rule(rule))
+
+
+def _document(fragments: list[dict[str, Any]]) -> str:
+    """
+    Serialize the translated rules built by _fragment
+    """
+    return _dump_yaml({"rules": fragments})
+
+
 def translate(rules: list[Rule]) -> str:
     return _dump_yaml(_config(rules))
+
+
+def write(rules: Iterable[Rule], out: TextIO) -> None:
+    """
+    Write the same output as translate() a rule at a time, so rules can be
+    streamed through without holding them all
+    """
+    _write_yaml(out, "rules", map(_fragment, rules))
@@ -1,5 +1,9 @@
 import logging
 
+from typing import Any
+from typing import Iterable
+from typing import TextIO
+
 
 from pydantic import BaseModel
 from pydantic import HttpUrl
@@ -7,8 +11,10 @@ from pydantic import HttpUrl
 from sssig_rules.schema import Rule
 from sssig_rules.schema import Pattern
 
+from .common import _dump_data
 from .common import _dump_yaml
-from .common import _match_pattern
+from .common import _write_yaml
+from .common import rule_view
 
 logger = logging.getLogger(__name__)
 
@@ -60,7 +66,7 @@ def _rule(rule: Rule) -> _Rule:
     return _Rule(
         name=rule.meta.name,
         id=rule.id,
-        pattern=_match_pattern(rule),
+        pattern=rule_view(rule).match_pattern,
         examples=_examples(rule),
         negative_examples=_negative_examples(rule),
         categories=rule.meta.tags,
@@ -77,5 +83,27 @@ def _config(rules: list[Rule]) -> _Config:
     return _Config(rules=list(map(_rule, rules)))
 
 
+def _fragment(rule: Rule) -> dict[str, Any]:
+    """
+    The serializable data for a single translated rule
+    """
+    return _dump_data(_rule(rule))
+
+
+def _document(fragments: list[dict[str, Any]]) -> str:
+    """
+    Serialize the translated rules built by _fragment
+    """
+    return _dump_yaml({"rules": fragments})
+
+
 def translate(rules: list[Rule]) -> str:
     return _dump_yaml(_config(rules))
+
+
+def write(rules: Iterable[Rule], out: TextIO) -> None:
+    """
+    Write the same output as translate() a rule at a time, so rules can be
+    streamed through without holding them all
+    """
+    _write_yaml(out, "rules", map(_fragment, rules))
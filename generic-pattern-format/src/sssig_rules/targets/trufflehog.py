@@ -1,5 +1,9 @@
 import logging
 
+from typing import Any
+from typing import Iterable
+from typing import TextIO
+
 from pydantic import BaseModel
 from pydantic import HttpUrl
 
@@ -7,12 +11,10 @@ from sssig_rules.schema import AnalyzerKind
 from sssig_rules.schema import Pattern
 from sssig_rules.schema import Rule
 
+from .common import _dump_data
 from .common import _dump_yaml
-from .common import _excluded_filters
-from .common import _match_pattern
-from .common import _min_entropy
-from .common import _required_filters
-from .common import _strings_to_pattern
+from .common import _write_yaml
+from .common import rule_view
 
 logger = logging.getLogger(__name__)
 
@@ -37,24 +39,8 @@ class _Config(BaseModel):
     detectors: list[_Detector]
 
 
-def _keywords(rule: Rule) -> list[str] | None:
-    req_filters = _required_filters(rule)
-    if not req_filters:
-        return None
-
-    keywords = []
-    for f in req_filters:
-        if f.context_strings:
-            keywords.extend(f.context_strings)
-
-        if f.target_strings:
-            keywords.extend(f.target_strings)
-
-    return keywords or None
-
-
 def _exclude_words(rule: Rule) -> list[str] | None:
-    exc_filters = _excluded_filters(rule)
+    exc_filters = rule_view(rule).excluded_filters
     if not exc_filters:
         return None
 
@@ -64,7 +50,8 @@ def _exclude_words(rule: Rule) -> list[str] | None:
 
 
 def _exclude_regexes_match(rule: Rule) -> list[Pattern] | None:
-    exc_filters = _excluded_filters(rule)
+    view = rule_view(rule)
+    exc_filters = view.excluded_filters
     if not exc_filters:
         return None
 
@@ -73,7 +60,7 @@ def _exclude_regexes_match(rule: Rule) -> list[Pattern] | None:
         if f.match_patterns:
             patterns.extend(f.match_patterns)
         if f.match_strings:
-            string_pattern = _strings_to_pattern(f.match_strings)
+            string_pattern = view.strings_pattern(f.match_strings)
             if string_pattern:
                 patterns.append(string_pattern)
 
@@ -109,11 +96,12 @@ def _verify(rule: Rule) -> list[_Verify] | None:
 
 
 def _detector(rule: Rule) -> _Detector:
+    view = rule_view(rule)
     return _Detector(
         name=rule.id,
-        keywords=_keywords(rule),
-        regex={"target": _match_pattern(rule)},
-        entropy=_min_entropy(rule),
+        keywords=view.keywords,
+        regex={"target": view.match_pattern},
+        entropy=view.min_entropy,
         exclude_words=_exclude_words(rule),
         exclude_regexes_match=_exclude_regexes_match(rule),
         verify=_verify(rule),
@@ -124,8 +112,30 @@ def _config(rules: list[Rule]) -> _Config:
     return _Config(detectors=[_detector(rule) for rule in rules])
 
 
+def _fragment(rule: Rule) -> dict[str, Any]:
+    """
+    The serializable data for a single translated rule
+    """
+    return _dump_data(_detector(rule))
+
+
+def _document(fragments: list[dict[str, Any]]) -> str:
+    """
+    Serialize the translated rules built by _fragment
+    """
+    return _dump_yaml({"detectors": fragments})
+
+
 def translate(rules: list[Rule]) -> str:
     """
     Translate a list of generic rules to a TruffleHog configuration.
     """
     return _dump_yaml(_config(rules))
+
+
+def write(rules: Iterable[Rule], out: TextIO) -> None:
+    """
+    Write the same output as translate() a rule at a time, so rules can be
+    streamed through without holding them all
+    """
+    _write_yaml(out, "detectors", map(_fragment, rules))
@@ -2,9 +2,49 @@
 A module for parsing and serializing liquid templates.
 """
 
-import liquid  # type: ignore
+from functools import cache
+from functools import lru_cache
 
-from liquid.builtin.expressions.path import Path  # type: ignore
+# Many rules share templates (e.g. "Bearer {{ target }}" headers), so parsed
+# templates and their remapped results are cached
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _var_tokens(tmpl: str) -> tuple[tuple[int, str], ...]:
+    """
+    The start index and name of each variable referenced in the template, in
+    template order
+    """
+    # liquid is slow to import and only some targets map vars
+    import liquid  # type: ignore
+
+    from liquid.builtin.expressions.path import Path  # type: ignore
+
+    return tuple(
+        (t.start_index, t.value)
+        for node in liquid.parse(tmpl).nodes
+        for expr in node.expressions()
+        for child in expr.children()
+        if isinstance(child, Path) and (t := child.token) and t.kind == "word"
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _map_vars(tmpl: str, varmap: tuple[tuple[str, str], ...]) -> str:
+    replacements = dict(varmap)
+    parts = []
+    start = 0
+    for end, val in _var_tokens(tmpl):
+        if val not in replacements:
+            continue
+
+        parts.append(tmpl[start:end])
+        parts.append(replacements[val])
+        start = end + len(val)
+
+    parts.append(tmpl[start:])
+    return "".join(parts)
 
 
 def map_vars(tmpl: str, varmap: dict[str, str]) -> str:
@@ -14,26 +54,25 @@ def map_vars(tmpl: str, varmap: dict[str, str]) -> str:
     thing for different targets. This allows you to update those variables
     references.
     """
-    tokens_to_replace = [
-        (t.start_index, t.value)
-        for node in liquid.parse(tmpl).nodes
-        for expr in node.expressions()
-        for child in expr.children()
-        if (
-            isinstance(child, Path)
-            and (t := child.token)
-            and t.kind == "word"
-            and t.value in varmap
-        )
-    ]
-
-    def replace(parts: list[str], start: int, tkns: list[tuple[int, str]]) -> str:
-        if not len(tkns):
-            return "".join(parts + [tmpl[start:]])
-
-        end, val = tkns[0]
-        between = tmpl[start:end]
-        replaced = varmap[val]
-        return replace(parts + [between, replaced], end + len(val), tkns[1:])
-
-    return replace([], 0, tokens_to_replace)
+    return _map_vars(tmpl, tuple(sorted(varmap.items())))
+
+
+@cache
+def _environment():
+    from liquid import Environment  # type: ignore
+    from liquid import StrictUndefined  # type: ignore
+
+    return Environment(undefined=StrictUndefined)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(tmpl: str):
+    return _environment().from_string(tmpl)
+
+
+def render(tmpl: str, variables: dict[str, str]) -> str:
+    """
+    Render a template, raising liquid's UndefinedError if it references a
+    variable that isn't in variables
+    """
+    return _parse(tmpl).render(**variables)
@@ -0,0 +1,118 @@
+import contextlib
+import io
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+
+import yaml
+
+import main
+
+from sssig_rules import analysis
+from sssig_rules.schema import validate_rules
+
+CHEAP = "ghp_[0-9A-Za-z]{36}"
+NESTED = "(?:[a-z]+_?)+key"
+LARGE_REPEAT = "secret.{0,256}[0-9a-f]{32}"
+NO_LITERAL = "[a-z0-9]{8,}"
+
+
+def rules_data(patterns: list[str]) -> list[dict]:
+    return [
+        {
+            "id": "S3IG" + "A" * 15 + "ABCDEFGH"[i],
+            "meta": {"name": f"rule {i}"},
+            "target": {"pattern": pattern},
+        }
+        for i, pattern in enumerate(patterns)
+    ]
+
+
+def analyze(pattern: str) -> analysis.PatternCost:
+    (rule,) = validate_rules(rules_data([pattern]))
+    return analysis.analyze_pattern(rule)
+
+
+class AnalyzePatternTest(unittest.TestCase):
+    def test_cheap(self) -> None:
+        cost = analyze(CHEAP)
+        self.assertEqual((cost.score, cost.issues), (0, []))
+        self.assertEqual(cost.longest_literal, 4)
+        self.assertEqual((cost.min_width, cost.max_width), (40, 40))
+
+    def test_nested_quantifiers(self) -> None:
+        cost = analyze(NESTED)
+        self.assertIn("1 nested quantifier(s)", cost.issues)
+        self.assertGreaterEqual(cost.score, analysis.NESTED_QUANTIFIER_COST)
+        self.assertIsNone(cost.max_width)
+
+    def test_large_repeat(self) -> None:
+        cost = analyze(LARGE_REPEAT)
+        self.assertEqual(cost.issues, ["bounded repeat of up to 256"])
+        self.assertEqual(cost.score, round(analysis.LARGE_REPEAT_COST * 256, 2))
+
+    def test_no_literal(self) -> None:
+        cost = analyze(NO_LITERAL)
+        self.assertIn("no literal of at least 3 characters", cost.issues)
+        self.assertIn("1 unbounded repeat(s)", cost.issues)
+
+    def test_anchored(self) -> None:
+        self.assertTrue(analyze(r"\A(?:" + CHEAP + ")").anchored)
+        self.assertFalse(analyze(CHEAP).anchored)
+
+    def test_report_is_sorted(self) -> None:
+        rules = validate_rules(rules_data([CHEAP, NESTED, LARGE_REPEAT]))
+        report = analysis.analyze_rules(rules)
+        scores = [result.score for result in report.results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(report.results[0].pattern, NESTED)
+        self.assertEqual(report.results[-1].pattern, CHEAP)
+        self.assertEqual(
+            [result.pattern for result in report.above(5)],
+            [NESTED, LARGE_REPEAT],
+        )
+
+    def test_unsupported_parser(self) -> None:
+        with mock.patch.object(analysis, "_PARSER_ERROR", "no parser"):
+            cost = analyze(NESTED)
+
+        self.assertEqual(cost.issues[-1], "structure not analyzed: no parser")
+        self.assertIsNone(cost.anchored)
+        self.assertIsNone(cost.longest_literal)
+
+        # The parser's output changed
+        error = AttributeError("'SubPattern' object has no attribute 'data'")
+        with mock.patch.object(analysis, "_Structure", side_effect=error):
+            cost = analyze(NESTED)
+
+        self.assertIn("regex parser isn't supported", cost.issues[-1])
+
+
+class AnalyzeCommandTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.rulespath = Path(tmp.name) / "rules.yaml"
+        self.rulespath.write_text(
+            yaml.safe_dump({"rules": rules_data([CHEAP, NESTED])})
+        )
+
+    def analyze(self, *args: str) -> int:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return main.main(["analyze", "--no-cache", *args, str(self.rulespath)])
+
+    def test_max_score(self) -> None:
+        self.assertEqual(self.analyze(), 0)
+        self.assertEqual(self.analyze("--max-score", "100"), 0)
+        with self.assertLogs(level="ERROR") as logs:
+            self.assertEqual(self.analyze("--max-score", "5"), 1)
+
+        (message,) = logs.output
+        self.assertIn("pattern cost above 5.00", message)
+        self.assertIn(rules_data([CHEAP, NESTED])[1]["id"], message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import main
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules import scanner
+from sssig_rules.bundle import _HEADER
+from sssig_rules.bundle import FORMAT_VERSION
+from sssig_rules.bundle import MAGIC
+from sssig_rules.bundle import BundleError
+from sssig_rules.bundle import load_bundle
+from sssig_rules.bundle import write_bundle
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import validate_rules
+
+RULES_PATH = Path(__file__).parents[1] / "test-rules.yaml"
+
+
+class BundleTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        with RULES_PATH.open("r") as rulesfile:
+            cls.rules = validate_rules(load_rules_data(rulesfile))
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = Path(cls.tmp.name) / "rules.bundle"
+        write_bundle(
+            cls.path,
+            cls.rules,
+            flags=scanner.SCAN_FLAGS,
+            mode=scanner.SCAN_MODE,
+            fallback_flags=scanner.SCAN_FALLBACK_FLAGS,
+        )
+        cls.data = cls.path.read_bytes()
+        _, _, metadata_size, _ = _HEADER.unpack_from(cls.data)
+        cls.metadata_end = _HEADER.size + metadata_size
+        cls.metadata = json.loads(cls.data[_HEADER.size : cls.metadata_end])
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp.cleanup()
+
+    def write(self, data: bytes) -> Path:
+        path = Path(self.tmp.name) / f"{self.id()}.bundle"
+        path.write_bytes(data)
+        return path
+
+    def with_metadata(self, metadata) -> Path:
+        """
+        The bundle with its metadata replaced
+        """
+        encoded = json.dumps(metadata).encode()
+        database = self.data[self.metadata_end :]
+        return self.write(
+            _HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded), len(database))
+            + encoded
+            + database
+        )
+
+    def test_round_trip(self) -> None:
+        bundle = load_bundle(self.path)
+        self.assertEqual(bundle.mode, scanner.SCAN_MODE)
+        self.assertEqual(bundle.hyperscan, hscheck.version())
+        self.assertEqual([r.id for r in bundle.rules], [r.id for r in self.rules])
+
+    def test_truncated(self) -> None:
+        for size in [0, 4, _HEADER.size, self.metadata_end, len(self.data) - 1]:
+            with self.subTest(size=size):
+                with self.assertRaises(BundleError):
+                    load_bundle(self.write(self.data[:size]))
+
+    def test_corrupt(self) -> None:
+        corrupt = [
+            b"NOTABUNDLE" + self.data[10:],
+            _HEADER.pack(MAGIC, FORMAT_VERSION + 1, 0, 0),
+            # The metadata isn't JSON
+            self.data[: _HEADER.size] + b"[" + self.data[_HEADER.size + 1 :],
+            # The database is garbage
+            self.data[: self.metadata_end] + bytes(len(self.data) - self.metadata_end),
+        ]
+        for data in corrupt:
+            with self.subTest(data=data[:32]):
+                with self.assertRaises(BundleError):
+                    load_bundle(self.write(data))
+
+    def test_missing_keys(self) -> None:
+        for key in ["hyperscan", "mode", "columns", "rules"]:
+            with self.subTest(key=key):
+                metadata = {k: v for k, v in self.metadata.items() if k != key}
+                with self.assertRaises(BundleError):
+                    load_bundle(self.with_metadata(metadata))
+
+    def test_bad_metadata(self) -> None:
+        bad = [
+            [],
+            {**self.metadata, "columns": ["id"]},
+            {**self.metadata, "mode": "stream"},
+            {**self.metadata, "rules": 1},
+            # Rows of the wrong length
+            {**self.metadata, "rules": [row[:-1] for row in self.metadata["rules"]]},
+            {**self.metadata, "rules": [row + [0] for row in self.metadata["rules"]]},
+        ]
+        for metadata in bad:
+            with self.subTest(metadata=str(metadata)[:80]):
+                with self.assertRaises(BundleError):
+                    load_bundle(self.with_metadata(metadata))
+
+    def test_scan_reports_unusable_bundles(self) -> None:
+        block = Path(self.tmp.name) / "block.bundle"
+        write_bundle(block, self.rules)
+        missing_keys = self.with_metadata(
+            {k: v for k, v in self.metadata.items() if k != "rules"}
+        )
+        for path in [block, missing_keys, Path(self.tmp.name) / "missing.bundle"]:
+            with self.subTest(path=path.name):
+                with self.assertLogs(level="ERROR"):
+                    status = main.main(
+                        ["scan", "--no-cache", "--bundle", str(path)]
+                        + [str(RULES_PATH), str(RULES_PATH)]
+                    )
+
+                self.assertEqual(status, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import sqlite3
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from sssig_rules.cache import BuildCache
+from sssig_rules.cache import ValidationCache
+
+
+class SharedCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "validation.sqlite3"
+
+    def assert_unlocked(self) -> None:
+        # Fails at once rather than waiting if another connection holds the
+        # write lock
+        db = sqlite3.connect(self.path, timeout=0)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.rollback()
+        finally:
+            db.close()
+
+    def test_lookups_and_stores_release_the_lock(self) -> None:
+        first = ValidationCache(self.path)
+        self.addCleanup(first.close)
+
+        first.put_many({"a+": "", "(": "unmatched"})
+        self.assert_unlocked()
+        self.assertEqual(first.get_many(["a+", "(", "b"]), {"a+": "", "(": "unmatched"})
+        self.assert_unlocked()
+
+    def test_two_connections(self) -> None:
+        first = ValidationCache(self.path)
+        self.addCleanup(first.close)
+        second = ValidationCache(self.path)
+        self.addCleanup(second.close)
+
+        first.put_many({"a+": ""})
+        self.assertEqual(first.get_many(["a+"]), {"a+": ""})
+        # The first cache is still open, the second has to be able to write
+        second.put_many({"b+": ""})
+        self.assertEqual(second.get_many(["a+", "b+"]), {"a+": "", "b+": ""})
+        self.assertEqual(first.get_many(["b+"]), {"b+": ""})
+
+    def test_build_caches_for_two_targets(self) -> None:
+        path = Path(self.tmp.name) / "build.sqlite3"
+        gitleaks = BuildCache(b"gitleaks", path)
+        self.addCleanup(gitleaks.close)
+        trufflehog = BuildCache(b"trufflehog", path)
+        self.addCleanup(trufflehog.close)
+
+        self.assertEqual(gitleaks.get_many([b"rule"]), {})
+        self.assertEqual(trufflehog.get_many([b"rule"]), {})
+        trufflehog.put_many({b"rule": {"target": "trufflehog"}})
+        gitleaks.put_many({b"rule": {"target": "gitleaks"}})
+        self.assertEqual(
+            gitleaks.get_many([b"rule"]), {b"rule": {"target": "gitleaks"}}
+        )
+        self.assertEqual(
+            trufflehog.get_many([b"rule"]), {b"rule": {"target": "trufflehog"}}
+        )
+
+    def test_eviction(self) -> None:
+        cache = ValidationCache(self.path, max_entries=2)
+        self.addCleanup(cache.close)
+
+        cache.put_many({"a": ""})
+        cache.put_many({"b": ""})
+        cache.put_many({"c": ""})
+        self.assertEqual(len(cache.get_many(["a", "b", "c"])), 2)
+        self.assert_unlocked()
+
+
+if __name__ == "__main__":
+    unittest.main()
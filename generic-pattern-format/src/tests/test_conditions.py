@@ -0,0 +1,114 @@
+import unittest
+
+from sssig_rules.conditions import MAX_STATUS
+from sssig_rules.conditions import MIN_STATUS
+from sssig_rules.conditions import StatusSet
+
+
+class StatusSetTest(unittest.TestCase):
+    def test_ranges_are_merged(self) -> None:
+        cases = [
+            # Overlapping
+            ([[200, 350], [300, 399]], [(200, 399)]),
+            ([[300, 399], [200, 350]], [(200, 399)]),
+            # Contained
+            ([[200, 400], [250, 300]], [(200, 400)]),
+            # Adjacent
+            ([[200, 299], [300, 399]], [(200, 399)]),
+            ([[200, 299], [300, 300], [301, 399]], [(200, 399)]),
+            # Separate
+            ([[200, 298], [300, 399]], [(200, 298), (300, 399)]),
+            # Single statuses
+            ([[404, 404], [401, 401], [403, 403]], [(401, 401), (403, 404)]),
+            ([], []),
+        ]
+        for ranges, intervals in cases:
+            with self.subTest(ranges=ranges):
+                self.assertEqual(StatusSet(ranges).intervals(), intervals)
+
+    def test_contains(self) -> None:
+        statuses = StatusSet([[200, 299], [401, 401], [500, 599]])
+        for status in [200, 250, 299, 401, 500, 599]:
+            self.assertIn(status, statuses)
+
+        for status in [0, 199, 300, 400, 402, 499, 600, 1000]:
+            self.assertNotIn(status, statuses)
+
+        self.assertEqual(len(statuses), 201)
+        self.assertEqual(
+            list(StatusSet([[200, 202], [204, 204]])), [200, 201, 202, 204]
+        )
+
+    def test_complement(self) -> None:
+        cases = [
+            ([], [(MIN_STATUS, MAX_STATUS)]),
+            ([[MIN_STATUS, MAX_STATUS]], []),
+            ([[MIN_STATUS, MIN_STATUS]], [(MIN_STATUS + 1, MAX_STATUS)]),
+            ([[MAX_STATUS, MAX_STATUS]], [(MIN_STATUS, MAX_STATUS - 1)]),
+            (
+                [[MIN_STATUS, MIN_STATUS], [MAX_STATUS, MAX_STATUS]],
+                [(MIN_STATUS + 1, MAX_STATUS - 1)],
+            ),
+            ([[200, 299], [400, 499]], [(100, 199), (300, 399), (500, 599)]),
+        ]
+        for ranges, intervals in cases:
+            with self.subTest(ranges=ranges):
+                complement = StatusSet(ranges).complement()
+                self.assertEqual(complement.intervals(), intervals)
+                self.assertEqual(complement.complement(), StatusSet(ranges))
+
+    def test_complement_of_out_of_range_statuses(self) -> None:
+        cases = [
+            ([[0, 99]], [(100, 599)]),
+            ([[600, 999]], [(100, 599)]),
+            ([[0, 100]], [(101, 599)]),
+            ([[599, 600]], [(100, 598)]),
+            ([[0, 1000]], []),
+            ([[0, 199], [500, 999]], [(200, 499)]),
+        ]
+        for ranges, intervals in cases:
+            with self.subTest(ranges=ranges):
+                self.assertEqual(StatusSet(ranges).complement().intervals(), intervals)
+
+    def test_complement_within_bounds(self) -> None:
+        statuses = StatusSet([[200, 299], [401, 401]])
+        self.assertEqual(statuses.complement(200, 299).intervals(), [])
+        self.assertEqual(
+            statuses.complement(250, 450).intervals(), [(300, 400), (402, 450)]
+        )
+
+    def test_smallest_form(self) -> None:
+        cases = [
+            ([[200, 200]], (False, [(200, 200)])),
+            ([[200, 299]], (False, [(200, 299)])),
+            ([[200, 599]], (True, [(100, 199)])),
+            # As long as each other, the statuses are listed
+            ([[100, 349]], (False, [(100, 349)])),
+            ([[100, 350]], (True, [(351, 599)])),
+            ([[MIN_STATUS, MAX_STATUS]], (True, [])),
+        ]
+        for ranges, (negative, intervals) in cases:
+            with self.subTest(ranges=ranges):
+                smallest = StatusSet(ranges).smallest_form()
+                self.assertEqual(
+                    (smallest[0], smallest[1].intervals()), (negative, intervals)
+                )
+
+    def test_smallest_form_leaves_out_invalid_statuses(self) -> None:
+        cases = [
+            # Listing 100 to 249 is shorter than listing 250 to 599
+            ([[0, 249]], (False, [(100, 249)])),
+            ([[0, 349]], (False, [(100, 349)])),
+            ([[0, 399], [600, 999]], (True, [(400, 599)])),
+            ([[600, 999]], (False, [])),
+        ]
+        for ranges, (negative, intervals) in cases:
+            with self.subTest(ranges=ranges):
+                smallest = StatusSet(ranges).smallest_form()
+                self.assertEqual(
+                    (smallest[0], smallest[1].intervals()), (negative, intervals)
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pathlib import Path
+from unittest import mock
+
+from pydantic import ValidationError
+
+from sssig_rules import client
+from sssig_rules import targets
+from sssig_rules.cache import ValidationCache
+from sssig_rules.daemon import RuleSet
+from sssig_rules.daemon import serve
+from sssig_rules.loader import load_rules_data
+from sssig_rules.targets import TargetKind
+
+RULES_PATH = Path(__file__).parents[1] / "test-rules.yaml"
+
+# The first rule's name, and the eighth rule's prefix pattern
+NAME = "name: 'AWS Acess Key ID'"
+PATTERN = "PresharedKey\\s*=\\s*"
+
+
+class RuleSetTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.rulespath = Path(tmp.name) / "rules.yaml"
+        shutil.copy(RULES_PATH, self.rulespath)
+        self.ruleset = RuleSet(self.rulespath)
+
+    def edit(self, old: str, new: str) -> bytes:
+        content = self.rulespath.read_text()
+        self.assertIn(old, content)
+        self.rulespath.write_text(content.replace(old, new, 1))
+        return self.rulespath.read_bytes()
+
+    def test_reload_validates_changed_rules(self) -> None:
+        self.assertEqual(self.ruleset._load(self.rulespath.read_bytes()), 13)
+        self.assertEqual(self.ruleset._load(self.rulespath.read_bytes()), 0)
+
+        content = self.edit(NAME, "name: 'AWS Access Key ID'")
+        self.assertEqual(self.ruleset._load(content), 1)
+        self.assertEqual(self.ruleset.rules[0].meta.name, "AWS Access Key ID")
+        for kind in TargetKind:
+            self.assertEqual(
+                self.ruleset.outputs[kind],
+                targets.translate(kind, self.ruleset.rules),
+            )
+
+    def test_reload_only_when_the_file_changed(self) -> None:
+        self.assertTrue(self.ruleset.reload())
+        self.assertFalse(self.ruleset.reload())
+        self.edit(NAME, "name: 'AWS Access Key ID'")
+        self.assertTrue(self.ruleset.reload())
+        self.assertEqual(self.ruleset.reloads, 2)
+
+    def test_broken_edit_keeps_the_last_good_rules(self) -> None:
+        self.ruleset.reload()
+        rules = self.ruleset.rules
+        outputs = self.ruleset.outputs
+
+        self.edit(PATTERN, PATTERN + "(")
+        with self.assertLogs("sssig_rules.daemon", "ERROR"):
+            self.assertTrue(self.ruleset.reload())
+
+        self.assertIn("7.target.prefix_pattern", self.ruleset.error)
+        self.assertIs(self.ruleset.rules, rules)
+        self.assertIs(self.ruleset.outputs, outputs)
+        self.assertEqual(
+            self.ruleset.handle({"command": "validate"}),
+            {"ok": False, "error": self.ruleset.error},
+        )
+
+        # Fixing it builds on the last good rules
+        self.edit(PATTERN + "(", PATTERN)
+        self.assertTrue(self.ruleset.reload())
+        self.assertIsNone(self.ruleset.error)
+        self.assertEqual(self.ruleset.outputs, outputs)
+
+    def test_validate_locates_errors_in_the_file(self) -> None:
+        with RULES_PATH.open("r") as rulesfile:
+            rules_data = load_rules_data(rulesfile)
+
+        del rules_data[1]["meta"]["name"]
+        with self.assertRaises(ValidationError) as raised:
+            self.ruleset._validate(rules_data[:2], [4, 9])
+
+        self.assertEqual(
+            [err["loc"] for err in raised.exception.errors()],
+            [(9, "meta", "name")],
+        )
+
+    def test_handle(self) -> None:
+        rules = len(load_rules_data(RULES_PATH.read_text()))
+        self.assertEqual(
+            self.ruleset.handle({"command": "validate"}),
+            {"ok": True, "rules": rules},
+        )
+        self.assertEqual(
+            self.ruleset.handle({"command": "translate", "target": "gitleaks"}),
+            {"ok": True, "output": self.ruleset.outputs[TargetKind.GITLEAKS]},
+        )
+
+    def test_handle_rejects_bad_requests(self) -> None:
+        requests = {
+            "requests must be JSON objects": ["validate"],
+            "unknown command: 'compile'": {"command": "compile"},
+            "unknown command: None": {},
+            "invalid target: 'semgrep'": {"command": "translate", "target": "semgrep"},
+            "invalid target: None": {"command": "translate"},
+        }
+        for error, message in requests.items():
+            with self.subTest(message=message):
+                self.assertEqual(
+                    self.ruleset.handle(message), {"ok": False, "error": error}
+                )
+
+
+class ServeTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        patcher = mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": tmp.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.rulespath = self.tmp / "rules.yaml"
+        shutil.copy(RULES_PATH, self.rulespath)
+        # Opened here and used on the daemon's worker threads
+        cache = ValidationCache(self.tmp / "validation.sqlite3")
+        self.addCleanup(cache.close)
+        self.ruleset = RuleSet(self.rulespath, cache)
+        self.output_dir = self.tmp / "out"
+
+    async def request(self, message: dict) -> dict | None:
+        return await asyncio.to_thread(client.request, self.rulespath, message, 10)
+
+    async def start(self) -> asyncio.Task:
+        task = asyncio.create_task(serve(self.ruleset, self.output_dir))
+        path = client.socket_path(self.rulespath)
+        async with asyncio.timeout(30):
+            while not path.exists():
+                self.assertFalse(task.done())
+                await asyncio.sleep(0.01)
+
+        return task
+
+    async def stop(self, task: asyncio.Task) -> None:
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+    async def test_round_trip(self) -> None:
+        self.assertIsNone(await self.request({"command": "validate"}))
+
+        task = await self.start()
+        try:
+            self.assertEqual(
+                await self.request({"command": "validate"}),
+                {"ok": True, "rules": len(self.ruleset.rules)},
+            )
+            response = await self.request({"command": "translate", "target": "github"})
+            self.assertEqual(
+                response["output"],
+                targets.translate(TargetKind.GITHUB, self.ruleset.rules),
+            )
+            self.assertEqual(
+                (self.output_dir / "github.json").read_text(),
+                response["output"] + "\n",
+            )
+
+            with self.assertRaisesRegex(client.DaemonError, "invalid target"):
+                await self.request({"command": "translate", "target": "semgrep"})
+        finally:
+            await self.stop(task)
+
+        self.assertFalse(client.socket_path(self.rulespath).exists())
+        self.assertIsNone(await self.request({"command": "validate"}))
+
+    async def test_reloading_doesnt_block_the_loop(self) -> None:
+        task = await self.start()
+        try:
+            loop = asyncio.get_running_loop()
+            started = asyncio.Event()
+            # Only set by the loop, which can't run if the reload is blocking it
+            release = threading.Event()
+            released = []
+            load = self.ruleset._load
+
+            def blocking_load(content: bytes) -> int:
+                loop.call_soon_threadsafe(started.set)
+                released.append(release.wait(timeout=5))
+                return load(content)
+
+            with mock.patch.object(self.ruleset, "_load", blocking_load):
+                content = self.rulespath.read_text()
+                self.rulespath.write_text(content.replace(NAME, "name: 'AWS'", 1))
+                await started.wait()
+                release.set()
+                # Answered once the reload is done
+                response = await self.request({"command": "validate"})
+
+            self.assertEqual(released, [True])
+            self.assertEqual(response, {"ok": True, "rules": 13})
+            self.assertEqual(self.ruleset.rules[0].meta.name, "AWS")
+        finally:
+            await self.stop(task)
+
+
+if __name__ == "__main__":
+    unittest.main()
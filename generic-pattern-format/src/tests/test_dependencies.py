@@ -0,0 +1,118 @@
+import contextlib
+import io
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import yaml
+
+import main
+
+from sssig_rules.dependencies import DependencyError
+from sssig_rules.dependencies import MissingDependency
+from sssig_rules.dependencies import check_dependencies
+from sssig_rules.dependencies import dependency_order
+from sssig_rules.dependencies import iter_checked_rules
+from sssig_rules.schema import validate_rules
+
+A, B, C, D = (f"S3IG{'A' * 15}{c}" for c in "ABCD")
+
+
+def rules(dependencies: dict[str, list[str]]) -> list:
+    """
+    Rules with the ids and dependencies, in order
+    """
+    return validate_rules(rules_data(dependencies))
+
+
+def rules_data(dependencies: dict[str, list[str]]) -> list[dict]:
+    return [
+        {
+            "id": rule_id,
+            "meta": {"name": f"rule {rule_id}"},
+            "target": {"pattern": f"{rule_id}[0-9]{{8}}"},
+            "dependencies": [
+                {"rule_id": dependency, "varname": f"dep{i}"}
+                for i, dependency in enumerate(depends_on)
+            ]
+            or None,
+        }
+        for rule_id, depends_on in dependencies.items()
+    ]
+
+
+class DependenciesTest(unittest.TestCase):
+    def test_valid(self) -> None:
+        graph = check_dependencies(rules({A: [B], B: [C], C: [], D: [B, C]}))
+        self.assertEqual(graph.cycles(), [])
+        self.assertEqual(graph.missing(), [])
+
+    def test_cycle(self) -> None:
+        with self.assertRaises(DependencyError) as raised:
+            check_dependencies(rules({A: [B], B: [C], C: [A], D: [A]}))
+
+        self.assertEqual(raised.exception.cycles, [[A, B, C]])
+        self.assertEqual(raised.exception.missing, [])
+        self.assertIn(
+            f"dependency cycle: {A} -> {B} -> {C} -> {A}", str(raised.exception)
+        )
+
+    def test_self_dependency(self) -> None:
+        with self.assertRaises(DependencyError) as raised:
+            check_dependencies(rules({A: [], B: [B]}))
+
+        self.assertEqual(raised.exception.cycles, [[B]])
+
+    def test_missing(self) -> None:
+        with self.assertRaises(DependencyError) as raised:
+            check_dependencies(rules({A: [D], B: [A, C]}))
+
+        self.assertEqual(
+            raised.exception.missing,
+            [MissingDependency(A, D), MissingDependency(B, C)],
+        )
+        self.assertEqual(raised.exception.cycles, [])
+        self.assertIn(f"rule {B} depends on missing rule {C}", str(raised.exception))
+
+    def test_order(self) -> None:
+        ordered = dependency_order(rules({A: [B], B: [C], C: [], D: [A]}))
+        self.assertEqual([rule.id for rule in ordered], [C, B, A, D])
+
+        # Rules without dependencies between them keep their order
+        ordered = dependency_order(rules({D: [], C: [], A: [], B: [D]}))
+        self.assertEqual([rule.id for rule in ordered], [D, C, A, B])
+
+    def test_streamed_rules_are_checked_once_consumed(self) -> None:
+        checked = iter_checked_rules(rules({A: [B], B: [A]}))
+        self.assertEqual(next(checked).id, A)
+        self.assertEqual(next(checked).id, B)
+        with self.assertRaises(DependencyError):
+            next(checked)
+
+
+class DependencyOrderCommandTest(unittest.TestCase):
+    def test_dependency_order(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        rulespath = Path(tmp.name) / "rules.yaml"
+        rulespath.write_text(
+            yaml.safe_dump({"rules": rules_data({A: [B], B: [C], C: []})})
+        )
+
+        for order, args in [([A, B, C], []), ([C, B, A], ["--dependency-order"])]:
+            with self.subTest(args=args):
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    status = main.main(
+                        ["translate", "--no-cache", "-t", "noseyparker", *args]
+                        + [str(rulespath)]
+                    )
+
+                self.assertEqual(status, 0)
+                translated = yaml.safe_load(out.getvalue())
+                self.assertEqual([r["id"] for r in translated["rules"]], order)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import yaml
+
+import main
+
+from sssig_rules.examples import run_examples
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import validate_rules
+
+REPO_RULES_PATH = Path(__file__).parents[2] / "data" / "rules" / "sssig.yaml"
+RULES_PATH = Path(__file__).parents[1] / "test-rules.yaml"
+
+PASSING = {
+    "id": "S3IGAAAAAAAAAAAAAAAA",
+    "meta": {
+        "name": "Passing",
+        "examples": {
+            "positive": ["token=tok_0123456789", "tok_9876543210"],
+            "negative": ["tok_012345678", "tok_abcdefghij"],
+        },
+    },
+    "target": {"pattern": r"\btok_[0-9]{10}\b"},
+}
+FAILING = {
+    "id": "S3IGAAAAAAAAAAAAAAAB",
+    "meta": {
+        "name": "Failing",
+        "examples": {
+            "positive": ["key_0123456789", "key_01234"],
+            "negative": ["key_9876543210x"],
+        },
+    },
+    "target": {"pattern": "key_[0-9]{10}"},
+}
+UNTESTED = {
+    "id": "S3IGAAAAAAAAAAAAAAAC",
+    "meta": {"name": "Untested"},
+    "target": {"pattern": "secret_[0-9]{10}"},
+}
+
+
+class RunExamplesTest(unittest.TestCase):
+    def test_results(self) -> None:
+        report = run_examples(validate_rules([PASSING, FAILING, UNTESTED]))
+        passing, failing, untested = report.results
+
+        self.assertEqual((passing.examples, passing.passed), (4, True))
+        self.assertEqual(failing.id, FAILING["id"])
+        self.assertFalse(failing.passed)
+        self.assertEqual(failing.missed_positives, ["key_01234"])
+        self.assertEqual(failing.matched_negatives, ["key_9876543210x"])
+        self.assertEqual((untested.examples, untested.passed), (0, True))
+        self.assertFalse(report.passed)
+
+    def test_rules_files(self) -> None:
+        for path in [REPO_RULES_PATH, RULES_PATH]:
+            with self.subTest(path=path.name):
+                with path.open("r") as rulesfile:
+                    rules = validate_rules(load_rules_data(rulesfile))
+
+                failed = [r for r in run_examples(rules).results if not r.passed]
+                self.assertEqual(failed, [])
+
+
+class TestCommandTest(unittest.TestCase):
+    def run_test(self, rules_data: list[dict]) -> tuple[int, str]:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        rulespath = Path(tmp.name) / "rules.yaml"
+        rulespath.write_text(yaml.safe_dump({"rules": rules_data}))
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = main.main(["test", "--no-cache", str(rulespath)])
+
+        return status, out.getvalue()
+
+    def test_passing(self) -> None:
+        status, out = self.run_test([PASSING, UNTESTED])
+        self.assertEqual(status, 0)
+        self.assertIn(f"PASS {PASSING['id']} Passing (4 examples", out)
+        self.assertIn(f"SKIP {UNTESTED['id']} Untested (0 examples", out)
+        self.assertIn("2 rules, 0 failed", out)
+
+    def test_failing(self) -> None:
+        status, out = self.run_test([PASSING, FAILING])
+        self.assertNotEqual(status, 0)
+        self.assertIn(f"FAIL {FAILING['id']} Failing (3 examples", out)
+        self.assertIn("  positive example not matched: 'key_01234'", out)
+        self.assertIn("  negative example matched: 'key_9876543210x'", out)
+        self.assertIn("2 rules, 1 failed", out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pathlib import Path
+from unittest import mock
+
+import main
+
+from sssig_rules import incremental
+from sssig_rules import targets
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import validate_rules
+from sssig_rules.targets import TargetKind
+
+RULES_PATH = Path(__file__).parents[1] / "test-rules.yaml"
+
+
+class ConcurrentTargetsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        with RULES_PATH.open("r") as rulesfile:
+            cls.rules = validate_rules(load_rules_data(rulesfile))
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.dict(os.environ, {"SSSIG_CACHE_DIR": tmp.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_two_targets_at_once(self) -> None:
+        kinds = [TargetKind.GITLEAKS, TargetKind.TRUFFLEHOG]
+        # Each target's first translated rule waits for the other target to
+        # get there too, which it can only do if looking up its cached
+        # fragments didn't have to wait for the first target's translation
+        barrier = threading.Barrier(len(kinds), timeout=5)
+
+        for kind in kinds:
+            module = targets.module(kind)
+            fragment = module._fragment
+            waited = threading.Event()
+
+            def slow_fragment(rule, fragment=fragment, waited=waited):
+                if not waited.is_set():
+                    waited.set()
+                    barrier.wait()
+
+                return fragment(rule)
+
+            patcher = mock.patch.object(module, "_fragment", slow_fragment)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        outputs = {}
+        errors = []
+
+        def translate(kind: TargetKind) -> None:
+            try:
+                outputs[kind] = incremental.translate(kind, self.rules)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=translate, args=(k,)) for k in kinds]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        mock.patch.stopall()
+        for kind in kinds:
+            self.assertEqual(outputs[kind], targets.translate(kind, self.rules))
+            # Built from the cached fragments this time
+            self.assertEqual(incremental.translate(kind, self.rules), outputs[kind])
+
+
+class IncrementalTranslationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        with RULES_PATH.open("r") as rulesfile:
+            cls.rules = validate_rules(load_rules_data(rulesfile))
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        patcher = mock.patch.dict(os.environ, {"SSSIG_CACHE_DIR": tmp.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def edited_rules(self) -> list:
+        """
+        The rules with the first rule's entropy filter changed, which only
+        some targets translate
+        """
+        first = self.rules[0]
+        assert first.filters is not None
+        require = first.filters[0].model_copy(update={"target_min_entropy": 3.5})
+        edited = first.model_copy(update={"filters": [require, *first.filters[1:]]})
+        return [edited, *self.rules[1:]]
+
+    def test_only_changed_rules_are_translated(self) -> None:
+        rules = self.edited_rules()
+        for kind in TargetKind:
+            module = targets.module(kind)
+            with self.subTest(kind=kind):
+                incremental.translate(kind, self.rules)
+                with mock.patch.object(
+                    module, "_fragment", wraps=module._fragment
+                ) as fragment:
+                    output = incremental.translate(kind, rules)
+
+                fragment.assert_called_once_with(rules[0])
+                self.assertEqual(output, targets.translate(kind, rules))
+
+    def test_cached_rules_log_their_warnings(self) -> None:
+        kind = TargetKind.NOSEYPARKER
+        with self.assertLogs(level="WARNING") as translated:
+            incremental.translate(kind, self.rules)
+        with self.assertLogs(level="WARNING") as cached:
+            incremental.translate(kind, self.rules)
+
+        self.assertEqual(cached.output, translated.output)
+
+    def test_unchanged_outputs_are_left_alone(self) -> None:
+        rulespath = self.tmp / "rules.yaml"
+        shutil.copy(RULES_PATH, rulespath)
+        output_dir = self.tmp / "out"
+        args = ["translate", "--incremental", "-t", "all", "-o", str(output_dir)]
+        args.append(str(rulespath))
+
+        self.assertEqual(main.main(args), 0)
+        outputs = {kind: output_dir / targets.filename(kind) for kind in TargetKind}
+        for outpath in outputs.values():
+            os.utime(outpath, ns=(0, 0))
+
+        rulespath.write_text(
+            RULES_PATH.read_text().replace(
+                "target_min_entropy: 3.0", "target_min_entropy: 3.5", 1
+            )
+        )
+        self.assertEqual(main.main(args), 0)
+
+        rules = self.edited_rules()
+        changed = {
+            kind
+            for kind in TargetKind
+            if targets.translate(kind, rules) != targets.translate(kind, self.rules)
+        }
+        self.assertIn(TargetKind.GITLEAKS, changed)
+        self.assertNotIn(TargetKind.NOSEYPARKER, changed)
+        for kind, outpath in outputs.items():
+            with self.subTest(kind=kind):
+                self.assertEqual(
+                    outpath.read_text(), targets.translate(kind, rules) + "\n"
+                )
+                self.assertEqual(outpath.stat().st_mtime_ns != 0, kind in changed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import random
+import re
+import unittest
+
+from sssig_rules import hscheck  # type: ignore
+from sssig_rules.literals import _flat_pattern
+from sssig_rules.literals import factor_strings
+
+# A few characters so the strings share prefixes and contain each other often,
+# with some that have to be escaped
+ALPHABET = "abcAB.*("
+SEED = 1234
+
+
+def random_string(rng: random.Random, max_length: int) -> str:
+    return "".join(rng.choices(ALPHABET, k=rng.randint(1, max_length)))
+
+
+def inputs(rng: random.Random, strings: list[str]) -> list[str]:
+    """
+    Random inputs, and inputs built from the strings (and parts of them) that
+    are likelier to match
+    """
+    generated = [random_string(rng, 12) for _ in range(50)]
+    for s in strings:
+        cut = rng.randint(0, len(s))
+        generated.extend(
+            [
+                s,
+                s.swapcase(),
+                s[:cut],
+                s[cut:],
+                random_string(rng, 3) + s[:cut] + random_string(rng, 3),
+                random_string(rng, 3) + s + random_string(rng, 3),
+            ]
+        )
+
+    return generated
+
+
+class FactorStringsTest(unittest.TestCase):
+    def test_matches_the_flat_alternation(self) -> None:
+        rng = random.Random(SEED)
+        for _ in range(300):
+            strings = [random_string(rng, 6) for _ in range(rng.randint(2, 20))]
+            flat = _flat_pattern(strings)
+            with self.assertNoLogs("sssig_rules.literals"):
+                factored = factor_strings(strings)
+
+            self.assertNotEqual(factored.pattern, flat)
+            flat_re = re.compile(flat)
+            factored_re = re.compile(factored.pattern)
+            for data in inputs(rng, strings):
+                with self.subTest(strings=strings, data=data):
+                    self.assertEqual(
+                        bool(factored_re.search(data)), bool(flat_re.search(data))
+                    )
+
+    def test_matches_the_flat_alternation_in_hyperscan(self) -> None:
+        rng = random.Random(SEED)
+        for _ in range(50):
+            strings = [random_string(rng, 6) for _ in range(rng.randint(2, 20))]
+            flat_db = hscheck.compile([_flat_pattern(strings)])
+            factored_db = hscheck.compile([factor_strings(strings).pattern])
+            for data in inputs(rng, strings):
+                with self.subTest(strings=strings, data=data):
+                    self.assertEqual(
+                        bool(factored_db.scan(data.encode())),
+                        bool(flat_db.scan(data.encode())),
+                    )
+
+    def test_drops_strings_containing_another(self) -> None:
+        factored = factor_strings(["tokens", "Token", "token", "test", "retest"])
+        self.assertEqual(factored.kept, 2)
+        self.assertEqual(factored.pattern, "(?i)t(?:oken|est)")
+
+
+if __name__ == "__main__":
+    unittest.main()
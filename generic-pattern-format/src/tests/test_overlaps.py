@@ -0,0 +1,122 @@
+import contextlib
+import io
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import yaml
+
+import main
+
+from sssig_rules.overlaps import find_overlaps
+from sssig_rules.schema import validate_rules
+
+A, B, C = (f"S3IG{'A' * 15}{c}" for c in "ABC")
+
+
+def rule_data(rule_id: str, pattern: str, positive: list[str]) -> dict:
+    return {
+        "id": rule_id,
+        "meta": {"name": f"rule {rule_id}", "examples": {"positive": positive}},
+        "target": {"pattern": pattern},
+    }
+
+
+RULES_DATA = [
+    rule_data(A, "tok_[0-9]{10}", ["tok_0123456789"]),
+    # The same id as the first rule
+    rule_data(A, "tok_[0-9]{10}", ["tok_9876543210"]),
+    rule_data(B, "[a-z]{3}_[0-9]{10}", ["key_0123456789"]),
+    rule_data(C, "secret_[a-f]{8}", ["secret_deadbeef"]),
+]
+
+
+class FindOverlapsTest(unittest.TestCase):
+    def test_overlaps(self) -> None:
+        report = find_overlaps(validate_rules(RULES_DATA))
+        self.assertEqual((report.rules, report.examples), (4, 4))
+        # The rule matching the others' examples doesn't have its own matched
+        self.assertEqual([result.index for result in report.results], [0, 1])
+
+        first, second = report.results
+        self.assertEqual(
+            [(other.index, other.id) for other in first.overlapping],
+            [(1, A), (2, B)],
+        )
+        self.assertEqual(
+            [(other.index, other.id) for other in second.overlapping],
+            [(0, A), (2, B)],
+        )
+        self.assertEqual(
+            [(other.index, other.id) for other in second.examples[0].matched_by],
+            [(0, A), (2, B)],
+        )
+
+    def test_rules_dont_overlap_themselves(self) -> None:
+        report = find_overlaps(validate_rules(RULES_DATA))
+        for result in report.results:
+            with self.subTest(index=result.index):
+                self.assertNotIn(
+                    result.index, [other.index for other in result.overlapping]
+                )
+                for overlap in result.examples:
+                    self.assertNotIn(
+                        result.index, [other.index for other in overlap.matched_by]
+                    )
+
+    def test_new_since(self) -> None:
+        report = find_overlaps(validate_rules(RULES_DATA))
+        self.assertEqual(report.pairs(), {(A, A), (A, B)})
+
+        baseline = find_overlaps(validate_rules(RULES_DATA[1:]))
+        self.assertEqual(report.new_since(baseline), [(A, A)])
+        self.assertEqual(baseline.new_since(report), [])
+
+
+class OverlapsCommandTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def overlaps(self, rules_data: list[dict], *args: str) -> tuple[int, str]:
+        rulespath = self.tmp / "rules.yaml"
+        rulespath.write_text(yaml.safe_dump({"rules": rules_data}))
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = main.main(["overlaps", "--no-cache", *args, str(rulespath)])
+
+        return status, out.getvalue()
+
+    def test_report(self) -> None:
+        status, out = self.overlaps(RULES_DATA)
+        self.assertEqual(status, 0)
+        self.assertIn(f"{A} rule {A} (rule 1)\n", out)
+        self.assertIn(
+            f"  'tok_9876543210' matched by {A} (rule 0), {B} (rule 2)\n", out
+        )
+        self.assertIn("2 of 4 rules overlap", out)
+
+    def test_baseline(self) -> None:
+        baseline = self.tmp / "baseline.json"
+        status, out = self.overlaps(RULES_DATA[1:], "--json")
+        self.assertEqual(status, 0)
+        baseline.write_text(out)
+
+        self.assertEqual(
+            self.overlaps(RULES_DATA[1:], "--baseline", str(baseline))[0], 0
+        )
+        with self.assertLogs(level="ERROR") as logs:
+            status, _ = self.overlaps(RULES_DATA, "--baseline", str(baseline))
+
+        self.assertEqual(status, 1)
+        (message,) = logs.output
+        self.assertIn(
+            f"new overlap: rule_id={A!r} examples matched by rule_id={A!r}", message
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import copy
+import unittest
+
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import validate_rules
+
+RULES_PATH = Path(__file__).parents[1] / "test-rules.yaml"
+
+
+class ValidateRulesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        with RULES_PATH.open("r") as rulesfile:
+            cls.rules_data = load_rules_data(rulesfile)
+
+    def broken_rules_data(self) -> list:
+        """
+        The rules with an invalid pattern at index 7 and a rule missing its
+        name at index 9
+        """
+        rules_data = copy.deepcopy(self.rules_data)
+        rules_data[7]["target"]["pattern"] = "(unclosed"
+        del rules_data[9]["meta"]["name"]
+        return rules_data
+
+    def assert_error_locs(self, e: ValidationError, locs: list[tuple]) -> None:
+        self.assertEqual([err["loc"] for err in e.errors()], locs)
+
+    def test_pattern_and_schema_errors(self) -> None:
+        with self.assertRaises(ValidationError) as raised:
+            validate_rules(self.broken_rules_data())
+
+        self.assert_error_locs(
+            raised.exception,
+            [(7, "target", "pattern"), (9, "meta", "name")],
+        )
+
+    def test_pattern_errors(self) -> None:
+        rules_data = copy.deepcopy(self.rules_data)
+        rules_data[7]["target"]["pattern"] = "(unclosed"
+        with self.assertRaises(ValidationError) as raised:
+            validate_rules(rules_data)
+
+        self.assert_error_locs(raised.exception, [(7, "target", "pattern")])
+
+    def test_schema_errors(self) -> None:
+        rules_data = copy.deepcopy(self.rules_data)
+        del rules_data[9]["meta"]["name"]
+        with self.assertRaises(ValidationError) as raised:
+            validate_rules(rules_data)
+
+        self.assert_error_locs(raised.exception, [(9, "meta", "name")])
+
+    def test_offset(self) -> None:
+        with self.assertRaises(ValidationError) as raised:
+            validate_rules(self.broken_rules_data(), offset=100)
+
+        self.assert_error_locs(
+            raised.exception,
+            [(107, "target", "pattern"), (109, "meta", "name")],
+        )
+
+    def test_offset_of_an_error_without_a_location(self) -> None:
+        with self.assertRaises(ValidationError) as raised:
+            validate_rules({"rules": []}, offset=100)  # type: ignore
+
+        self.assert_error_locs(raised.exception, [()])
+        self.assertEqual(raised.exception.errors()[0]["type"], "list_type")
+
+
+if __name__ == "__main__":
+    unittest.main()
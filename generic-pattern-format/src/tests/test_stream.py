@@ -0,0 +1,75 @@
+import contextlib
+import io
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import main
+
+from sssig_rules import targets
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import validate_rules
+from sssig_rules.targets import TargetKind
+
+REPO_RULES_PATH = Path(__file__).parents[2] / "data" / "rules" / "sssig.yaml"
+
+
+def run_main(args: list[str]) -> str:
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        status = main.main(args)
+
+    if status != 0:
+        raise AssertionError(f"main {args} exited {status}")
+
+    return out.getvalue()
+
+
+class WriteTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        with REPO_RULES_PATH.open("r") as rulesfile:
+            cls.rules = validate_rules(load_rules_data(rulesfile))
+
+    def test_write_matches_translate(self) -> None:
+        for kind in TargetKind:
+            for rules in [self.rules, self.rules[:1], []]:
+                with self.subTest(kind=kind, rules=len(rules)):
+                    out = io.StringIO()
+                    # A generator, like the streamed rules
+                    targets.write(kind, (rule for rule in rules), out)
+                    self.assertEqual(out.getvalue(), targets.translate(kind, rules))
+
+
+class StreamCommandTest(unittest.TestCase):
+    def test_stream_matches_translate(self) -> None:
+        for kind in TargetKind:
+            with self.subTest(kind=kind):
+                args = ["translate", "--no-cache", "-t", kind.value]
+                self.assertEqual(
+                    run_main(args + ["--stream", str(REPO_RULES_PATH)]),
+                    run_main(args + [str(REPO_RULES_PATH)]),
+                )
+
+    def test_stream_outputs_match_translate(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        streamed = Path(tmp.name) / "streamed"
+        translated = Path(tmp.name) / "translated"
+
+        args = ["translate", "--no-cache", "-t", "all"]
+        run_main(args + ["--stream", "-o", str(streamed), str(REPO_RULES_PATH)])
+        run_main(args + ["-o", str(translated), str(REPO_RULES_PATH)])
+
+        for kind in TargetKind:
+            with self.subTest(kind=kind):
+                filename = targets.filename(kind)
+                self.assertEqual(
+                    (streamed / filename).read_text(),
+                    (translated / filename).read_text(),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import random
+import unittest
+
+from pathlib import Path
+from unittest import mock
+
+import yaml
+
+from sssig_rules import targets
+from sssig_rules.loader import load_rules_data
+from sssig_rules.schema import validate_rules
+from sssig_rules.targets import TargetKind
+from sssig_rules.targets import common
+
+REPO_RULES_DIR = Path(__file__).parents[2] / "data" / "rules"
+YAML_TARGETS = [TargetKind.KINGFISHER, TargetKind.NOSEYPARKER, TargetKind.TRUFFLEHOG]
+SEED = 1234
+
+# Strings that change how a scalar has to be written
+AWKWARD_STRINGS = [
+    "",
+    " ",
+    "plain",
+    "multi\nline",
+    "multi\n\n  indented\nline",
+    "trailing\n",
+    "trailing\n\n",
+    "\nleading",
+    "  leading spaces",
+    "trailing spaces  ",
+    "trailing spaces  \nline",
+    "- leading dash",
+    "-",
+    "--- document",
+    "...",
+    "key: value",
+    "ends with colon:",
+    "a # comment",
+    "#",
+    "'single' and \"double\" quotes",
+    "{flow: mapping}",
+    "[flow, sequence]",
+    "&anchor",
+    "*alias",
+    "!tag",
+    "%directive",
+    "@",
+    "`",
+    "|",
+    ">-",
+    "?",
+    "null",
+    "~",
+    "yes",
+    "True",
+    "0x1F",
+    "1e3",
+    ".inf",
+    "2026-10-18",
+    "tab\there",
+    "\ttab",
+    "uniçødé",
+    "日本語",
+    "emoji \U0001f511",
+    "bell \x07",
+    "nbsp ",
+    "bom ﻿",
+    "cr\rlf",
+    "crlf\r\nline",
+    "nel\x85line",
+    "line separator",
+    "\\A(?:[a-z]{8}):\\s*'x'",
+    "x" * 200,
+    " ".join(["long"] * 200),
+    ("long line " * 40 + "\n") * 3,
+]
+
+
+def random_data(rng: random.Random, depth: int = 0):
+    choice = rng.randrange(6 if depth < 4 else 3)
+    if choice == 0:
+        return rng.choice(AWKWARD_STRINGS)
+    elif choice == 1:
+        return rng.choice([None, True, False, 0, -1, 2.5, 10**20])
+    elif choice == 2:
+        return rng.choice(AWKWARD_STRINGS) + rng.choice(AWKWARD_STRINGS)
+    elif choice == 3:
+        return [random_data(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+
+    return {
+        rng.choice(AWKWARD_STRINGS): random_data(rng, depth + 1)
+        for _ in range(rng.randint(0, 4))
+    }
+
+
+@unittest.skipUnless(yaml.__with_libyaml__, "PyYAML was built without libyaml")
+class YamlBackendsTest(unittest.TestCase):
+    def assert_same_yaml(self, data: dict) -> None:
+        expected = common._dump_yaml_python(data)
+        self.assertEqual(common._dump_yaml_libyaml(data), expected)
+        # And it's still the data
+        self.assertEqual(yaml.safe_load(expected), data)
+
+    def test_libyaml_is_used(self) -> None:
+        self.assertIs(common._yaml_backend(), common._dump_yaml_libyaml)
+
+    def test_golden_files(self) -> None:
+        with (REPO_RULES_DIR / "sssig.yaml").open("r") as rulesfile:
+            rules = validate_rules(load_rules_data(rulesfile))
+
+        for kind in YAML_TARGETS:
+            golden = (REPO_RULES_DIR / targets.filename(kind)).read_text()
+            with self.subTest(kind=kind):
+                self.assert_same_yaml(yaml.safe_load(golden))
+                for backend in [common._dump_yaml_python, common._dump_yaml_libyaml]:
+                    with mock.patch.object(
+                        common, "_yaml_backend", return_value=backend
+                    ):
+                        # main.py prints the translation
+                        self.assertEqual(targets.translate(kind, rules) + "\n", golden)
+
+    def test_awkward_strings(self) -> None:
+        for s in AWKWARD_STRINGS:
+            with self.subTest(s=s):
+                self.assert_same_yaml({"rules": [{"id": s, "value": s, "list": [s]}]})
+                self.assert_same_yaml({s: {s: [[s], {s: s}]}})
+                self.assert_same_yaml({"rules": [s, [s, s]]})
+
+    def test_random_documents(self) -> None:
+        rng = random.Random(SEED)
+        for _ in range(500):
+            # Documents are always mappings
+            data = {"rules": random_data(rng)}
+            with self.subTest(data=data):
+                self.assert_same_yaml(data)
+
+
+if __name__ == "__main__":
+    unittest.main()